@@ -1,19 +1,23 @@
-from flask import Flask, render_template, request, jsonify, send_file
+import time
+_PROCESS_START = time.perf_counter()
+
+from flask import Flask, render_template, request, jsonify, send_file, Response, abort
 import pandas as pd
-import joblib
 import numpy as np
 from datetime import datetime
-import torch
-import mlflow
 import threading
-import time
-from graph_models.gnn_model import load_gnn_model
-from graph_models.data_loader import TransactionGraphBuilder
-from reporting.generator import ReportGenerator
-from profiling.builder import CustomerRiskProfiler
-from drift.detector import ConceptDriftDetector
-from models.automl.trainer import AutoMLTrainer
+from serving.registry import ModelRegistry
+from serving.features import to_model_input
+from reporting.pool import ReportJobQueue
+from reporting.rollup import DailyRollup, StoredRollup
+from reporting.generator import SAR_THRESHOLD
+from storage.transactions import TransactionWriter, TRANSACTION_COLUMNS
+from streaming.feed import TransactionFeed
+from monitoring.metrics import StageTimer, TRANSACTIONS_SCORED, register_service_gauges, metrics_response
+from monitoring.profiling import SamplingProfiler, SlowRequestLog, ProfilerBusy
 import os
+import uuid
+import atexit
 import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,16 +25,6 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Initialize components
-iso_forest = joblib.load('models/isolation_forest.pkl')
-xgb = joblib.load('models/xgboost.pkl')
-shap_explainer = joblib.load('models/shap_explainer.pkl')
-gnn_model = load_gnn_model('models/gnn_model.pt')
-graph_builder = TransactionGraphBuilder()
-report_generator = ReportGenerator()
-profiler = CustomerRiskProfiler()
-drift_detector = ConceptDriftDetector()
-
 # Feature names
 features = ['TransactionAmount', 'TransactionDuration', 'LoginAttempts', 
             'AccountBalance', 'DaysSinceLastTransaction', 'TransactionSpeed',
@@ -38,8 +32,68 @@ features = ['TransactionAmount', 'TransactionDuration', 'LoginAttempts',
             'AmountDeviation', 'DurationDeviation', 'TransactionType', 
             'Location', 'DeviceID', 'MerchantID', 'Channel', 'CustomerOccupation']
 
+# Components are built by create_app(), not at import: the report pool's
+# spawn workers re-import this module (as __mp_main__) and must not get a
+# model registry, database writer, feed or metrics of their own
+models = None
+transaction_writer = None
+report_jobs = None
+daily_rollup = None
+transaction_feed = None
+GRAPH_SEED_LIMIT = int(os.environ.get("GRAPH_SEED_LIMIT", 100000))
+
+def init_components():
+    global models, transaction_writer, report_jobs, daily_rollup, transaction_feed
+    # Scored transactions and alerts are written behind the request by a
+    # background thread (DATABASE_URL, SQLite when unset)
+    transaction_writer = TransactionWriter()
+    atexit.register(transaction_writer.close)
+    # Models are loaded on first use (or by the warm-up thread), so this
+    # does not pull in torch, shap or xgboost. The transaction graph is
+    # rebuilt from the newest stored transactions.
+    models = ModelRegistry(feature_names=features,
+                           graph_history=lambda: transaction_writer.store.graph_rows(GRAPH_SEED_LIMIT))
+    # PDF rendering runs in separate worker processes, never in a request thread
+    report_jobs = ReportJobQueue()
+    # Per-day counters. Postgres keeps them in daily_transaction_rollup for
+    # all workers; the SQLite stand-in counts in this process as it scores.
+    if transaction_writer.store.sqlite:
+        daily_rollup = DailyRollup()
+    else:
+        daily_rollup = StoredRollup(transaction_writer.store)
+    # Live dashboard feed: newly scored transactions are pushed to every
+    # /api/transactions/stream client
+    transaction_feed = TransactionFeed(
+        max_queue=int(os.environ.get("FEED_CLIENT_QUEUE", 256)),
+        max_subscribers=int(os.environ.get("FEED_MAX_CLIENTS", 1000))
+    )
+    register_service_gauges(models, transaction_writer, report_jobs, transaction_feed)
+# Profiling: /admin endpoints are only served when ADMIN_TOKEN is set, and
+# /api/analyze requests slower than SLOW_REQUEST_MS (0 disables) are kept
+# with their stage timings and input
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+sampling_profiler = SamplingProfiler()
+slow_requests = SlowRequestLog(
+    threshold_ms=float(os.environ.get("SLOW_REQUEST_MS", 1000)),
+    capacity=int(os.environ.get("SLOW_REQUEST_BUFFER", 100))
+)
+
+WARMUP_ON_START = os.environ.get("FRAUD_WARMUP", "true").lower() == "true"
+AUTO_RETRAIN = os.environ.get("FRAUD_AUTO_RETRAIN", "true").lower() == "true"
+
 # Background tasks
 def auto_retrain():
+    # Imported here so that mlflow/xgboost stay out of the import path
+    from models.automl.trainer import AutoMLTrainer
+
+    # Train initial models if they are missing, then retrain weekly
+    required_models = ['isolation_forest.pkl', 'xgboost.pkl', 'shap_explainer.pkl']
+    if all(os.path.exists(f"trained_models/{model}") for model in required_models):
+        # Models are already in place, wait for the first weekly slot
+        time.sleep(7 * 24 * 60 * 60)
+    else:
+        app.logger.info("Initial models not found, training initial models...")
+
     while True:
         try:
             trainer = AutoMLTrainer("data/bank_transactions_data_2.csv")
@@ -49,23 +103,62 @@ def auto_retrain():
             app.logger.error(f"AutoML retraining failed: {str(e)}")
         time.sleep(7 * 24 * 60 * 60)  # Run weekly
 
-# Start background thread
-retrain_thread = threading.Thread(target=auto_retrain, daemon=True)
-retrain_thread.start()
+def warm_up():
+    models.warm_up()
+    logger.info(f"Ready {time.perf_counter() - _PROCESS_START:.3f}s after process start")
+
+def seed_daily_rollup():
+    # Pick up the in-process counters again after a restart. Runs before the
+    # first request is served: load() replaces buckets, so later seeding
+    # would drop what requests had already recorded.
+    if not isinstance(daily_rollup, DailyRollup):
+        return
+    try:
+        daily_rollup.load(transaction_writer.store.rollup_rows())
+    except Exception as e:
+        logger.warning(f"Could not load daily rollup from the database: {e}")
+
+def start_background_tasks():
+    if WARMUP_ON_START:
+        threading.Thread(target=warm_up, name="model-warmup", daemon=True).start()
+    if AUTO_RETRAIN:
+        threading.Thread(target=auto_retrain, name="automl-retrain", daemon=True).start()
 
+_app_started = False
+_app_lock = threading.Lock()
 
-# Initialize AutoML Trainer with proper error handling
-try:
-    automl_trainer = AutoMLTrainer("data/bank_transactions_data_2.csv")
-    
-    # Check if models exist, if not train initial models
-    required_models = ['isolation_forest.pkl', 'xgboost.pkl', 'shap_explainer.pkl']
-    if not all(os.path.exists(f"trained_models/{model}") for model in required_models):
-        logger.info("Initial models not found, training initial models...")
-        automl_trainer.train_models()
-except Exception as e:
-    logger.error(f"Failed to initialize AutoML trainer: {str(e)}")
-    raise
+def create_app():
+    """
+    Builds the components, seeds the daily rollup and starts warm-up and
+    retraining, once per process. WSGI entry point, e.g.
+    gunicorn 'app:create_app()'.
+    """
+    global _app_started
+    with _app_lock:
+        if not _app_started:
+            init_components()
+            seed_daily_rollup()
+            start_background_tasks()
+            _app_started = True
+    return app
+
+@app.before_request
+def ensure_app_started():
+    # Servers pointed at app:app never call create_app()
+    if not _app_started:
+        create_app()
+
+_first_request_logged = False
+
+@app.after_request
+def log_time_to_first_request(response):
+    global _first_request_logged
+    if not _first_request_logged:
+        _first_request_logged = True
+        logger.info(f"Time to first request: {time.perf_counter() - _PROCESS_START:.3f}s since process start")
+    return response
+
+logger.info(f"App module imported in {time.perf_counter() - _PROCESS_START:.3f}s")
 
 @app.route('/')
 def dashboard():
@@ -74,134 +167,240 @@ def dashboard():
 @app.route('/api/analyze', methods=['POST'])
 def analyze_transaction():
     data = request.json
+    timer = StageTimer()
+    profiler = models.profiler
     
-    # Update customer profile
-    profiler.update_profile(data['AccountID'], {
-        'amount': float(data['TransactionAmount']),
-        'type': data['TransactionType'],
-        'date': data['TransactionDate']
-    })
-    
-    # Get customer stats
-    cust_profile = profiler.get_risk_profile(data['AccountID'])
-    cust_stats = {
-        'AvgAmount': cust_profile.get('avg_amount', 150.0),
-        'StdAmount': cust_profile.get('std_amount', 75.0),
-        'MaxAmount': cust_profile.get('max_amount', 1000.0),
-        'AvgDuration': cust_profile.get('avg_duration', 120.0),
-        'UniqueLocations': cust_profile.get('unique_locations', 3)
-    }
-    
-    # Create feature vector
-    transaction_date = datetime.strptime(data['TransactionDate'], '%Y-%m-%d %H:%M:%S')
-    prev_date = datetime.strptime(data['PreviousTransactionDate'], '%Y-%m-%d %H:%M:%S')
-    
-    features_dict = {
-        'TransactionAmount': float(data['TransactionAmount']),
-        'TransactionDuration': float(data['TransactionDuration']),
-        'LoginAttempts': int(data['LoginAttempts']),
-        'AccountBalance': float(data['AccountBalance']),
-        'DaysSinceLastTransaction': (datetime.now() - prev_date).days,
-        'TransactionSpeed': float(data['TransactionAmount']) / float(data['TransactionDuration']),
-        'AvgAmount': cust_stats['AvgAmount'],
-        'StdAmount': cust_stats['StdAmount'],
-        'MaxAmount': cust_stats['MaxAmount'],
-        'AvgDuration': cust_stats['AvgDuration'],
-        'UniqueLocations': cust_stats['UniqueLocations'],
-        'AmountDeviation': (float(data['TransactionAmount']) - cust_stats['AvgAmount']) / cust_stats['StdAmount'],
-        'DurationDeviation': (float(data['TransactionDuration']) - cust_stats['AvgDuration']) / cust_stats['AvgDuration'],
-        'TransactionType': 0 if data['TransactionType'] == 'Debit' else 1,
-        'Location': hash(data['Location']) % 100,
-        'DeviceID': hash(data['DeviceID']) % 100,
-        'MerchantID': hash(data['MerchantID']) % 100,
-        'Channel': {'ATM': 0, 'Online': 1, 'Branch': 2}.get(data['Channel'], 0),
-        'CustomerOccupation': {'Student': 0, 'Doctor': 1, 'Engineer': 2, 'Retired': 3}.get(data['CustomerOccupation'], 0)
-    }
+    with timer.stage('profiler'):
+        # Update customer profile
+        profiler.update_profile(data['AccountID'], {
+            'amount': float(data['TransactionAmount']),
+            'type': data['TransactionType'],
+            'date': data['TransactionDate']
+        })
+        
+        # Get customer stats
+        cust_profile = profiler.get_risk_profile(data['AccountID'])
     
-    # Convert to DataFrame for prediction
-    X = pd.DataFrame([features_dict], columns=features)
+    with timer.stage('feature_engineering'):
+        cust_stats = {
+            'AvgAmount': cust_profile.get('avg_amount', 150.0),
+            'StdAmount': cust_profile.get('std_amount', 75.0),
+            'MaxAmount': cust_profile.get('max_amount', 1000.0),
+            'AvgDuration': cust_profile.get('avg_duration', 120.0),
+            'UniqueLocations': cust_profile.get('unique_locations', 3)
+        }
+        
+        # Create feature vector
+        transaction_date = datetime.strptime(data['TransactionDate'], '%Y-%m-%d %H:%M:%S')
+        prev_date = datetime.strptime(data['PreviousTransactionDate'], '%Y-%m-%d %H:%M:%S')
+        
+        features_dict = {
+            'TransactionAmount': float(data['TransactionAmount']),
+            'TransactionDuration': float(data['TransactionDuration']),
+            'LoginAttempts': int(data['LoginAttempts']),
+            'AccountBalance': float(data['AccountBalance']),
+            'DaysSinceLastTransaction': (datetime.now() - prev_date).days,
+            'TransactionSpeed': float(data['TransactionAmount']) / float(data['TransactionDuration']),
+            'AvgAmount': cust_stats['AvgAmount'],
+            'StdAmount': cust_stats['StdAmount'],
+            'MaxAmount': cust_stats['MaxAmount'],
+            'AvgDuration': cust_stats['AvgDuration'],
+            'UniqueLocations': cust_stats['UniqueLocations'],
+            'AmountDeviation': (float(data['TransactionAmount']) - cust_stats['AvgAmount']) / cust_stats['StdAmount'],
+            'DurationDeviation': (float(data['TransactionDuration']) - cust_stats['AvgDuration']) / cust_stats['AvgDuration'],
+            'TransactionType': 0 if data['TransactionType'] == 'Debit' else 1,
+            'Location': hash(data['Location']) % 100,
+            'DeviceID': hash(data['DeviceID']) % 100,
+            'MerchantID': hash(data['MerchantID']) % 100,
+            'Channel': {'ATM': 0, 'Online': 1, 'Branch': 2}.get(data['Channel'], 0),
+            'CustomerOccupation': {'Student': 0, 'Doctor': 1, 'Engineer': 2, 'Retired': 3}.get(data['CustomerOccupation'], 0)
+        }
+        
+        # Convert to a float32 DataFrame for prediction
+        X = to_model_input(features_dict, features)
     
     # Check for concept drift
-    drift_detector.add_data(X.values[0])
+    with timer.stage('drift'):
+        try:
+            models.drift_detector.add_data(X.values[0])
+        except ValueError as e:
+            # A code that does not fit the int8 drift buffer is left out of
+            # the window; scoring does not depend on it
+            logger.warning(f"Transaction not added to the drift window: {e}")
     
     # Get predictions
-    iso_score = -iso_forest.decision_function(X)[0]
-    xgb_prob = xgb.predict_proba(X)[0, 1]
+    with timer.stage('isolation_forest'):
+        iso_score = -models.iso_forest.decision_function(X)[0]
+    with timer.stage('xgboost'):
+        xgb_prob = models.xgb.predict_proba(X)[0, 1]
     
-    # GNN prediction
-    graph_data = graph_builder.add_transaction(data)
-    with torch.no_grad():
-        gnn_prob = gnn_model(graph_data.x, graph_data.edge_index).item()
+    # GNN prediction on the sampled neighbourhood of the transaction's nodes.
+    # The graph is always updated; sampling and scoring are skipped when
+    # there is no trained model.
+    with timer.stage('gnn'):
+        gnn_model = models.gnn_model
+        gnn_prob = None
+        if gnn_model is None:
+            models.graph_builder.insert_transaction(data)
+        else:
+            import torch
+            graph_data = models.graph_builder.add_transaction(data)
+            with torch.no_grad():
+                gnn_prob = gnn_model(graph_data.x, graph_data.edge_index, graph_data.target_nodes).item()
     
     # SHAP explanations
-    shap_values = shap_explainer.shap_values(X)
-    
-    # Prepare explanation
-    explanation = []
-    for i, feature in enumerate(features):
-        explanation.append({
-            'feature': feature,
-            'value': X.iloc[0, i],
-            'shap_value': shap_values[0][i]
-        })
-    
-    explanation.sort(key=lambda x: abs(x['shap_value']), reverse=True)
+    with timer.stage('shap'):
+        shap_values = models.shap_explainer.shap_values(X)
+        
+        # Prepare explanation
+        explanation = []
+        for i, feature in enumerate(features):
+            explanation.append({
+                'feature': feature,
+                'value': float(X.iloc[0, i]),
+                'shap_value': float(shap_values[0][i])
+            })
+        
+        explanation.sort(key=lambda x: abs(x['shap_value']), reverse=True)
     
     # Composite score weighted by customer risk profile
     cust_risk = cust_profile['risk_score'] if cust_profile else 0.5
-    composite_score = (iso_score * 0.4 + xgb_prob * 0.4 + gnn_prob * 0.2) * (0.5 + cust_risk)
+    if gnn_prob is None:
+        composite_score = (iso_score * 0.5 + xgb_prob * 0.5) * (0.5 + cust_risk)
+    else:
+        composite_score = (iso_score * 0.4 + xgb_prob * 0.4 + gnn_prob * 0.2) * (0.5 + cust_risk)
     
-    return jsonify({
-        'isolation_forest_score': float(iso_score),
-        'xgboost_probability': float(xgb_prob),
-        'gnn_probability': float(gnn_prob),
-        'composite_score': float(composite_score),
-        'customer_risk_score': float(cust_risk) if cust_profile else 0.5,
-        'explanation': explanation[:5],
-        'drift_detected': drift_detector.drift_count > 0
-    })
+    status = 'flagged' if composite_score >= SAR_THRESHOLD else 'approved'
+    TRANSACTIONS_SCORED.labels(status=status).inc()
+    if isinstance(daily_rollup, DailyRollup):
+        daily_rollup.record(transaction_date, status, data['TransactionAmount'], composite_score)
+    
+    # Queue the scored transaction (and alert) for the background writer
+    transaction_id = data.get('TransactionID') or f"TX{uuid.uuid4().hex[:16].upper()}"
+    alert = None
+    if status == 'flagged':
+        top_features = ", ".join(e['feature'] for e in explanation[:3])
+        alert = (transaction_id, 'high_risk_score', 'high' if composite_score >= 0.9 else 'medium',
+                 f"Composite risk score {composite_score:.2f}; top factors: {top_features}")
+    record = (
+        transaction_id, data['AccountID'], float(data['TransactionAmount']), data['TransactionDate'],
+        data['TransactionType'], data.get('Location'), data.get('DeviceID'), data.get('MerchantID'),
+        data.get('Channel'), round(float(composite_score), 4), status
+    )
+    transaction_writer.submit(record, alert)
+    transaction_feed.publish(status, transaction_item(dict(zip(TRANSACTION_COLUMNS, record))))
+    
+    with timer.stage('serialization'):
+        response = jsonify({
+            'transaction_id': transaction_id,
+            'isolation_forest_score': float(iso_score),
+            'xgboost_probability': float(xgb_prob),
+            'gnn_probability': float(gnn_prob) if gnn_prob is not None else None,
+            'composite_score': float(composite_score),
+            'status': status,
+            'customer_risk_score': float(cust_risk) if cust_profile else 0.5,
+            'explanation': explanation[:5],
+            'drift_detected': models.drift_detector.drift_count > 0
+        })
+    timer.finish()
+    slow_requests.record(request.path, timer.elapsed, timer.durations, data)
+    response.headers['Server-Timing'] = timer.server_timing()
+    return response
+
+def transaction_item(row):
+    # Stored transaction row -> the shape the dashboard table uses
+    return {
+        'TransactionID': row['transaction_id'],
+        'AccountID': row['account_id'],
+        'TransactionAmount': float(row['amount']),
+        'TransactionDate': str(row['transaction_date']),
+        'TransactionType': row['transaction_type'],
+        'Location': row['location'],
+        'RiskScore': float(row['risk_score']) if row['risk_score'] is not None else None,
+        'Status': row['status']
+    }
 
 @app.route('/api/transactions')
 def get_recent_transactions():
-    # In production, this would query a database
-    sample_data = [
-        {
-            'TransactionID': 'TX000001',
-            'AccountID': 'AC00128',
-            'TransactionAmount': 14.09,
-            'TransactionDate': '2023-04-11 16:29:14',
-            'TransactionType': 'Debit',
-            'Location': 'San Diego',
-            'RiskScore': 0.85,
-            'Status': 'Flagged'
-        },
-        {
-            'TransactionID': 'TX000002',
-            'AccountID': 'AC00455',
-            'TransactionAmount': 376.24,
-            'TransactionDate': '2023-06-27 16:44:19',
-            'TransactionType': 'Debit',
-            'Location': 'Houston',
-            'RiskScore': 0.42,
-            'Status': 'Approved'
-        }
-    ]
-    return jsonify(sample_data)
+    # Newest first; pass next_cursor back as ?cursor= for the following page
+    try:
+        rows, next_cursor = transaction_writer.store.list_transactions(
+            limit=max(1, min(request.args.get('limit', 50, type=int), 500)),
+            cursor=request.args.get('cursor'),
+            status=request.args.get('status'),
+            risk_band=request.args.get('risk_band'),
+            account_id=request.args.get('account_id'),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"items": [transaction_item(row) for row in rows], "next_cursor": next_cursor})
+
+@app.route('/api/transactions/stream')
+def stream_transactions():
+    # Server-Sent Events; each client has a bounded queue that drops the
+    # oldest events when the client falls behind
+    subscription = transaction_feed.subscribe()
+    if subscription is None:
+        return jsonify({"error": "Too many live feed connections"}), 503
+    response = Response(transaction_feed.stream(subscription), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    response.call_on_close(lambda: transaction_feed.unsubscribe(subscription))
+    return response
 
 @app.route('/api/reports/sar', methods=['POST'])
 def generate_sar_report():
     data = request.json
-    report_path = f"reports/sar_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    report_generator.generate_sar(
-        data['transactions'],
-        data['customer_info'],
-        report_path
-    )
-    return send_file(report_path, as_attachment=True)
+    report_path = f"reports/sar_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.pdf"
+    job_id = report_jobs.submit('sar', report_path, data['transactions'], data['customer_info'])
+    return jsonify({
+        "job_id": job_id,
+        "status_url": f"/api/reports/jobs/{job_id}",
+        "download_url": f"/api/reports/jobs/{job_id}/download"
+    }), 202
+
+@app.route('/api/reports/daily-summary', methods=['POST'])
+def generate_daily_summary_report():
+    data = request.get_json(silent=True) or {}
+    try:
+        stats = daily_rollup.day(data.get('date'))
+    except ValueError:
+        return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+    report_path = f"reports/daily_summary_{stats['date']}_{datetime.now().strftime('%H%M%S_%f')}.pdf"
+    job_id = report_jobs.submit('daily_summary', report_path, stats)
+    return jsonify({
+        "job_id": job_id,
+        "status_url": f"/api/reports/jobs/{job_id}",
+        "download_url": f"/api/reports/jobs/{job_id}/download"
+    }), 202
+
+@app.route('/api/summary/daily')
+def get_daily_summary():
+    # Reads the rollup counters: one entry per day, no transaction scan
+    days = max(1, min(request.args.get('days', 30, type=int), 366))
+    return jsonify({"days": daily_rollup.days(days)})
+
+@app.route('/api/reports/jobs/<job_id>')
+def get_report_job(job_id):
+    status = report_jobs.status(job_id)
+    if status is None:
+        return jsonify({"error": "Job not found"}), 404
+    status.pop('output_path', None)
+    return jsonify(status)
+
+@app.route('/api/reports/jobs/<job_id>/download')
+def download_report(job_id):
+    status = report_jobs.status(job_id)
+    if status is None:
+        return jsonify({"error": "Job not found"}), 404
+    if status['status'] != 'done':
+        return jsonify(status), 409
+    return send_file(os.path.abspath(status['output_path']), as_attachment=True)
 
 @app.route('/api/customer/<customer_id>/profile')
 def get_customer_profile(customer_id):
-    profile = profiler.get_risk_profile(customer_id)
+    profile = models.profiler.get_risk_profile(customer_id)
     if profile:
         return jsonify(profile)
     return jsonify({"error": "Customer not found"}), 404
@@ -209,6 +408,7 @@ def get_customer_profile(customer_id):
 @app.route('/api/models/retrain', methods=['POST'])
 def trigger_retraining():
     try:
+        from models.automl.trainer import AutoMLTrainer
         trainer = AutoMLTrainer("data/bank_transactions_data_2.csv")
         best_model, score = trainer.train_models()
         return jsonify({
@@ -221,18 +421,91 @@ def trigger_retraining():
 
 @app.route('/api/drift/status')
 def get_drift_status():
+    drift_detector = models.drift_detector
     return jsonify({
         "drift_detected": drift_detector.drift_count > 0,
         "drift_count": drift_detector.drift_count
     })
 
+@app.route('/metrics')
+def metrics():
+    body, content_type = metrics_response()
+    return Response(body, content_type=content_type)
+
+def require_admin():
+    # Without ADMIN_TOKEN the admin surface does not exist
+    if not ADMIN_TOKEN:
+        abort(404)
+    if request.headers.get('Authorization') != f"Bearer {ADMIN_TOKEN}":
+        abort(401)
+
+@app.route('/admin/profiler/start', methods=['POST'])
+def start_profiler():
+    require_admin()
+    try:
+        seconds = float(request.args.get('seconds', 30))
+        interval_ms = float(request.args.get('interval_ms', 10))
+    except ValueError:
+        return jsonify({"error": "seconds and interval_ms must be numbers"}), 400
+    try:
+        sampling_profiler.start(seconds, interval=interval_ms / 1000)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except ProfilerBusy as e:
+        return jsonify({"error": str(e), **sampling_profiler.status()}), 409
+    return jsonify(sampling_profiler.status()), 202
+
+@app.route('/admin/profiler/stop', methods=['POST'])
+def stop_profiler():
+    require_admin()
+    sampling_profiler.stop()
+    return Response(sampling_profiler.collapsed(), mimetype='text/plain')
+
+@app.route('/admin/profiler')
+def get_profile():
+    # Collapsed stacks of the current or last session; ?status=1 for progress only
+    require_admin()
+    if request.args.get('status'):
+        return jsonify(sampling_profiler.status())
+    return Response(sampling_profiler.collapsed(), mimetype='text/plain')
+
+@app.route('/admin/slow-requests', methods=['GET', 'DELETE'])
+def get_slow_requests():
+    require_admin()
+    if request.method == 'DELETE':
+        slow_requests.clear()
+        return '', 204
+    return jsonify({
+        "threshold_ms": slow_requests.threshold_ms,
+        "captured": slow_requests.captured,
+        "requests": slow_requests.entries()
+    })
+
+@app.route('/health/ready')
+def readiness():
+    # Report ready only once the warm-up thread has loaded every model
+    if not models.ready.is_set():
+        return jsonify({
+            "status": "failed" if models.failures else "warming_up",
+            "loaded": sorted(models.load_times),
+            "failed": dict(models.failures)
+        }), 503
+    return jsonify({
+        "status": "ready",
+        "load_times": {name: round(t, 3) for name, t in models.load_times.items()}
+    })
+
 if __name__ == '__main__':
     # Create required directories
     import os
     os.makedirs("reports", exist_ok=True)
     os.makedirs("data", exist_ok=True)
     
-    # Initialize MLflow
-    mlflow.set_tracking_uri("http://localhost:5000")
+    # MLflow is configured by AutoMLTrainer when a training run starts.
+    # The reloader doubles boot time, so it only runs when FLASK_DEBUG is set,
+    # and background tasks start in the serving process only.
+    use_reloader = os.environ.get("FLASK_DEBUG") == "1"
+    if not use_reloader or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        create_app()
     
-    app.run(debug=True, host='0.0.0.0', port=5050)
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5050, use_reloader=use_reloader)
\ No newline at end of file
@@ -0,0 +1,293 @@
+"""
+Latency and throughput benchmark for the scoring endpoints.
+
+Drives an endpoint with synthetic transactions at a fixed concurrency,
+in the dashboard request schema or, for the gateway's /predict paths (or
+with --schema model), in the model schema of shap_api.Transaction,
+either in-process through Flask's test client (no network, placeholder
+models, throwaway SQLite database) or over HTTP against a running server.
+Reports p50/p95/p99 and throughput for the whole request and for every
+stage the server reports in its Server-Timing header, and can compare the
+result with a stored baseline.
+
+Usage (from the fraud/ directory):
+    # Offline, in-process, against placeholder models
+    python -m benchmarks.load --requests 2000 --concurrency 8 --output results.json
+
+    # The scoring gateway, 4 model-schema transactions per /predict/batch request
+    python -m benchmarks.load --url http://localhost:8000 --path /predict/batch --batch-size 4
+
+    # Record a baseline, then fail (exit 1) when a later run regresses by >20%
+    python -m benchmarks.load --save-baseline benchmarks/baseline.json
+    python -m benchmarks.load --baseline benchmarks/baseline.json --tolerance 0.2
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.synthetic import generate_transactions, to_model_schema, APP_DATE_FORMAT, FORM_DATE_FORMAT
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 95, 99)
+# Paths that take shap_api.Transaction rows rather than dashboard form data
+MODEL_SCHEMA_PATHS = ('/predict', '/predict/batch')
+
+
+def parse_server_timing(header):
+    """'xgboost;dur=1.25, shap;dur=3.1' -> {'xgboost': 0.00125, 'shap': 0.0031} (seconds)."""
+    stages = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if name and key == "dur":
+                stages[name] = float(value) / 1000.0
+    return stages
+
+
+class InProcessClient:
+    """Calls a Flask app directly; measures the app, not the network."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def post(self, path, payload):
+        response = self.client.post(path, json=payload)
+        return response.status_code, response.headers.get('Server-Timing')
+
+
+class HttpClient:
+    def __init__(self, base_url, timeout=30):
+        import requests
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        self.timeout = timeout
+
+    def post(self, path, payload):
+        response = self.session.post(self.base_url + path, json=payload, timeout=self.timeout)
+        return response.status_code, response.headers.get('Server-Timing')
+
+
+def load_inprocess_app(target, model_dir=None, workdir=None):
+    """
+    Import app.py or api.py with placeholder models, no background threads
+    and a throwaway SQLite database. Runs from `workdir` so profile and
+    report files stay out of the source tree.
+    """
+    fraud_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if fraud_dir not in sys.path:
+        sys.path.insert(0, fraud_dir)
+    workdir = workdir or tempfile.mkdtemp(prefix="fraud-bench-")
+    if model_dir is None:
+        from benchmarks.placeholder_models import build_placeholder_models
+        model_dir = build_placeholder_models(os.path.join(workdir, "models"))
+    os.environ['FRAUD_MODEL_DIR'] = os.path.abspath(model_dir)
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    os.environ['FRAUD_WARMUP'] = 'false'
+    os.environ['FRAUD_AUTO_RETRAIN'] = 'false'
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    os.chdir(workdir)
+
+    if target == 'api':
+        import api
+        return api.app
+    import app as app_module
+    app_module.create_app()
+    # Load models now so the first measured request is not a cold start
+    app_module.models.warm_up()
+    return app_module.app
+
+
+def summarize(latencies, wall_seconds=None):
+    latencies = np.asarray(latencies, dtype=np.float64)
+    if latencies.size == 0:
+        return {'count': 0}
+    summary = {
+        'count': int(latencies.size),
+        'mean_ms': float(latencies.mean() * 1000),
+        'max_ms': float(latencies.max() * 1000),
+    }
+    for p, value in zip(PERCENTILES, np.percentile(latencies, PERCENTILES)):
+        summary[f'p{p}_ms'] = float(value * 1000)
+    if wall_seconds:
+        summary['throughput_rps'] = float(latencies.size / wall_seconds)
+    return summary
+
+
+def run_load(make_client, path, payloads, concurrency=8, warmup=20):
+    """
+    Send every payload once, spread over `concurrency` threads each with its
+    own client. Returns the summary dict for the request and each stage.
+    """
+    for payload in payloads[:warmup]:
+        make_client().post(path, payload)
+    payloads = payloads[warmup:]
+
+    latencies, stage_latencies, errors = [], {}, {}
+    lock = threading.Lock()
+    next_index = iter(range(len(payloads)))
+
+    def worker():
+        client = make_client()
+        local_latencies, local_stages, local_errors = [], {}, {}
+        while True:
+            with lock:
+                i = next(next_index, None)
+            if i is None:
+                break
+            start = time.perf_counter()
+            try:
+                status, timing = client.post(path, payloads[i])
+            except Exception as e:
+                local_errors[type(e).__name__] = local_errors.get(type(e).__name__, 0) + 1
+                continue
+            elapsed = time.perf_counter() - start
+            if status >= 400:
+                local_errors[str(status)] = local_errors.get(str(status), 0) + 1
+                continue
+            local_latencies.append(elapsed)
+            for stage, seconds in parse_server_timing(timing).items():
+                local_stages.setdefault(stage, []).append(seconds)
+        with lock:
+            latencies.extend(local_latencies)
+            for stage, values in local_stages.items():
+                stage_latencies.setdefault(stage, []).extend(values)
+            for key, count in local_errors.items():
+                errors[key] = errors.get(key, 0) + count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    wall = time.perf_counter() - started
+
+    return {
+        'request': summarize(latencies, wall),
+        'stages': {stage: summarize(values) for stage, values in sorted(stage_latencies.items())},
+        # False when successful responses carried no Server-Timing stages
+        'stages_available': bool(stage_latencies) or not latencies,
+        'errors': errors,
+        'wall_seconds': wall,
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance=0.2, metrics=('p50_ms', 'p95_ms', 'p99_ms')):
+    """
+    List of regressions: latency metrics more than `tolerance` above the
+    baseline, or throughput more than `tolerance` below it.
+    """
+    regressions = []
+
+    def check(label, current, base):
+        for metric in metrics:
+            if metric in current and metric in base and current[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{label} {metric}: {base[metric]:.2f} -> {current[metric]:.2f}")
+        if 'throughput_rps' in current and 'throughput_rps' in base \
+                and current['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{label} throughput_rps: {base['throughput_rps']:.1f} -> "
+                               f"{current['throughput_rps']:.1f}")
+
+    check('request', results['request'], baseline.get('request', {}))
+    for stage, current in results['stages'].items():
+        if stage in baseline.get('stages', {}):
+            check(stage, current, baseline['stages'][stage])
+    return regressions
+
+
+def print_report(results):
+    rows = [('request', results['request'])] + list(results['stages'].items())
+    print(f"{'':22}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>10}")
+    for name, s in rows:
+        if not s.get('count'):
+            continue
+        print(f"{name:22}{s['count']:>8}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}"
+              f"{s.get('throughput_rps', 0):>10.1f}")
+    if not results.get('stages_available', True):
+        print("stages: unavailable (the server sent no Server-Timing header)")
+    if results['errors']:
+        print(f"errors: {results['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fraud scoring endpoints")
+    parser.add_argument('--url', help="Benchmark a running server; in-process when omitted")
+    parser.add_argument('--target', choices=('app', 'api'), default='app', help="In-process app module")
+    parser.add_argument('--model-dir', help="In-process models; placeholder models are fitted when omitted")
+    parser.add_argument('--path', default='/api/analyze')
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help="Transactions per request; >1 posts {'transactions': [...]} to a batch endpoint")
+    parser.add_argument('--schema', choices=('request', 'model'),
+                        help="Payload schema; 'model' for /predict and /predict/batch, 'request' otherwise")
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write results as JSON")
+    parser.add_argument('--baseline', help="Compare against this results JSON; exit 1 on regression")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--save-baseline', help="Write these results as the new baseline")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    # The in-process run changes directory, so pin file arguments first
+    for name in ('model_dir', 'output', 'baseline', 'save_baseline'):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+    date_format = FORM_DATE_FORMAT if args.target == 'api' and not args.url else APP_DATE_FORMAT
+    transactions = generate_transactions((args.requests + args.warmup) * args.batch_size,
+                                         seed=args.seed, date_format=date_format)
+    schema = args.schema or ('model' if args.path.rstrip('/') in MODEL_SCHEMA_PATHS else 'request')
+    if schema == 'model':
+        transactions = to_model_schema(transactions, date_format)
+    if args.batch_size > 1:
+        payloads = [{'transactions': transactions[i:i + args.batch_size]}
+                    for i in range(0, len(transactions), args.batch_size)]
+    else:
+        payloads = transactions
+
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+        mode = 'http'
+    else:
+        app = load_inprocess_app(args.target, args.model_dir)
+        make_client = lambda: InProcessClient(app)
+        mode = 'inprocess'
+
+    results = run_load(make_client, args.path, payloads, args.concurrency, args.warmup)
+    results['config'] = {
+        'mode': mode, 'url': args.url, 'target': args.target, 'path': args.path,
+        'schema': schema, 'batch_size': args.batch_size, 'requests': args.requests, 'concurrency': args.concurrency,
+        'python': platform.python_version(), 'machine': platform.machine(), 'timestamp': time.time(),
+    }
+    print_report(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,350 @@
+"""
+Per-call cost of the stateful scoring components as their history grows.
+
+TransactionGraphBuilder.add_transaction, CustomerRiskProfiler.update_profile
+and ConceptDriftDetector.add_data all keep state across requests. This
+suite brings each one to 1k, 100k and 10M accumulated events and then
+times individual calls, so a cost that grows with history (rather than
+with the request) shows up as a slope across levels. Each level also
+reports the state's memory footprint.
+
+State is built the cheapest way that leaves it identical to serving that
+many events:
+  - graph: insert_transaction for every event (no subgraph sampling)
+  - profiler: the profiles dict is built in bulk, without saving on every
+    event, then written once
+  - drift: only the events that decide the detector's state are fed (the
+    first window becomes the reference, later windows only move the
+    position in the current one)
+
+Levels whose build would take longer than --time-budget are skipped and
+recorded with the projected build time.
+
+Usage (from the fraud/ directory):
+    python -m benchmarks.micro --output micro.json
+    python -m benchmarks.micro --components profiler drift --levels 1000 100000
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEVELS = (1_000, 100_000, 10_000_000)
+PERCENTILES = (50, 99)
+BUILD_CHUNK = 10_000
+
+
+def rss_bytes():
+    """Current resident set size, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def summarize_calls(durations):
+    durations = np.asarray(durations, dtype=np.float64) * 1e6
+    summary = {
+        'calls': int(durations.size),
+        'mean_us': float(durations.mean()),
+        'max_us': float(durations.max()),
+    }
+    for p, value in zip(PERCENTILES, np.percentile(durations, PERCENTILES)):
+        summary[f'p{p}_us'] = float(value)
+    return summary
+
+
+def time_calls(call, calls, time_limit):
+    """Time up to `calls` invocations of call(i), stopping early after `time_limit` seconds."""
+    durations = []
+    deadline = time.perf_counter() + time_limit
+    for i in range(calls):
+        start = time.perf_counter()
+        call(i)
+        durations.append(time.perf_counter() - start)
+        if time.perf_counter() > deadline:
+            break
+    return durations
+
+
+class SyntheticEvents:
+    """
+    Compact transaction stream: entity populations grow with the number of
+    events, like a real customer base, instead of saturating at a fixed size.
+    """
+
+    def __init__(self, seed=0, events_per_account=20, events_per_device=10, events_per_merchant=500):
+        self.rng = np.random.default_rng(seed)
+        self.events_per_account = events_per_account
+        self.events_per_device = events_per_device
+        self.events_per_merchant = events_per_merchant
+
+    def population(self, total_events):
+        return (max(1, total_events // self.events_per_account),
+                max(1, total_events // self.events_per_merchant),
+                max(1, total_events // self.events_per_device))
+
+    def chunk(self, n, total_events):
+        """n events drawn from the populations of a history of total_events."""
+        accounts, merchants, devices = self.population(total_events)
+        return (self.rng.integers(0, accounts, n), self.rng.integers(0, merchants, n),
+                self.rng.integers(0, devices, n), np.round(self.rng.lognormal(5.0, 1.2, n), 2))
+
+    @staticmethod
+    def transactions(chunk):
+        accounts, merchants, devices, amounts = chunk
+        return [{'AccountID': f"AC{a:08d}", 'MerchantID': f"M{m:06d}", 'DeviceID': f"D{d:08d}",
+                 'TransactionAmount': float(x), 'TransactionType': 'Debit'}
+                for a, m, d, x in zip(accounts.tolist(), merchants.tolist(), devices.tolist(), amounts.tolist())]
+
+
+class GraphBench:
+    name = 'graph.add_transaction'
+
+    def __init__(self, events, workdir):
+        from graph_models.data_loader import TransactionGraphBuilder
+        self.builder = TransactionGraphBuilder()
+        self.events = events
+        self.accumulated = 0
+
+    def build(self, target, deadline):
+        """Insert events up to `target`; False if the deadline passes first."""
+        while self.accumulated < target:
+            n = min(BUILD_CHUNK, target - self.accumulated)
+            for transaction in self.events.transactions(self.events.chunk(n, target)):
+                self.builder.insert_transaction(transaction)
+            self.accumulated += n
+            if time.perf_counter() > deadline:
+                return False
+        return True
+
+    def measure(self, calls, time_limit):
+        transactions = self.events.transactions(self.events.chunk(calls, self.accumulated))
+        durations = time_calls(lambda i: self.builder.add_transaction(transactions[i]), calls, time_limit)
+        self.accumulated += len(durations)
+        return durations
+
+    def state(self):
+        b = self.builder
+        arrays = (b._x, b._edges, b.node_types, b._txn_count, b._amount_sum)
+        # Neighbour lists and the key index are Python objects; count the
+        # containers (ints below 257 are shared, larger ones are not)
+        lists = sum(sys.getsizeof(n) for n in b.neighbors) + sys.getsizeof(b.neighbors)
+        index = sys.getsizeof(b.node_index) + sum(sys.getsizeof(k) for k in b.node_index)
+        return {'nodes': b.current_id, 'edges': b.num_edges,
+                'array_bytes': int(sum(a.nbytes for a in arrays)),
+                'neighbor_list_bytes': lists, 'node_index_bytes': index}
+
+
+class ProfilerBench:
+    name = 'profiler.update_profile'
+
+    def __init__(self, events, workdir):
+        from profiling.builder import CustomerRiskProfiler
+        self.storage_path = os.path.join(workdir, "customer_profiles.json")
+        self.profiler = CustomerRiskProfiler(storage_path=self.storage_path)
+        self.events = events
+        self.accumulated = 0
+
+    def build(self, target, deadline):
+        """
+        Fold events into the profiles the way update_profile does, minus the
+        save per event, then save once.
+        """
+        profiles = self.profiler.profiles
+        now = "2024-01-01T00:00:00"
+        while self.accumulated < target:
+            n = min(BUILD_CHUNK, target - self.accumulated)
+            accounts, _, _, amounts = self.events.chunk(n, target)
+            for account, amount in zip(accounts.tolist(), amounts.tolist()):
+                customer_id = f"AC{account:08d}"
+                profile = profiles.get(customer_id)
+                if profile is None:
+                    profile = profiles[customer_id] = {
+                        "first_seen": now, "last_activity": now, "transaction_count": 0,
+                        "total_amount": 0, "risk_score": 0.5, "behavior_pattern": {}, "flags": []}
+                profile['transaction_count'] += 1
+                profile['total_amount'] += amount
+                pattern = profile['behavior_pattern']
+                pattern['Debit'] = pattern.get('Debit', 0) + 1
+            self.accumulated += n
+            if time.perf_counter() > deadline:
+                return False
+        self.profiler._save_profiles()
+        return True
+
+    def measure(self, calls, time_limit):
+        accounts, _, _, amounts = self.events.chunk(calls, self.accumulated)
+        durations = time_calls(
+            lambda i: self.profiler.update_profile(f"AC{accounts[i]:08d}",
+                                                   {'amount': float(amounts[i]), 'type': 'Debit'}),
+            calls, time_limit)
+        self.accumulated += len(durations)
+        return durations
+
+    def state(self):
+        return {'profiles': len(self.profiler.profiles),
+                'storage_file_bytes': os.path.getsize(self.storage_path)
+                if os.path.exists(self.storage_path) else 0}
+
+
+class DriftBench:
+    name = 'drift.add_data'
+
+    def __init__(self, events, workdir, n_features=19, categorical=(13, 14, 15, 16, 17, 18)):
+        from drift.detector import ConceptDriftDetector
+        self.detector = ConceptDriftDetector(categorical_index=list(categorical))
+        self.rng = events.rng
+        self.n_features = n_features
+        self.categorical = list(categorical)
+        self.accumulated = 0
+
+    def rows(self, n):
+        rows = self.rng.normal(size=(n, self.n_features)).astype(np.float32)
+        rows[:, self.categorical] = self.rng.integers(0, 100, (n, len(self.categorical)))
+        return rows
+
+    def build(self, target, deadline):
+        """
+        The first window_size + 1 events fill the reference; after that the
+        detector cycles every window_size + 1 events, so only the position
+        in the current cycle needs feeding.
+        """
+        cycle = self.detector.window_size + 1
+        if target <= cycle:
+            fed = target - self.accumulated
+        elif self.accumulated < cycle:
+            fed = cycle - self.accumulated + (target - cycle) % cycle
+        else:
+            fed = ((target - cycle) - (self.accumulated - cycle)) % cycle
+        for row in self.rows(fed):
+            self.detector.add_data(row)
+        self.accumulated = target
+        return True
+
+    def measure(self, calls, time_limit):
+        rows = self.rows(calls)
+        durations = time_calls(lambda i: self.detector.add_data(rows[i]), calls, time_limit)
+        self.accumulated += len(durations)
+        return durations
+
+    def state(self):
+        d = self.detector
+        arrays = [a for a in (d.reference_window, d.current_window, d._codes) if a is not None]
+        return {'window_size': d.window_size, 'window_position': d._count,
+                'array_bytes': int(sum(a.nbytes for a in arrays))}
+
+
+COMPONENTS = {'graph': GraphBench, 'profiler': ProfilerBench, 'drift': DriftBench}
+# Drift runs its statistical tests once per window, so a run has to span a
+# whole window to include one
+DEFAULT_CALLS = {'graph': 1000, 'profiler': 200, 'drift': 2002}
+
+
+def run_component(name, levels, calls=None, time_budget=600.0, measure_budget=60.0, seed=0, trace=False):
+    """Results for one component at each level, smallest first."""
+    workdir = tempfile.mkdtemp(prefix=f"fraud-micro-{name}-")
+    events = SyntheticEvents(seed=seed)
+    results = []
+    try:
+        bench = COMPONENTS[name](events, workdir)
+        calls = calls or DEFAULT_CALLS[name]
+        build_rate = None
+        for level in sorted(levels):
+            to_build = max(0, level - bench.accumulated)
+            if build_rate and to_build / build_rate > time_budget:
+                results.append({'events': level, 'skipped': True,
+                                'projected_build_seconds': round(to_build / build_rate, 1)})
+                logger.warning(f"{bench.name}: skipping {level:,} events "
+                               f"(~{to_build / build_rate:.0f}s to build, budget {time_budget:.0f}s)")
+                continue
+
+            if trace:
+                tracemalloc.start()
+            rss_before = rss_bytes()
+            started = time.perf_counter()
+            completed = bench.build(level, started + time_budget)
+            build_seconds = time.perf_counter() - started
+            if to_build and build_seconds > 0:
+                built = to_build if completed else max(1, bench.accumulated - (level - to_build))
+                build_rate = built / build_seconds
+            if not completed:
+                results.append({'events': level, 'skipped': True, 'reached_events': bench.accumulated,
+                                'projected_build_seconds': round(to_build / build_rate, 1)})
+                logger.warning(f"{bench.name}: build to {level:,} events exceeded {time_budget:.0f}s")
+                if trace:
+                    tracemalloc.stop()
+                break
+
+            result = {'events': level, 'build_seconds': round(build_seconds, 3)}
+            result.update(summarize_calls(bench.measure(calls, measure_budget)))
+            result['state'] = bench.state()
+            rss_after = rss_bytes()
+            if rss_before is not None and rss_after is not None:
+                result['rss_growth_bytes'] = rss_after - rss_before
+            if trace:
+                result['traced_bytes'] = tracemalloc.get_traced_memory()[0]
+                tracemalloc.stop()
+            results.append(result)
+            logger.info(f"{bench.name} @ {level:,}: mean {result['mean_us']:.1f}us "
+                        f"p99 {result['p99_us']:.1f}us max {result['max_us']:.1f}us")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def print_report(results):
+    print(f"{'component':26}{'events':>12}{'calls':>8}{'mean us':>12}{'p50 us':>12}{'p99 us':>12}{'max us':>12}")
+    for name, levels in results.items():
+        for r in levels:
+            if r.get('skipped'):
+                print(f"{name:26}{r['events']:>12,}  skipped (~{r['projected_build_seconds']:.0f}s to build)")
+                continue
+            print(f"{name:26}{r['events']:>12,}{r['calls']:>8}{r['mean_us']:>12.1f}{r['p50_us']:>12.1f}"
+                  f"{r['p99_us']:>12.1f}{r['max_us']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-call cost of stateful components versus history size")
+    parser.add_argument('--components', nargs='+', choices=sorted(COMPONENTS), default=sorted(COMPONENTS))
+    parser.add_argument('--levels', nargs='+', type=int, default=list(DEFAULT_LEVELS),
+                        help="Accumulated events to measure at")
+    parser.add_argument('--calls', type=int, help="Timed calls per level (default depends on the component)")
+    parser.add_argument('--time-budget', type=float, default=600.0,
+                        help="Seconds allowed for building one level's state")
+    parser.add_argument('--measure-budget', type=float, default=60.0,
+                        help="Seconds allowed for the timed calls of one level")
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help="Also report Python-allocated bytes (slows the build considerably)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write results as JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    results = {}
+    for name in args.components:
+        results[COMPONENTS[name].name] = run_component(
+            name, args.levels, args.calls, args.time_budget, args.measure_budget, args.seed, args.tracemalloc)
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({'results': results, 'config': {
+                'levels': sorted(args.levels), 'calls': args.calls, 'time_budget': args.time_budget,
+                'python': platform.python_version(), 'machine': platform.machine(), 'timestamp': time.time(),
+            }}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
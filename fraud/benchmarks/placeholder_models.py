@@ -0,0 +1,72 @@
+"""
+Small models with the same interfaces as the trained ones, fitted on
+synthetic data in a few seconds. They let the benchmarks (and anyone
+without the training data) run the full scoring path offline.
+
+Usage (from the fraud/ directory):
+    python -m benchmarks.placeholder_models --out /tmp/fraud-models [--artifacts]
+"""
+import argparse
+import logging
+import os
+
+import joblib
+
+from benchmarks.synthetic import feature_matrix
+
+logger = logging.getLogger(__name__)
+
+# Same order as app.py's `features`
+APP_FEATURES = ['TransactionAmount', 'TransactionDuration', 'LoginAttempts',
+                'AccountBalance', 'DaysSinceLastTransaction', 'TransactionSpeed',
+                'AvgAmount', 'StdAmount', 'MaxAmount', 'AvgDuration', 'UniqueLocations',
+                'AmountDeviation', 'DurationDeviation', 'TransactionType',
+                'Location', 'DeviceID', 'MerchantID', 'Channel', 'CustomerOccupation']
+
+
+def build_placeholder_models(model_dir, n_samples=5000, n_estimators=50, seed=0, artifacts=False):
+    """
+    Fit and save isolation_forest, xgboost, random_forest and shap_explainer
+    into model_dir. With artifacts=True the tree models are also exported
+    to the memory-mapped format, so the benchmark covers that load path.
+    """
+    import shap
+    from sklearn.ensemble import IsolationForest, RandomForestClassifier
+    from xgboost import XGBClassifier
+
+    os.makedirs(model_dir, exist_ok=True)
+    X, y = feature_matrix(n_samples, APP_FEATURES, seed=seed)
+
+    iso_forest = IsolationForest(n_estimators=n_estimators, random_state=seed).fit(X)
+    xgb = XGBClassifier(n_estimators=n_estimators, max_depth=4, eval_metric='logloss',
+                        random_state=seed).fit(X, y)
+    random_forest = RandomForestClassifier(n_estimators=n_estimators, max_depth=8,
+                                           random_state=seed).fit(X, y)
+    shap_explainer = shap.TreeExplainer(xgb)
+
+    for name, model in (('isolation_forest', iso_forest), ('xgboost', xgb),
+                        ('random_forest', random_forest), ('shap_explainer', shap_explainer)):
+        joblib.dump(model, os.path.join(model_dir, f"{name}.pkl"))
+
+    if artifacts:
+        from serving.artifacts import export_model
+        for name in ('isolation_forest', 'xgboost', 'random_forest', 'shap_explainer'):
+            export_model(model_dir, name)
+
+    logger.info(f"Placeholder models written to {model_dir} ({n_samples} synthetic rows, {int(y.sum())} positive)")
+    return model_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit placeholder scoring models on synthetic data")
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--samples', type=int, default=5000)
+    parser.add_argument('--estimators', type=int, default=50)
+    parser.add_argument('--artifacts', action='store_true', help="Also export memory-mapped artifacts")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    build_placeholder_models(args.out, args.samples, args.estimators, artifacts=args.artifacts)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Synthetic transactions in the request schema of app.py / api.py, the
+model schema of shap_api.py / gateway.py, and the CSV schema the trainers
+read. Deterministic for a given seed so benchmark
+runs are comparable.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+TRANSACTION_TYPES = ['Debit', 'Credit']
+CHANNELS = ['ATM', 'Online', 'Branch']
+OCCUPATIONS = ['Student', 'Doctor', 'Engineer', 'Retired']
+LOCATIONS = ['San Diego', 'Houston', 'Mesa', 'Raleigh', 'Atlanta', 'Oklahoma City', 'Seattle',
+             'Indianapolis', 'Detroit', 'Nashville', 'Albuquerque', 'Memphis', 'Denver', 'Austin']
+
+APP_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'   # app.py
+FORM_DATE_FORMAT = '%Y-%m-%dT%H:%M'     # api.py (dashboard form input)
+
+
+def generate_transactions(n, seed=0, num_accounts=500, num_merchants=100, num_devices=800,
+                          start=datetime(2023, 1, 1), date_format=APP_DATE_FORMAT):
+    """List of n request payloads for /api/analyze."""
+    rng = np.random.default_rng(seed)
+    accounts = rng.integers(0, num_accounts, n)
+    # A few heavy-tailed amounts, like the real data
+    amounts = np.round(rng.lognormal(mean=5.0, sigma=1.2, size=n), 2)
+    offsets = np.sort(rng.integers(0, 365 * 24 * 3600, n))
+    gaps = rng.integers(3600, 30 * 24 * 3600, n)
+    durations = rng.integers(10, 300, n)
+    logins = rng.choice([1, 1, 1, 1, 2, 3, 5], n)
+    balances = np.round(rng.uniform(100, 15000, n), 2)
+    ages = rng.integers(18, 80, n)
+    merchants = rng.integers(0, num_merchants, n)
+    devices = rng.integers(0, num_devices, n)
+    types = rng.integers(0, len(TRANSACTION_TYPES), n)
+    channels = rng.integers(0, len(CHANNELS), n)
+    occupations = rng.integers(0, len(OCCUPATIONS), n)
+    locations = rng.integers(0, len(LOCATIONS), n)
+
+    transactions = []
+    for i in range(n):
+        date = start + timedelta(seconds=int(offsets[i]))
+        transactions.append({
+            'TransactionID': f"TX{seed:03d}{i:09d}",
+            'AccountID': f"AC{accounts[i]:05d}",
+            'TransactionAmount': float(amounts[i]),
+            'TransactionDate': date.strftime(date_format),
+            'PreviousTransactionDate': (date - timedelta(seconds=int(gaps[i]))).strftime(date_format),
+            'TransactionType': TRANSACTION_TYPES[types[i]],
+            'Location': LOCATIONS[locations[i]],
+            'DeviceID': f"D{devices[i]:06d}",
+            'MerchantID': f"M{merchants[i]:03d}",
+            'Channel': CHANNELS[channels[i]],
+            'CustomerAge': int(ages[i]),
+            'CustomerOccupation': OCCUPATIONS[occupations[i]],
+            'TransactionDuration': int(durations[i]),
+            'LoginAttempts': int(logins[i]),
+            'AccountBalance': float(balances[i]),
+        })
+    return transactions
+
+
+def to_model_schema(transactions, date_format=APP_DATE_FORMAT):
+    """
+    generate_transactions output in shap_api's Transaction schema (the body
+    of /predict and the items of /predict/batch). PurchaseFrequency is the
+    account's number of transactions in the list, as in load_account_transactions.
+    """
+    frequency = {}
+    for t in transactions:
+        frequency[t['AccountID']] = frequency.get(t['AccountID'], 0) + 1
+    rows = []
+    for t in transactions:
+        date = datetime.strptime(t['TransactionDate'], date_format)
+        rows.append({
+            'TransactionID': t['TransactionID'],
+            'TransactionAmount': t['TransactionAmount'],
+            'TransactionHour': date.hour,
+            'TransactionDay': date.day,
+            'TransactionMonth': date.month,
+            'TransactionYear': date.year,
+            'TransactionDuration': t['TransactionDuration'],
+            'CustomerAge': t['CustomerAge'],
+            'AccountBalance': t['AccountBalance'],
+            'LoginAttempts': t['LoginAttempts'],
+            'PurchaseFrequency': frequency[t['AccountID']],
+        })
+    return rows
+
+
+def feature_matrix(n, feature_names, seed=0):
+    """
+    (X, y) in the engineered feature layout the scoring models take, with
+    labels from simple amount/login/speed rules so the models have signal.
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    amount = rng.lognormal(5.0, 1.2, n)
+    duration = rng.integers(10, 300, n).astype(float)
+    logins = rng.choice([1, 1, 1, 1, 2, 3, 5], n)
+    avg_amount = rng.uniform(50, 500, n)
+    std_amount = avg_amount * rng.uniform(0.2, 0.8, n)
+    avg_duration = rng.uniform(60, 180, n)
+    columns = {
+        'TransactionAmount': amount,
+        'TransactionDuration': duration,
+        'LoginAttempts': logins,
+        'AccountBalance': rng.uniform(100, 15000, n),
+        'DaysSinceLastTransaction': rng.integers(0, 60, n),
+        'TransactionSpeed': amount / duration,
+        'AvgAmount': avg_amount,
+        'StdAmount': std_amount,
+        'MaxAmount': avg_amount + 3 * std_amount,
+        'AvgDuration': avg_duration,
+        'UniqueLocations': rng.integers(1, 8, n),
+        'AmountDeviation': (amount - avg_amount) / std_amount,
+        'DurationDeviation': (duration - avg_duration) / avg_duration,
+        'TransactionType': rng.integers(0, 2, n),
+        'Location': rng.integers(0, 100, n),
+        'DeviceID': rng.integers(0, 100, n),
+        'MerchantID': rng.integers(0, 100, n),
+        'Channel': rng.integers(0, 3, n),
+        'CustomerOccupation': rng.integers(0, 4, n),
+        'CustomerAge': rng.integers(18, 80, n),
+    }
+    X = pd.DataFrame({name: columns[name] for name in feature_names}).astype(np.float32)
+    y = ((columns['AmountDeviation'] > 3) | (logins >= 3) | (columns['TransactionSpeed'] > 50)).astype(int)
+    return X, y
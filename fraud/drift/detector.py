@@ -3,29 +3,53 @@ from scipy.stats import ks_2samp
 from sklearn.covariance import MinCovDet
 import warnings
 
+from serving.features import quantize_codes
+
 class ConceptDriftDetector:
-    def __init__(self, window_size=1000):
+    def __init__(self, window_size=1000, dtype=np.float32, categorical_index=None):
         self.window_size = window_size
+        self.dtype = dtype
+        # Columns holding small categorical codes (which must fit in -128..127)
+        # are kept as int8
+        self.categorical_index = list(categorical_index or [])
         self.reference_window = None
-        self.current_window = []
+        self.current_window = None
+        self._codes = None
+        self._count = 0
         self.drift_count = 0
     
+    def _allocate(self, n_features):
+        self._numeric_index = [i for i in range(n_features) if i not in self.categorical_index]
+        self.current_window = np.empty((self.window_size, len(self._numeric_index)), dtype=self.dtype)
+        self._codes = np.empty((self.window_size, len(self.categorical_index)), dtype=np.int8)
+    
+    def _window_matrix(self):
+        # Reassemble the numeric and quantized columns in their original order
+        n_features = len(self._numeric_index) + len(self.categorical_index)
+        window = np.empty((self.window_size, n_features), dtype=self.dtype)
+        window[:, self._numeric_index] = self.current_window
+        window[:, self.categorical_index] = self._codes
+        return window
+    
     def add_data(self, features):
-        if self.reference_window is None:
-            if len(self.current_window) < self.window_size:
-                self.current_window.append(features)
-            else:
-                self.reference_window = np.array(self.current_window)
-                self.current_window = []
+        features = np.asarray(features)
+        if self.current_window is None:
+            self._allocate(len(features))
+        
+        if self._count < self.window_size:
+            self.current_window[self._count] = features[self._numeric_index]
+            # Raises ValueError rather than wrapping codes outside int8
+            self._codes[self._count] = quantize_codes(features[self.categorical_index])
+            self._count += 1
+        elif self.reference_window is None:
+            self.reference_window = self._window_matrix()
+            self._count = 0
         else:
-            if len(self.current_window) < self.window_size:
-                self.current_window.append(features)
-            else:
-                self._test_for_drift()
-                self.current_window = []
+            self._test_for_drift()
+            self._count = 0
     
     def _test_for_drift(self):
-        current_data = np.array(self.current_window)
+        current_data = self._window_matrix()
         
         # 1. Kolmogorov-Smirnov test for each feature
         p_values = []
@@ -37,10 +61,12 @@ class ConceptDriftDetector:
                 p_values.append(1.0)
         
         # 2. Covariance shift detection
-        robust_cov = MinCovDet().fit(self.reference_window)
+        # The covariance fit is done in float64 for numerical stability
+        reference = self.reference_window.astype(np.float64)
+        robust_cov = MinCovDet().fit(reference)
         try:
-            cov_score = robust_cov.mahalanobis(current_data).mean()
-            cov_threshold = robust_cov.mahalanobis(self.reference_window).mean() * 1.5
+            cov_score = robust_cov.mahalanobis(current_data.astype(np.float64)).mean()
+            cov_threshold = robust_cov.mahalanobis(reference).mean() * 1.5
         except:
             cov_score = 0
             cov_threshold = 0
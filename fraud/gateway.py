@@ -0,0 +1,189 @@
+"""
+Scoring gateway: fraud scoring, SHAP explanations and NLP risk scoring in
+one async process.
+
+The SHAP (shap_api.py) and NLP (nlp_api.py) routes are served unchanged,
+and the fraud models are loaded once through serving.scoring.shared_model,
+so the three services share a single copy of each model. /score answers
+all three for one transaction in a single round trip.
+
+    uvicorn gateway:app --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Query, Response
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+
+import nlp_api
+import shap_api
+from serving.scoring import FraudScorer, load_account_transactions, summarize_batch
+from serving.explainers import top_features
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+app = FastAPI(
+    title="Fraud Scoring Gateway",
+    description="Fraud scoring, SHAP explanations and NLP risk scoring with shared models.",
+    version="1.0.0"
+)
+
+MODEL_DIR = os.environ.get('FRAUD_MODEL_DIR', 'models')
+# Raw transactions for /predict/batch requests by account and date range
+TRANSACTIONS_CSV = os.environ.get('TRANSACTIONS_CSV', 'data/bank_transactions_data_2.csv')
+MAX_BATCH_ROWS = int(os.environ.get('GATEWAY_MAX_BATCH_ROWS', 10000))
+
+try:
+    # The random forest and SHAP explainer are the instances shap_api already loaded
+    scorer = FraudScorer(MODEL_DIR)
+    logger.info("Fraud models loaded successfully.")
+except Exception as e:
+    logger.error(f"Error loading fraud models: {e}")
+    scorer = None
+
+class ScoreRequest(BaseModel):
+    transaction: shap_api.Transaction
+    text: Optional[str] = Field(None, examples=["URGENT: Claim your prize now!"],
+                                description="Memo or merchant text to score with the NLP model")
+
+class BatchTransaction(shap_api.Transaction):
+    TransactionID: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    """Either explicit transactions, or an account and optional date range to load them for."""
+    transactions: Optional[List[BatchTransaction]] = Field(None, max_length=MAX_BATCH_ROWS)
+    account_id: Optional[str] = Field(None, examples=["AC00128"])
+    start: Optional[str] = Field(None, examples=["2023-01-01"], description="Inclusive start date/time")
+    end: Optional[str] = Field(None, examples=["2023-12-31"], description="Inclusive end date/time")
+
+def require_scorer():
+    if scorer is None:
+        raise HTTPException(status_code=503, detail="Fraud models not loaded")
+
+@app.get("/ready")
+def readiness(response: Response):
+    # Ready when the fraud models are loaded and the NLP model has warmed up
+    status = {
+        "fraud_models": scorer is not None,
+        "shap_explainer": shap_api.explainer is not None,
+        "nlp_model": nlp_api.model_ready.is_set(),
+    }
+    if not all(status.values()):
+        response.status_code = 503
+        return {"status": "warming_up", **status}
+    return {"status": "ready", **status}
+
+@app.post("/api/analyze")
+async def analyze_transaction(data: Dict[str, Any]):
+    """api.py's /api/analyze: composite score and SHAP values for a dashboard form transaction."""
+    require_scorer()
+    return await run_in_threadpool(scorer.analyze, data)
+
+@app.post("/predict")
+async def predict(transaction: shap_api.Transaction):
+    """Fraud prediction and probability from the random forest."""
+    require_scorer()
+    results = await run_in_threadpool(scorer.predict, [transaction.model_dump()])
+    return results[0]
+
+def predict_and_explain(row, mode, top_k):
+    input_df = pd.DataFrame([row], columns=scorer.feature_names)
+    prediction = scorer.predict([row])[0]
+    base_value, shap_values = shap_api.explain_frame(input_df, mode)
+    values = shap_values[0]
+    if top_k:
+        explanation = {"top_features": top_features(values, list(scorer.feature_names),
+                                                    input_df.iloc[0].to_numpy(), k=top_k)}
+    else:
+        explanation = {"shap_values": values.tolist(), "feature_names": list(scorer.feature_names)}
+    return prediction, {"mode": mode, "base_value": base_value, **explanation}
+
+def score_batch(rows, ids, mode, top_n):
+    predictions = scorer.predict(rows)
+    _, shap_values = shap_api.explain_frame(pd.DataFrame(rows, columns=scorer.feature_names), mode)
+    summary = summarize_batch(ids, predictions, shap_values, list(scorer.feature_names), top_n=top_n)
+    return predictions, shap_values, summary
+
+@app.post("/predict/batch")
+async def predict_batch(request: BatchRequest,
+                        mode: Optional[str] = Query("fast", description="SHAP mode: exact, fast or summary"),
+                        top_n: int = Query(10, ge=1, le=100, description="Riskiest transactions to list"),
+                        include_results: bool = Query(True, description="Per-transaction results as well as the summary")):
+    """
+    Scores and explains many transactions in one vectorized pass and returns
+    an aggregate summary: counts by risk band, the riskiest transactions and
+    the dominant SHAP features.
+    """
+    require_scorer()
+    if shap_api.explainer_modes is None:
+        raise HTTPException(status_code=503, detail="SHAP explainer not loaded")
+    mode, top_k = shap_api.resolve_mode(mode, None)
+
+    if request.transactions is not None:
+        rows = [t.model_dump(exclude={"TransactionID"}) for t in request.transactions]
+        ids = [t.TransactionID if t.TransactionID is not None else i for i, t in enumerate(request.transactions)]
+    elif request.account_id:
+        try:
+            loaded = await run_in_threadpool(load_account_transactions, TRANSACTIONS_CSV,
+                                             request.account_id, request.start, request.end)
+        except (FileNotFoundError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if len(loaded) > MAX_BATCH_ROWS:
+            raise HTTPException(status_code=413, detail=f"{len(loaded)} transactions; narrow the date range "
+                                                        f"(limit {MAX_BATCH_ROWS})")
+        ids = [row.pop("TransactionID") for row in loaded]
+        rows = loaded
+    else:
+        raise HTTPException(status_code=400, detail="Provide transactions or an account_id")
+
+    response = {"mode": mode, "count": len(rows)}
+    if not rows:
+        return {**response, "summary": summarize_batch([], [], None, list(scorer.feature_names))}
+    predictions, shap_values, summary = await run_in_threadpool(score_batch, rows, ids, mode, top_n)
+    response["summary"] = summary
+    if include_results:
+        names = list(scorer.feature_names)
+        response["results"] = [
+            {"id": ids[i], **predictions[i],
+             "top_features": top_features(shap_values[i], names, k=top_k or len(names))}
+            for i in range(len(rows))
+        ]
+    return response
+
+async def nlp_score(text):
+    try:
+        return (await nlp_api.score_texts([text]))[0]
+    except HTTPException as e:
+        # A cold or overloaded NLP model should not fail the fraud answer
+        return {"error": e.detail}
+
+@app.post("/score")
+async def score(request: ScoreRequest,
+                mode: Optional[str] = Query(None, description="SHAP mode: exact, fast or summary"),
+                top_k: Optional[int] = Query(None, ge=0, description="0 for all features")):
+    """
+    Fraud prediction, SHAP explanation and (when `text` is given) NLP risk
+    score for one transaction, computed concurrently.
+    """
+    require_scorer()
+    if shap_api.explainer_modes is None:
+        raise HTTPException(status_code=503, detail="SHAP explainer not loaded")
+    mode, top_k = shap_api.resolve_mode(mode, top_k)
+
+    fraud_task = run_in_threadpool(predict_and_explain, request.transaction.model_dump(), mode, top_k)
+    if request.text is not None:
+        (prediction, explanation), nlp = await asyncio.gather(fraud_task, nlp_score(request.text))
+    else:
+        (prediction, explanation), nlp = await fraud_task, None
+    return {"fraud": prediction, "shap": explanation, "nlp": nlp}
+
+# The SHAP and NLP services' own routes (/shap_explain, /shap_explain/stream,
+# /nlp-score, /nlp-score/batch, /metrics, ...) and their startup/shutdown
+# hooks; routes defined above take precedence
+app.include_router(shap_api.app.router)
+app.include_router(nlp_api.app.router)
@@ -1,38 +1,147 @@
+import numpy as np
 import torch
 from torch_geometric.data import Data
-from collections import defaultdict
+
+ACCOUNT, MERCHANT, DEVICE = 0, 1, 2
+NUM_NODE_TYPES = 3
+
+
+def node_feature_matrix(node_types, txn_count, amount_sum):
+    """
+    Per-node features: node type one-hot, log transaction count, log total
+    amount and log mean amount. Shared by the incremental builder and the
+    offline trainer so both feed the model identical inputs. No feature is
+    derived from fraud labels: serving never sees confirmed labels, so a
+    label feature would only leak the target during training.
+    """
+    txn_count = np.asarray(txn_count, dtype=np.float64)
+    amount_sum = np.asarray(amount_sum, dtype=np.float64)
+    x = np.zeros((len(txn_count), TransactionGraphBuilder.NUM_NODE_FEATURES), dtype=np.float32)
+    x[np.arange(len(txn_count)), np.asarray(node_types, dtype=np.int64)] = 1.0
+    x[:, 3] = np.log1p(txn_count)
+    x[:, 4] = np.log1p(np.maximum(amount_sum, 0.0))
+    x[:, 5] = np.log1p(np.maximum(amount_sum, 0.0) / np.maximum(txn_count, 1.0))
+    return x
+
 
 class TransactionGraphBuilder:
-    def __init__(self):
-        self.node_index = defaultdict(int)
+    NUM_NODE_TYPES = NUM_NODE_TYPES
+    NUM_NODE_FEATURES = NUM_NODE_TYPES + 3
+
+    def __init__(self, initial_capacity=1024, num_hops=2, fanout=25):
+        self.node_index = {}
         self.current_id = 0
-        self.edges = []
-        self.node_features = []
-        self.node_types = []
-        
+        self.num_edges = 0
+        # Sampling used when scoring: the model has two GCN layers, so a
+        # two-hop neighbourhood capped at `fanout` recent neighbours per node
+        # covers everything that influences the transaction's nodes
+        self.num_hops = num_hops
+        self.fanout = fanout
+        # Node features and edges live in preallocated float32/int64 arrays
+        # that grow geometrically, instead of Python lists that were copied
+        # into new tensors on every transaction
+        self._x = np.zeros((initial_capacity, self.NUM_NODE_FEATURES), dtype=np.float32)
+        self._edges = np.zeros((initial_capacity, 2), dtype=np.int64)
+        self.node_types = np.zeros(initial_capacity, dtype=np.int8)
+        # Running aggregates, updated on every edge insert
+        self._txn_count = np.zeros(initial_capacity, dtype=np.int64)
+        self._amount_sum = np.zeros(initial_capacity, dtype=np.float64)
+        self.neighbors = []
+
+    @staticmethod
+    def _grow(array, needed):
+        if needed <= len(array):
+            return array
+        grown = np.zeros((max(needed, 2 * len(array)),) + array.shape[1:], dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    @property
+    def node_features(self):
+        return self._x[:self.current_id]
+
+    @property
+    def edges(self):
+        return self._edges[:self.num_edges]
+
     def get_node_id(self, node_key, node_type):
-        if node_key not in self.node_index:
-            self.node_index[node_key] = self.current_id
+        node_id = self.node_index.get(node_key)
+        if node_id is None:
+            node_id = self.node_index[node_key] = self.current_id
+            needed = node_id + 1
+            self._x = self._grow(self._x, needed)
+            self.node_types = self._grow(self.node_types, needed)
+            self._txn_count = self._grow(self._txn_count, needed)
+            self._amount_sum = self._grow(self._amount_sum, needed)
+            self._x[node_id, node_type] = 1.0
+            self.node_types[node_id] = node_type
+            self.neighbors.append([])
             self.current_id += 1
-            # Simple feature representation
-            self.node_features.append([1.0 if i == node_type else 0.0 for i in range(3)])
-            self.node_types.append(node_type)
-        return self.node_index[node_key]
-    
-    def add_transaction(self, transaction):
-        # Account node (type 0)
-        acc_id = self.get_node_id(transaction['AccountID'], 0)
-        # Merchant node (type 1)
-        merchant_id = self.get_node_id(transaction['MerchantID'], 1)
-        # Device node (type 2)
-        device_id = self.get_node_id(transaction['DeviceID'], 2)
-        
+        return node_id
+
+    def _refresh_features(self, node_ids):
+        node_ids = np.asarray(node_ids)
+        self._x[node_ids] = node_feature_matrix(
+            self.node_types[node_ids], self._txn_count[node_ids], self._amount_sum[node_ids])
+
+    def _transaction_nodes(self, transaction):
+        return (self.get_node_id(transaction['AccountID'], ACCOUNT),
+                self.get_node_id(transaction['MerchantID'], MERCHANT),
+                self.get_node_id(transaction['DeviceID'], DEVICE))
+
+    def insert_transaction(self, transaction):
+        """Add a transaction's nodes and edges and update their aggregates."""
+        acc_id, merchant_id, device_id = nodes = self._transaction_nodes(transaction)
+
         # Add edges
-        self.edges.append((acc_id, merchant_id))
-        self.edges.append((acc_id, device_id))
-        
-        # Convert to PyG format
-        edge_index = torch.tensor(list(zip(*self.edges)), dtype=torch.long)
-        x = torch.tensor(self.node_features, dtype=torch.float)
-        
-        return Data(x=x, edge_index=edge_index)
\ No newline at end of file
+        self._edges = self._grow(self._edges, self.num_edges + 2)
+        self._edges[self.num_edges] = (acc_id, merchant_id)
+        self._edges[self.num_edges + 1] = (acc_id, device_id)
+        self.num_edges += 2
+        self.neighbors[acc_id].extend((merchant_id, device_id))
+        self.neighbors[merchant_id].append(acc_id)
+        self.neighbors[device_id].append(acc_id)
+
+        # Only the three touched nodes change
+        ids = list(nodes)
+        self._txn_count[ids] += 1
+        self._amount_sum[ids] += float(transaction.get('TransactionAmount', 0.0))
+        self._refresh_features(ids)
+        return nodes
+
+    def subgraph(self, seeds):
+        """
+        Sampled computation graph around `seeds` with local ids; the seeds
+        come first, so data.target_nodes is simply 0..len(seeds)-1.
+        """
+        nodes = list(seeds)
+        local = {node: i for i, node in enumerate(nodes)}
+        src, dst = [], []
+        frontier = nodes
+        for _ in range(self.num_hops):
+            next_frontier = []
+            for node in frontier:
+                # Most recent neighbours first; duplicates keep edge multiplicity
+                for neighbor in self.neighbors[node][-self.fanout:]:
+                    if neighbor not in local:
+                        local[neighbor] = len(nodes)
+                        nodes.append(neighbor)
+                        next_frontier.append(neighbor)
+                    src.append(local[neighbor])
+                    dst.append(local[node])
+            frontier = next_frontier
+
+        x = torch.from_numpy(self._x[nodes])
+        edge_index = torch.tensor([src, dst], dtype=torch.long)
+        target_nodes = torch.arange(len(seeds), dtype=torch.long)
+        return Data(x=x, edge_index=edge_index, target_nodes=target_nodes)
+
+    def add_transaction(self, transaction):
+        nodes = self.insert_transaction(transaction)
+        return self.subgraph(nodes)
+
+    def to_data(self):
+        """The whole graph in PyG format, with edges in both directions."""
+        edges = torch.from_numpy(self.edges).t()
+        edge_index = torch.cat([edges, edges.flip(0)], dim=1)
+        return Data(x=torch.from_numpy(self.node_features), edge_index=edge_index)
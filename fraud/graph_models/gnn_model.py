@@ -3,43 +3,83 @@ import torch.nn as nn
 import torch.nn.functional as F
 from torch_geometric.nn import GCNConv
 import os
+import logging
+
+logger = logging.getLogger(__name__)
 
 class FraudGNN(nn.Module):
     def __init__(self, num_node_features, hidden_channels):
         super(FraudGNN, self).__init__()
+        self.num_node_features = num_node_features
+        self.hidden_channels = hidden_channels
         self.conv1 = GCNConv(num_node_features, hidden_channels)
         self.conv2 = GCNConv(hidden_channels, hidden_channels)
         self.classifier = nn.Linear(hidden_channels, 1)
-        
-    def forward(self, x, edge_index):
+
+    def forward(self, x, edge_index, target_nodes=None):
         # Node embeddings
         x = self.conv1(x, edge_index)
         x = F.relu(x)
         x = F.dropout(x, training=self.training)
         x = self.conv2(x, edge_index)
-        
-        # Graph-level classification
-        x = torch.mean(x, dim=0)  # Global mean pooling
+
+        if target_nodes is None:
+            # Graph-level classification
+            x = torch.mean(x, dim=0)  # Global mean pooling
+        else:
+            # Transaction-level classification: pool the embeddings of the
+            # transaction's account/merchant/device nodes. target_nodes is
+            # (3,) for one transaction or (batch, 3) for many.
+            x = x[target_nodes].mean(dim=-2)
         x = self.classifier(x)
         return torch.sigmoid(x)
 
-def load_gnn_model(model_path='trained_models/gnn_model.pt', device='cpu'):
-    # Create models directory if it doesn't exist
-    os.makedirs('models', exist_ok=True)
-    
-    # Initialize model
-    model = FraudGNN(num_node_features=32, hidden_channels=64)
-    
-    try:
-        # Try to load pretrained weights
-        model.load_state_dict(torch.load(model_path))
-        print(f"Loaded GNN model from {model_path}")
-    except FileNotFoundError:
-        # If no model exists, initialize with random weights and save
-        print(f"No model found at {model_path}, creating new model")
-        torch.save(model.state_dict(), model_path)
-        print(f"New model saved to {model_path}")
-    
+def save_gnn_checkpoint(model, model_path, **metadata):
+    os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+    torch.save({
+        'state_dict': model.state_dict(),
+        'num_node_features': model.num_node_features,
+        'hidden_channels': model.hidden_channels,
+        **metadata
+    }, model_path)
+
+def load_gnn_model(model_path='trained_models/gnn_model.pt', device='cpu', num_node_features=None):
+    """
+    Load a trained FraudGNN checkpoint.
+
+    The input dimension comes from TransactionGraphBuilder unless given.
+    Returns None when there is no checkpoint or it was trained on a
+    different feature layout, so callers skip GNN scoring instead of
+    running random or mismatched weights.
+    """
+    if num_node_features is None:
+        from graph_models.data_loader import TransactionGraphBuilder
+        num_node_features = TransactionGraphBuilder.NUM_NODE_FEATURES
+
+    if not os.path.exists(model_path):
+        logger.warning(f"No GNN checkpoint at {model_path}; GNN scoring is disabled. "
+                       f"Train one with graph_models/train_gnn.py")
+        return None
+
+    checkpoint = torch.load(model_path, map_location=device)
+    if 'state_dict' in checkpoint:
+        state_dict = checkpoint['state_dict']
+        hidden_channels = checkpoint.get('hidden_channels', 64)
+    else:
+        # Bare state dict from older versions
+        state_dict = checkpoint
+        hidden_channels = state_dict['classifier.weight'].shape[1]
+
+    trained_features = state_dict['conv1.lin.weight'].shape[1]
+    if trained_features != num_node_features:
+        logger.warning(f"GNN checkpoint {model_path} expects {trained_features} node features "
+                       f"but the graph builder produces {num_node_features}; GNN scoring is disabled")
+        return None
+
+    model = FraudGNN(num_node_features=num_node_features, hidden_channels=hidden_channels)
+    model.load_state_dict(state_dict)
+    logger.info(f"Loaded GNN model from {model_path}")
+
     model.to(device)
     model.eval()
-    return model
\ No newline at end of file
+    return model
@@ -1,73 +1,272 @@
-from flask import Flask, render_template, request, jsonify
-import pandas as pd
-import joblib
-import os
+"""
+Train FraudGNN on the transaction graph and write a checkpoint that
+load_gnn_model() accepts.
+
+Graphs are built from the CSV with vectorized numpy ops and kept in CSR
+form. The split is chronological: training batches are sampled from a
+graph of the training-period transactions only, so their node aggregates
+and neighbourhoods never include the later validation period, and
+validation is scored on the graph of all transactions. Training runs on neighbour-sampled mini-batches: each batch
+only materialises the sampled computation graph of its transactions, so
+memory is bounded by batch size and fan-out rather than by graph size.
+Batches are sampled in DataLoader worker processes.
+
+Usage (from the fraud/ directory):
+    python -m graph_models.train_gnn --data data/bank_transactions_data_2.csv \
+        --out models/gnn_model.pt --batch-size 512 --fanouts 25 25 --workers 4
+"""
+import argparse
 import logging
+import os
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn.functional as F
+from torch.utils.data import Dataset, DataLoader
+
+from graph_models.data_loader import (TransactionGraphBuilder, node_feature_matrix,
+                                      ACCOUNT, MERCHANT, DEVICE)
+from graph_models.gnn_model import FraudGNN, save_gnn_checkpoint
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-
-# --- Load ONLY the XGBoost model and its SHAP explainer ---
-try:
-    xgb_model = joblib.load('models/xgboost.pkl')
-    shap_explainer = joblib.load('models/shap_explainer.pkl')
-    
-    # Get the exact feature list required by this specific model
-    MODEL_FEATURES = xgb_model.feature_names_in_
-    
-    logger.info("XGBoost model and SHAP explainer loaded successfully.")
-except FileNotFoundError as e:
-    logger.error(f"Model file not found: {e}. Please ensure 'xgboost.pkl' and 'shap_explainer.pkl' are in the 'models/' directory.")
-    exit()
-except Exception as e:
-    logger.error(f"An error occurred during model loading: {e}")
-    exit()
-
-@app.route('/')
-def dashboard():
-    return render_template('dashboard.html')
-
-@app.route('/api/analyze', methods=['POST'])
-def analyze_transaction():
-    data = request.json
-    
-    # --- Create a simple dictionary from the form data ---
-    # This directly matches the features the model expects.
-    features_dict = {
-        'TransactionAmount': float(data.get('TransactionAmount', 0)),
-        'TransactionDuration': float(data.get('TransactionDuration', 60)),
-        'LoginAttempts': int(data.get('LoginAttempts', 1)),
-        'AccountBalance': float(data.get('AccountBalance', 1000)),
-        'DaysSinceLastTransaction': int(data.get('DaysSinceLastTransaction', 1))
-    }
-    
-    # --- Create a DataFrame with only the features this model needs ---
-    # We create a dictionary with default value 0 for any feature not in our simple form
-    X_data = {key: [features_dict.get(key, 0)] for key in MODEL_FEATURES}
-    X = pd.DataFrame(X_data, columns=MODEL_FEATURES)
-    
-    # --- Get prediction and SHAP values ---
-    xgb_prob = xgb_model.predict_proba(X)[0, 1]
-    
-    shap_values_list = shap_explainer.shap_values(X)
-    # The structure of shap_values can vary, we try to handle both list and single array cases
-    fraud_shap_values = shap_values_list[1][0] if isinstance(shap_values_list, list) else shap_values_list[0]
-    
-    base_value = shap_explainer.expected_value
-    # Handle case where expected_value is an array for multi-class classification
-    if hasattr(base_value, "__len__"):
-        base_value = base_value[1]
-
-    return jsonify({
-        'xgboost_probability': float(xgb_prob),
-        'shap_base_value': base_value,
-        'shap_values': fraud_shap_values.tolist(),
-        'feature_names': MODEL_FEATURES.tolist(),
-        'feature_values': X.iloc[0].values.tolist()
-    })
+
+def load_labeled_transactions(data_path):
+    df = pd.read_csv(data_path)
+    if 'TransactionDate' in df.columns:
+        df = df.sort_values('TransactionDate', kind='stable').reset_index(drop=True)
+    if 'is_fraud' not in df.columns:
+        # Same synthetic labelling rules as the AutoML trainer
+        from models.automl.trainer import AutoMLTrainer
+        logger.warning("'is_fraud' column not found, generating synthetic labels")
+        df['is_fraud'] = AutoMLTrainer(data_path)._generate_fraud_labels(df)
+    return df
+
+
+def _concat_ranges(starts, counts):
+    """np.concatenate([np.arange(s, s + c) for s, c in zip(starts, counts)]) without the loop."""
+    counts = np.asarray(counts, dtype=np.int64)
+    total = int(counts.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(np.asarray(starts, dtype=np.int64) - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(total, dtype=np.int64)
+
+
+class TransactionGraph:
+    """
+    Transaction graph of `df` in array form: node features matching
+    TransactionGraphBuilder, an undirected CSR adjacency and the
+    account/merchant/device node ids of every transaction.
+    """
+
+    def __init__(self, df):
+        acc, accounts = pd.factorize(df['AccountID'])
+        mer, merchants = pd.factorize(df['MerchantID'])
+        dev, devices = pd.factorize(df['DeviceID'])
+        mer = mer + len(accounts)
+        dev = dev + len(accounts) + len(merchants)
+        self.num_nodes = len(accounts) + len(merchants) + len(devices)
+        self.targets = np.stack([acc, mer, dev], axis=1).astype(np.int64)
+
+        node_types = np.repeat([ACCOUNT, MERCHANT, DEVICE], [len(accounts), len(merchants), len(devices)])
+        touched = self.targets.ravel()
+        amount = np.repeat(df['TransactionAmount'].to_numpy(dtype=np.float64), 3)
+        self.x = node_feature_matrix(
+            node_types,
+            np.bincount(touched, minlength=self.num_nodes),
+            np.bincount(touched, weights=amount, minlength=self.num_nodes),
+        )
+
+        # account-merchant and account-device edges, stored in both directions
+        src = np.concatenate([acc, acc, mer, dev]).astype(np.int64)
+        dst = np.concatenate([mer, dev, acc, acc]).astype(np.int64)
+        order = np.argsort(src, kind='stable')
+        self.col = dst[order]
+        self.rowptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=self.num_nodes), out=self.rowptr[1:])
+        self.num_edges = len(src)
+
+
+class NeighborSampler:
+    """Uniform per-hop neighbour sampling over a CSR adjacency."""
+
+    def __init__(self, rowptr, col, fanouts):
+        self.rowptr = rowptr
+        self.col = col
+        self.fanouts = fanouts
+
+    def sample(self, seeds, rng):
+        """
+        Returns (nodes, edge_index, seed_index): global ids of the sampled
+        nodes, local edges (neighbour -> centre) and the local ids of seeds.
+        """
+        frontier = np.unique(seeds)
+        visited = frontier
+        src_parts, dst_parts = [], []
+        for fanout in self.fanouts:
+            if len(frontier) == 0:
+                break
+            start = self.rowptr[frontier]
+            degree = self.rowptr[frontier + 1] - start
+
+            # Low-degree nodes keep all their neighbours
+            small = degree <= fanout
+            src_small = self.col[_concat_ranges(start[small], degree[small])]
+            dst_small = np.repeat(frontier[small], degree[small])
+
+            # Hubs get `fanout` neighbours drawn uniformly
+            big = ~small
+            picks = rng.integers(0, degree[big][:, None], size=(int(big.sum()), fanout))
+            src_big = self.col[(start[big][:, None] + picks).ravel()]
+            dst_big = np.repeat(frontier[big], fanout)
+
+            src = np.concatenate([src_small, src_big])
+            src_parts.append(src)
+            dst_parts.append(np.concatenate([dst_small, dst_big]))
+            frontier = np.setdiff1d(np.unique(src), visited, assume_unique=True)
+            visited = np.union1d(visited, frontier)
+
+        src = np.concatenate(src_parts) if src_parts else np.zeros(0, dtype=np.int64)
+        dst = np.concatenate(dst_parts) if dst_parts else np.zeros(0, dtype=np.int64)
+        # visited is sorted, so searchsorted relabels global ids to local ones
+        edge_index = np.stack([np.searchsorted(visited, src), np.searchsorted(visited, dst)])
+        seed_index = np.searchsorted(visited, seeds)
+        return visited, edge_index, seed_index
+
+
+class SampledTransactionBatches(Dataset):
+    """
+    Each item is a whole mini-batch: the sampled subgraph around a batch of
+    transactions. Used with DataLoader(batch_size=None) so sampling runs in
+    the worker processes.
+    """
+
+    def __init__(self, graph, labels, transaction_idx, batch_size, fanouts, shuffle=True, seed=42):
+        self.graph = graph
+        self.labels = labels
+        self.transaction_idx = np.asarray(transaction_idx)
+        self.batch_size = batch_size
+        self.sampler = NeighborSampler(graph.rowptr, graph.col, fanouts)
+        self.shuffle = shuffle
+        self.seed = seed
+        self.set_epoch(0)
+
+    def set_epoch(self, epoch):
+        # Called before each epoch's DataLoader iterator is created, so the
+        # workers pick up the new order when the dataset is sent to them
+        self.epoch = epoch
+        if self.shuffle:
+            self.order = np.random.default_rng((self.seed, epoch)).permutation(self.transaction_idx)
+        else:
+            self.order = self.transaction_idx
+
+    def __len__(self):
+        return (len(self.order) + self.batch_size - 1) // self.batch_size
+
+    def __getitem__(self, i):
+        batch = self.order[i * self.batch_size:(i + 1) * self.batch_size]
+        # Seeded per (epoch, batch) so results do not depend on the worker count
+        rng = np.random.default_rng((self.seed, self.epoch, i))
+        nodes, edge_index, seed_index = self.sampler.sample(self.graph.targets[batch], rng)
+        return {
+            'x': torch.from_numpy(self.graph.x[nodes]),
+            'edge_index': torch.from_numpy(edge_index),
+            'target_nodes': torch.from_numpy(seed_index),
+            'y': torch.from_numpy(self.labels[batch]),
+        }
+
+
+def roc_auc(y_true, y_score):
+    from sklearn.metrics import roc_auc_score
+    if len(np.unique(y_true)) < 2:
+        return float('nan')
+    return roc_auc_score(y_true, y_score)
+
+
+def evaluate(model, loader):
+    model.eval()
+    scores, labels = [], []
+    with torch.no_grad():
+        for batch in loader:
+            prob = model(batch['x'], batch['edge_index'], batch['target_nodes']).squeeze(-1)
+            scores.append(prob.numpy())
+            labels.append(batch['y'].numpy())
+    return roc_auc(np.concatenate(labels), np.concatenate(scores))
+
+
+def train(data_path, out_path, epochs=20, hidden_channels=64, lr=0.01, batch_size=512,
+          fanouts=(25, 25), workers=0, val_fraction=0.2, seed=42):
+    torch.manual_seed(seed)
+    df = load_labeled_transactions(data_path)
+    # Chronological split: the newest transactions are held out
+    num_train = int(len(df) * (1 - val_fraction))
+    train_mask = np.arange(len(df)) < num_train
+
+    # Rows are in date order, so the training graph is the prefix up to the
+    # split: it holds no validation-period aggregates or edges. Validation
+    # transactions are scored on the graph of everything, as serving would
+    # see them after the validation period.
+    train_graph = TransactionGraph(df.iloc[:num_train])
+    graph = TransactionGraph(df)
+    labels = df['is_fraud'].to_numpy(dtype=np.float32)
+    logger.info(f"Graph: {train_graph.num_nodes} nodes, {train_graph.num_edges} directed edges up to the split, "
+                f"{graph.num_nodes} nodes, {graph.num_edges} directed edges in all; "
+                f"{num_train} train / {len(df) - num_train} validation transactions")
+
+    train_set = SampledTransactionBatches(train_graph, labels, np.flatnonzero(train_mask), batch_size, fanouts,
+                                          seed=seed)
+    val_set = SampledTransactionBatches(graph, labels, np.flatnonzero(~train_mask), batch_size, fanouts,
+                                        shuffle=False, seed=seed)
+    loader_args = {'batch_size': None, 'num_workers': workers}
+    val_loader = DataLoader(val_set, **loader_args)
+
+    model = FraudGNN(num_node_features=TransactionGraphBuilder.NUM_NODE_FEATURES, hidden_channels=hidden_channels)
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr, weight_decay=5e-4)
+    # Fraud is rare; weight positives so the model does not collapse to 0
+    positives = max(float(labels[train_mask].sum()), 1.0)
+    pos_weight = (float(train_mask.sum()) - positives) / positives
+
+    auc = float('nan')
+    for epoch in range(1, epochs + 1):
+        train_set.set_epoch(epoch)
+        model.train()
+        total_loss = 0.0
+        for batch in DataLoader(train_set, **loader_args):
+            optimizer.zero_grad()
+            prob = model(batch['x'], batch['edge_index'], batch['target_nodes']).squeeze(-1)
+            weights = torch.where(batch['y'] > 0, torch.tensor(pos_weight), torch.tensor(1.0))
+            loss = F.binary_cross_entropy(prob, batch['y'], weight=weights)
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item() * len(batch['y'])
+
+        auc = evaluate(model, val_loader)
+        logger.info(f"Epoch {epoch:03d} loss={total_loss / max(int(train_mask.sum()), 1):.4f} val_auc={auc:.4f}")
+
+    save_gnn_checkpoint(model, out_path, val_auc=float(auc), epochs=epochs, fanouts=list(fanouts))
+    logger.info(f"Saved GNN checkpoint to {out_path}")
+    return model, auc
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the transaction-graph FraudGNN with neighbour sampling")
+    parser.add_argument('--data', default='data/bank_transactions_data_2.csv')
+    parser.add_argument('--out', default=os.path.join(os.environ.get('FRAUD_MODEL_DIR', 'models'), 'gnn_model.pt'))
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--hidden', type=int, default=64)
+    parser.add_argument('--lr', type=float, default=0.01)
+    parser.add_argument('--batch-size', type=int, default=512)
+    parser.add_argument('--fanouts', type=int, nargs='+', default=[25, 25],
+                        help="Neighbours sampled per hop; one value per GCN layer")
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1),
+                        help="DataLoader worker processes used for sampling")
+    args = parser.parse_args()
+    train(args.data, args.out, epochs=args.epochs, hidden_channels=args.hidden, lr=args.lr,
+          batch_size=args.batch_size, fanouts=args.fanouts, workers=args.workers)
+
 
 if __name__ == '__main__':
-    os.makedirs("models", exist_ok=True)
-    app.run(debug=True, host='0.0.0.0', port=5050)
+    main()
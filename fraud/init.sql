@@ -58,22 +58,108 @@ CREATE TABLE IF NOT EXISTS model_performance (
 );
 
 -- Create indexes for better performance
-CREATE INDEX IF NOT EXISTS idx_transactions_account_id ON transactions(account_id);
-CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(transaction_date);
-CREATE INDEX IF NOT EXISTS idx_transactions_status ON transactions(status);
+-- /api/transactions pages newest-first with keyset pagination on
+-- (transaction_date, id). Each filter gets an index whose trailing columns
+-- match that order, so a page is a bounded index range scan at any depth.
+-- The leading columns also serve the plain account/status/date lookups.
+CREATE INDEX IF NOT EXISTS idx_transactions_date_id ON transactions(transaction_date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_transactions_status_date_id ON transactions(status, transaction_date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_transactions_account_date_id ON transactions(account_id, transaction_date DESC, id DESC);
+-- Risk bands (storage/transactions.py RISK_BANDS) as partial indexes
+CREATE INDEX IF NOT EXISTS idx_transactions_high_risk_date_id ON transactions(transaction_date DESC, id DESC)
+    WHERE risk_score >= 0.7;
+CREATE INDEX IF NOT EXISTS idx_transactions_medium_risk_date_id ON transactions(transaction_date DESC, id DESC)
+    WHERE risk_score > 0.4 AND risk_score < 0.7;
+CREATE INDEX IF NOT EXISTS idx_transactions_low_risk_date_id ON transactions(transaction_date DESC, id DESC)
+    WHERE risk_score <= 0.4;
 CREATE INDEX IF NOT EXISTS idx_fraud_alerts_transaction_id ON fraud_alerts(transaction_id);
 CREATE INDEX IF NOT EXISTS idx_customers_customer_id ON customers(customer_id);
 
+-- Per-day, per-status counters maintained by a trigger as transactions are
+-- written, so daily reporting reads O(days) rows instead of the whole table.
+-- Thresholds match reporting/generator.py (SAR_THRESHOLD, CTR_THRESHOLD); a
+-- transaction is high risk (SAR) at risk_score >= SAR_THRESHOLD, as in app.py.
+CREATE TABLE IF NOT EXISTS daily_transaction_rollup (
+    day DATE NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    transaction_count BIGINT NOT NULL DEFAULT 0,
+    total_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    risk_score_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    scored_count BIGINT NOT NULL DEFAULT 0,
+    high_risk_count BIGINT NOT NULL DEFAULT 0,
+    large_amount_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, status)
+);
+
+CREATE OR REPLACE FUNCTION apply_daily_rollup(t transactions, sign INTEGER) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO daily_transaction_rollup AS r (day, status, transaction_count, total_amount,
+        risk_score_sum, scored_count, high_risk_count, large_amount_count)
+    VALUES (
+        DATE(t.transaction_date),
+        COALESCE(t.status, 'pending'),
+        sign,
+        sign * t.amount,
+        sign * COALESCE(t.risk_score, 0),
+        sign * (CASE WHEN t.risk_score IS NOT NULL THEN 1 ELSE 0 END),
+        sign * (CASE WHEN t.risk_score >= 0.7 THEN 1 ELSE 0 END),
+        sign * (CASE WHEN t.amount > 10000 THEN 1 ELSE 0 END)
+    )
+    ON CONFLICT (day, status) DO UPDATE SET
+        transaction_count = r.transaction_count + EXCLUDED.transaction_count,
+        total_amount = r.total_amount + EXCLUDED.total_amount,
+        risk_score_sum = r.risk_score_sum + EXCLUDED.risk_score_sum,
+        scored_count = r.scored_count + EXCLUDED.scored_count,
+        high_risk_count = r.high_risk_count + EXCLUDED.high_risk_count,
+        large_amount_count = r.large_amount_count + EXCLUDED.large_amount_count;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION transactions_rollup_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_daily_rollup(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_daily_rollup(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS transactions_daily_rollup ON transactions;
+CREATE TRIGGER transactions_daily_rollup
+AFTER INSERT OR DELETE OR UPDATE OF amount, transaction_date, risk_score, status ON transactions
+FOR EACH ROW EXECUTE FUNCTION transactions_rollup_trigger();
+
+-- Backfill rows written before the trigger existed
+INSERT INTO daily_transaction_rollup (day, status, transaction_count, total_amount,
+    risk_score_sum, scored_count, high_risk_count, large_amount_count)
+SELECT
+    DATE(transaction_date),
+    COALESCE(status, 'pending'),
+    COUNT(*),
+    SUM(amount),
+    COALESCE(SUM(risk_score), 0),
+    COUNT(risk_score),
+    COUNT(CASE WHEN risk_score >= 0.7 THEN 1 END),
+    COUNT(CASE WHEN amount > 10000 THEN 1 END)
+FROM transactions
+WHERE NOT EXISTS (SELECT 1 FROM daily_transaction_rollup)
+GROUP BY DATE(transaction_date), COALESCE(status, 'pending');
+
 -- Create views for analytics
 CREATE OR REPLACE VIEW daily_transaction_summary AS
 SELECT 
-    DATE(transaction_date) as transaction_date,
-    COUNT(*) as transaction_count,
-    SUM(amount) as total_amount,
-    AVG(risk_score) as avg_risk_score,
-    COUNT(CASE WHEN status = 'flagged' THEN 1 END) as flagged_count
-FROM transactions
-GROUP BY DATE(transaction_date)
+    day as transaction_date,
+    SUM(transaction_count) as transaction_count,
+    SUM(total_amount) as total_amount,
+    SUM(risk_score_sum) / NULLIF(SUM(scored_count), 0) as avg_risk_score,
+    SUM(CASE WHEN status = 'flagged' THEN transaction_count ELSE 0 END) as flagged_count,
+    SUM(high_risk_count) as high_risk_count,
+    SUM(large_amount_count) as large_amount_count
+FROM daily_transaction_rollup
+GROUP BY day
 ORDER BY transaction_date DESC;
 
 CREATE OR REPLACE VIEW customer_risk_summary AS
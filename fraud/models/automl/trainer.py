@@ -168,13 +168,17 @@ class AutoMLTrainer:
         os.makedirs(os.path.dirname(data_path), exist_ok=True)
         os.makedirs("models", exist_ok=True)
         
-        # Initialize MLflow
-        self._init_mlflow()
+        # MLflow is initialized lazily on the first training run so that
+        # constructing a trainer never blocks on the tracking server
+        self._mlflow_ready = False
 
     def _init_mlflow(self):
         """Initialize MLflow tracking"""
+        if self._mlflow_ready:
+            return
+        self._mlflow_ready = True
         try:
-            mlflow.set_tracking_uri("http://localhost:5000")
+            mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI", "http://localhost:5000"))
             if not mlflow.get_experiment_by_name(self.experiment_name):
                 mlflow.create_experiment(self.experiment_name)
             mlflow.set_experiment(self.experiment_name)
@@ -256,6 +260,7 @@ class AutoMLTrainer:
     def train_models(self):
         """Train and evaluate models"""
         try:
+            self._init_mlflow()
             X, y = self.preprocess_data()
             X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
             
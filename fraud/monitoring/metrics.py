@@ -0,0 +1,123 @@
+"""
+Prometheus instrumentation for the scoring service.
+
+Per-stage latency of /api/analyze is recorded with StageTimer, which feeds
+the stage histogram and also builds a Server-Timing header so the same
+breakdown shows up in the browser's network panel. Queue depths, batch
+sizes, graph size, profile count and model versions are gauges read from
+the live objects at scrape time, so they cost nothing on the request path.
+"""
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Histogram, Counter, CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+STAGES = ('feature_engineering', 'profiler', 'isolation_forest', 'xgboost', 'gnn',
+          'shap', 'drift', 'serialization')
+
+# Scoring stages run from tens of microseconds (tree models) to seconds (SHAP
+# on a cold cache), so the buckets start well below the default 5ms
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+STAGE_SECONDS = Histogram(
+    'fraud_scoring_stage_seconds', 'Time spent in each stage of transaction scoring',
+    ['stage'], buckets=STAGE_BUCKETS)
+REQUEST_SECONDS = Histogram(
+    'fraud_analyze_request_seconds', 'End-to-end /api/analyze latency', buckets=STAGE_BUCKETS)
+# Export every stage from the first scrape, before its first observation
+for _stage in STAGES:
+    STAGE_SECONDS.labels(stage=_stage)
+
+TRANSACTIONS_SCORED = Counter(
+    'fraud_transactions_scored_total', 'Scored transactions by outcome', ['status'])
+
+
+class StageTimer:
+    """Collects the stage durations of one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.elapsed = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.durations[name] = self.durations.get(name, 0.0) + elapsed
+            STAGE_SECONDS.labels(stage=name).observe(elapsed)
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        REQUEST_SECONDS.observe(self.elapsed)
+
+    def server_timing(self):
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.durations.items())
+
+
+class ServiceStateCollector:
+    """
+    Gauges read at scrape time. Each probe is a callable returning a number
+    (or None to skip); labelled gauges return {label values tuple: number}.
+    """
+
+    def __init__(self):
+        self._gauges = []
+
+    def gauge(self, name, documentation, probe, labels=()):
+        self._gauges.append((name, documentation, probe, list(labels)))
+
+    def collect(self):
+        for name, documentation, probe, labels in self._gauges:
+            try:
+                value = probe()
+            except Exception:
+                # A component that is not loaded yet (or failing) should not
+                # break the whole scrape
+                continue
+            if value is None:
+                continue
+            if not labels:
+                yield GaugeMetricFamily(name, documentation, value=float(value))
+                continue
+            family = GaugeMetricFamily(name, documentation, labels=labels)
+            for label_values, item in value.items():
+                family.add_metric([str(v) for v in label_values], float(item))
+            yield family
+
+
+def register_service_gauges(models, transaction_writer, report_jobs, transaction_feed):
+    collector = ServiceStateCollector()
+    collector.gauge('fraud_queue_depth', 'Items waiting in background queues', lambda: {
+        ('transaction_writes',): transaction_writer.pending(),
+        ('report_jobs',): report_jobs.pending(),
+    }, labels=['queue'])
+    collector.gauge('fraud_db_write_batch_size', 'Rows in the last multi-row INSERT',
+                    lambda: transaction_writer.last_batch_size)
+    collector.gauge('fraud_db_rows_dropped', 'Scored transactions dropped because the write queue was full',
+                    lambda: transaction_writer.dropped)
+    collector.gauge('fraud_drift_window_size', 'Samples buffered in the drift detector window',
+                    lambda: models.drift_detector._count if models.loaded('drift_detector') else None)
+    collector.gauge('fraud_live_feed_clients', 'Connected live feed clients', transaction_feed.subscriber_count)
+    collector.gauge('fraud_graph_nodes', 'Nodes in the in-memory transaction graph',
+                    lambda: models.graph_builder.current_id if models.loaded('graph_builder') else None)
+    collector.gauge('fraud_graph_edges', 'Edges in the in-memory transaction graph',
+                    lambda: models.graph_builder.num_edges if models.loaded('graph_builder') else None)
+    collector.gauge('fraud_customer_profiles', 'Customer risk profiles held by the profiler',
+                    lambda: len(models.profiler.profiles) if models.loaded('profiler') else None)
+    # Info-style gauge: the version is a label and the value is always 1
+    collector.gauge('fraud_model_info', 'Loaded model versions (artifact modification time)',
+                    lambda: {(name, version): 1 for name, version in models.versions.items()},
+                    labels=['model', 'version'])
+    REGISTRY.register(collector)
+    return collector
+
+
+def metrics_response():
+    """(body, content type) for the /metrics endpoint."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,150 @@
+"""
+On-demand profiling for the scoring service.
+
+SamplingProfiler snapshots every thread's Python stack at a fixed interval
+from a background thread (sys._current_frames), so nothing is instrumented
+and the served requests pay only for the GIL hand-offs of the sampler. The
+result is in the collapsed-stack format ("frame;frame;frame count" per
+line) that flamegraph.pl, speedscope and inferno read directly.
+
+SlowRequestLog keeps the stage timings and input of the most recent
+requests that exceeded a latency threshold, in a bounded ring buffer.
+"""
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+
+# Shorter intervals would keep the sampler holding the GIL almost constantly
+MIN_INTERVAL = 0.001
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+class SamplingProfiler:
+    """One sampling session at a time; results stay available until the next start."""
+
+    def __init__(self, max_seconds=300):
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stacks = Counter()
+        self.samples = 0
+        self.interval = None
+        self.started_at = None
+        self.stopped_at = None
+
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds, interval=0.01):
+        """
+        Sample for `seconds` (capped at max_seconds) in the background.
+        Raises ValueError unless seconds > 0 and interval >= MIN_INTERVAL.
+        """
+        if not (math.isfinite(seconds) and seconds > 0):
+            raise ValueError("seconds must be a positive number")
+        if not (math.isfinite(interval) and interval >= MIN_INTERVAL):
+            raise ValueError(f"interval must be at least {MIN_INTERVAL * 1000:g} ms")
+        with self._lock:
+            if self.running():
+                raise ProfilerBusy("a profiling session is already running")
+            self._stacks = Counter()
+            self.samples = 0
+            self.interval = interval
+            self.started_at = time.time()
+            self.stopped_at = None
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._sample, args=(min(seconds, self.max_seconds), interval),
+                name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the running session early; returns once the sampler has exited."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _sample(self, seconds, interval):
+        own = threading.get_ident()
+        deadline = time.perf_counter() + seconds
+        while not self._stop.is_set() and time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks = [self._collapse(names.get(ident, str(ident)), frame)
+                      for ident, frame in sys._current_frames().items() if ident != own]
+            with self._lock:
+                self._stacks.update(stacks)
+                self.samples += 1
+            self._stop.wait(interval)
+        self.stopped_at = time.time()
+
+    @staticmethod
+    def _collapse(thread_name, frame):
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name}({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        frames.append(thread_name)
+        # Root first; ';' separates frames and the last space precedes the count
+        return ";".join(reversed(frames)).replace(" ", "_")
+
+    def collapsed(self):
+        """Samples so far in collapsed-stack format, heaviest stacks first."""
+        with self._lock:
+            stacks = self._stacks.most_common()
+        return "\n".join(f"{stack} {count}" for stack, count in stacks) + "\n"
+
+    def status(self):
+        return {
+            "running": self.running(),
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000 if self.interval else None,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+            "distinct_stacks": len(self._stacks),
+        }
+
+
+class SlowRequestLog:
+    """The last `capacity` requests slower than `threshold_ms`; a threshold of 0 disables it."""
+
+    def __init__(self, threshold_ms=1000, capacity=100):
+        self.threshold_ms = threshold_ms
+        self._entries = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.captured = 0
+
+    def record(self, path, elapsed, stages, payload):
+        """Keep the request if it was slow; `elapsed` and `stages` are in seconds."""
+        if not self.threshold_ms or elapsed * 1000 < self.threshold_ms:
+            return False
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "path": path,
+            "duration_ms": round(elapsed * 1000, 2),
+            "stages_ms": {name: round(seconds * 1000, 2) for name, seconds in stages.items()},
+            "input": payload,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self.captured += 1
+        return True
+
+    def entries(self):
+        """Newest first."""
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,123 @@
+"""
+Dynamic batching for transformer inference.
+
+Requests put their texts on a queue and get a Future back. A single
+inference thread takes whatever is waiting, up to max_batch_size texts or
+whatever arrives within max_wait_ms of the first one, and runs them
+through the model as one padded batch. Under load the batches fill up and
+throughput follows the batched rate; when idle a lone request waits at
+most max_wait_ms before running on its own.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class BatcherOverloaded(RuntimeError):
+    pass
+
+
+class DynamicBatcher:
+    """
+    predict_fn takes a list of texts and returns one result per text, in
+    order. It only ever runs on the batcher's thread.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5, max_queue=10000, name="nlp-batcher"):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = threading.Event()
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.last_batch_size = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, text):
+        """Future resolving to the model's result for `text`."""
+        if self._closed.is_set():
+            raise RuntimeError("batcher is closed")
+        future = Future()
+        try:
+            self._queue.put_nowait((text, future))
+        except queue.Full:
+            self.rejected += 1
+            raise BatcherOverloaded(f"{self._queue.maxsize} texts already waiting")
+        return future
+
+    def submit_many(self, texts):
+        return [self.submit(text) for text in texts]
+
+    def predict(self, texts, timeout=None):
+        """Blocking convenience for callers outside an event loop."""
+        return [future.result(timeout) for future in self.submit_many(texts)]
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _next_batch(self):
+        item = self._queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Shutting down: finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            # Futures cancelled while queued are skipped
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            texts = [text for text, _ in batch]
+            try:
+                results = self.predict_fn(texts)
+            except Exception as e:
+                logger.exception(f"Batch of {len(texts)} failed")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            self.batches += 1
+            self.items += len(batch)
+            self.last_batch_size = len(batch)
+
+    def close(self, timeout=10):
+        """Stop accepting texts, run what is queued, then stop the thread."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "last_batch_size": self.last_batch_size,
+            "pending": self.pending(),
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,120 @@
+"""
+Result cache for NLP risk scores.
+
+Memo fields and merchant names repeat heavily, so scores are cached by
+normalized text: an in-process TTL LRU answers repeats in microseconds,
+and an optional Redis tier (REDIS_URL) shares results between workers and
+survives restarts. Only misses on every tier reach the model.
+
+The model is uncased, so case and whitespace differences do not change
+its output and are folded into the key.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+import unicodedata
+
+from cachetools import TTLCache
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+CACHE_LOOKUPS = Counter('nlp_score_cache_lookups_total', 'NLP score cache lookups', ['tier', 'result'])
+CACHE_ERRORS = Counter('nlp_score_cache_errors_total', 'Failed shared cache operations')
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip().lower()
+
+
+class ScoreCache:
+    def __init__(self, maxsize=100_000, ttl=3600, redis_url=None, namespace="nlp-score:v1"):
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        # TTLCache is not thread-safe, and reads reorder the LRU
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        # Bump the namespace when the model changes so stale scores are not served
+        self.namespace = namespace
+        self.redis = None
+        if redis_url:
+            import redis.asyncio as redis
+            self.redis = redis.from_url(redis_url)
+        self.hits = {'local': 0, 'redis': 0}
+        self.misses = 0
+
+    def _redis_key(self, key):
+        # Hash so arbitrarily long memos make bounded Redis keys
+        return f"{self.namespace}:{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+
+    def get_local(self, key):
+        with self._lock:
+            value = self._local.get(key)
+        if value is not None:
+            self.hits['local'] += 1
+            CACHE_LOOKUPS.labels(tier='local', result='hit').inc()
+        return value
+
+    async def get_many(self, keys):
+        """{key: result} for the normalized keys found on any tier."""
+        found = {}
+        remote = []
+        for key in keys:
+            value = self.get_local(key)
+            if value is not None:
+                found[key] = value
+            else:
+                remote.append(key)
+        if remote and self.redis is not None:
+            try:
+                values = await self.redis.mget([self._redis_key(key) for key in remote])
+            except Exception as e:
+                logger.warning(f"Shared score cache unavailable: {e}")
+                CACHE_ERRORS.inc()
+                values = [None] * len(remote)
+            with self._lock:
+                for key, value in zip(remote, values):
+                    if value is not None:
+                        found[key] = self._local[key] = json.loads(value)
+            redis_hits = sum(value is not None for value in values)
+            self.hits['redis'] += redis_hits
+            CACHE_LOOKUPS.labels(tier='redis', result='hit').inc(redis_hits)
+        misses = len(keys) - len(found)
+        self.misses += misses
+        CACHE_LOOKUPS.labels(tier='all', result='miss').inc(misses)
+        return found
+
+    async def put_many(self, results):
+        """Store {key: result} on every tier."""
+        if not results:
+            return
+        with self._lock:
+            self._local.update(results)
+        if self.redis is not None:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for key, value in results.items():
+                        pipe.set(self._redis_key(key), json.dumps(value), ex=int(self.ttl))
+                    await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Shared score cache unavailable: {e}")
+                CACHE_ERRORS.inc()
+
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.aclose()
+
+    def stats(self):
+        lookups = sum(self.hits.values()) + self.misses
+        return {
+            "size": len(self._local),
+            "maxsize": self._local.maxsize,
+            "ttl": self.ttl,
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "hit_rate": sum(self.hits.values()) / lookups if lookups else 0.0,
+            "shared": self.redis is not None,
+        }
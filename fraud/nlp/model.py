@@ -0,0 +1,57 @@
+"""
+Loading and warming the sentiment pipeline behind nlp_api.py.
+
+NLP_MODEL_PATH points at a local model directory: an ONNX export from
+nlp.onnx_export (served with onnxruntime) or a saved transformers model.
+Local directories are loaded with local_files_only, so serving never
+reaches the network. Without it the Hugging Face model id is used, as
+before.
+"""
+import logging
+import os
+import time
+
+from nlp.onnx_export import DEFAULT_MODEL
+
+logger = logging.getLogger(__name__)
+
+WARMUP_TEXTS = ["URGENT: Claim your prize now!", "Grocery store purchase",
+                "Monthly rent payment to landlord for the apartment on Main Street"]
+
+
+def is_onnx_dir(path):
+    return os.path.isdir(path) and any(name.endswith(".onnx") for name in os.listdir(path))
+
+
+def load_sentiment_pipeline(model_path=None):
+    """(pipeline, description) for a local directory or the default model id."""
+    from transformers import AutoTokenizer, pipeline
+
+    if model_path and is_onnx_dir(model_path):
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        onnx_files = sorted(name for name in os.listdir(model_path) if name.endswith(".onnx"))
+        # Prefer the quantized model when the directory holds both
+        file_name = next((name for name in onnx_files if "quantized" in name), onnx_files[0])
+        model = ORTModelForSequenceClassification.from_pretrained(
+            model_path, file_name=file_name, local_files_only=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True)
+        return (pipeline("sentiment-analysis", model=model, tokenizer=tokenizer),
+                f"onnx:{os.path.join(model_path, file_name)}")
+    if model_path:
+        return (pipeline("sentiment-analysis", model=model_path, tokenizer=model_path,
+                         model_kwargs={"local_files_only": True}),
+                f"transformers:{model_path}")
+    return pipeline("sentiment-analysis", model=DEFAULT_MODEL), f"transformers:{DEFAULT_MODEL}"
+
+
+def warm_up(sentiment_pipeline, batch_sizes=(1, 8), max_length=128):
+    """
+    Run a few batches so lazy initialization (kernel selection, allocator
+    pools, tokenizer caches) happens before the first real request.
+    Returns the seconds taken.
+    """
+    started = time.perf_counter()
+    for batch_size in batch_sizes:
+        texts = (WARMUP_TEXTS * batch_size)[:batch_size]
+        sentiment_pipeline(texts, batch_size=batch_size, truncation=True, max_length=max_length)
+    return time.perf_counter() - started
@@ -0,0 +1,68 @@
+"""
+Export the sentiment model to ONNX with dynamic int8 quantization.
+
+Dynamic quantization stores the Linear weights as int8 and quantizes
+activations on the fly, which needs no calibration data and typically
+cuts DistilBERT's CPU latency and memory by about half with a negligible
+change in scores. The output directory holds the quantized model and the
+tokenizer, so serving it needs no network:
+
+    python -m nlp.onnx_export --out models/nlp-onnx-int8
+    NLP_MODEL_PATH=models/nlp-onnx-int8 uvicorn nlp_api:app
+
+Run the export on a machine with network access (or a populated Hugging
+Face cache); --arch picks the int8 kernels for the serving CPUs.
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+QUANTIZED_FILE = "model_quantized.onnx"
+
+
+def export_onnx(out_dir, model_id=DEFAULT_MODEL, quantize=True, arch="avx2"):
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    if not quantize:
+        model = ORTModelForSequenceClassification.from_pretrained(model_id, export=True)
+        model.save_pretrained(out_dir)
+        tokenizer.save_pretrained(out_dir)
+        logger.info(f"Exported {model_id} to {out_dir} (fp32)")
+        return out_dir
+
+    # Export fp32 to a scratch directory, then write only the quantized model
+    with tempfile.TemporaryDirectory() as fp32_dir:
+        model = ORTModelForSequenceClassification.from_pretrained(model_id, export=True)
+        model.save_pretrained(fp32_dir)
+        qconfig = getattr(AutoQuantizationConfig, arch)(is_static=False, per_channel=False)
+        ORTQuantizer.from_pretrained(fp32_dir).quantize(save_dir=out_dir, quantization_config=qconfig)
+        # The model config (labels) comes along for loading
+        shutil.copy(os.path.join(fp32_dir, "config.json"), out_dir)
+    tokenizer.save_pretrained(out_dir)
+    logger.info(f"Exported {model_id} to {out_dir} (dynamic int8, {arch})")
+    return out_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the NLP risk model to ONNX (int8) for CPU serving")
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--arch', default='avx2', choices=('avx2', 'avx512', 'avx512_vnni', 'arm64'),
+                        help="int8 kernels to target")
+    parser.add_argument('--no-quantize', action='store_true', help="Export fp32 ONNX only")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    export_onnx(args.out, args.model, quantize=not args.no_quantize, arch=args.arch)
+
+
+if __name__ == '__main__':
+    main()
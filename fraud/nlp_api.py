@@ -1,34 +1,57 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import os
+import threading
+import time
+from fastapi import FastAPI, HTTPException, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel, Field
-from transformers import pipeline
-from typing import Dict
+from typing import Dict, List
+from nlp.batching import DynamicBatcher, BatcherOverloaded
+from nlp.cache import ScoreCache, normalize_text
+from nlp.model import load_sentiment_pipeline, warm_up
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="NLP Risk Scoring API")
 
+# Dynamic batching: concurrent requests are grouped into one padded batch
+# of up to NLP_MAX_BATCH texts, waiting at most NLP_MAX_WAIT_MS for more
+MAX_BATCH_SIZE = int(os.environ.get("NLP_MAX_BATCH", 32))
+MAX_WAIT_MS = float(os.environ.get("NLP_MAX_WAIT_MS", 5))
+MAX_QUEUE = int(os.environ.get("NLP_MAX_QUEUE", 10000))
+# Memo fields are short; truncating the odd long one keeps a batch from
+# being padded out to 512 tokens
+MAX_LENGTH = int(os.environ.get("NLP_MAX_LENGTH", 128))
+MAX_TEXTS_PER_REQUEST = 1000
+# Scores are cached by normalized text in-process and, with REDIS_URL, in
+# Redis shared by all workers
+CACHE_SIZE = int(os.environ.get("NLP_CACHE_SIZE", 100000))
+CACHE_TTL = float(os.environ.get("NLP_CACHE_TTL", 3600))
+REDIS_URL = os.environ.get("REDIS_URL")
+# Local model directory (ONNX export from nlp.onnx_export, or a saved
+# transformers model); the Hugging Face model id when unset
+MODEL_PATH = os.environ.get("NLP_MODEL_PATH")
+
 class TransactionText(BaseModel):
-    text: str = Field(..., example="URGENT: Claim your prize now!")
-
-try:
-    sentiment_analyzer = pipeline(
-        "sentiment-analysis", 
-        model="distilbert-base-uncased-finetuned-sst-2-english"
-    )
-    print("Sentiment analysis model loaded successfully.")
-except Exception as e:
-    print(f"Error loading NLP model: {e}")
-    sentiment_analyzer = None
+    text: str = Field(..., examples=["URGENT: Claim your prize now!"])
 
-@app.post("/nlp-score", response_model=Dict[str, float])
-def get_nlp_score(data: TransactionText):
-    if sentiment_analyzer is None:
-        return {"error": "NLP model not loaded", "risk_score": -1.0}
+class TransactionTexts(BaseModel):
+    texts: List[str] = Field(..., max_length=MAX_TEXTS_PER_REQUEST,
+                             examples=[["URGENT: Claim your prize now!", "Grocery store"]])
 
-    results = sentiment_analyzer(data.text)
-    sentiment = results[0]
-    
+# The model is loaded and warmed up by a background thread at startup;
+# /ready reports 503 until then
+sentiment_analyzer = None
+batcher = None
+model_status = {"model": None, "load_seconds": None, "warmup_seconds": None, "error": None}
+model_ready = threading.Event()
+
+def risk_from_sentiment(sentiment):
     label = sentiment['label']
     score = sentiment['score']
-    
+
     risk_score = 0.0
     if label == 'NEGATIVE':
         risk_score = score
@@ -40,3 +63,85 @@ def get_nlp_score(data: TransactionText):
         "sentiment_label": 1 if label == 'NEGATIVE' else 0,
         "sentiment_score": score
     }
+
+def score_batch(texts):
+    # Runs on the batcher thread; the pipeline pads the batch to its longest text
+    results = sentiment_analyzer(texts, batch_size=len(texts), truncation=True, max_length=MAX_LENGTH)
+    return [risk_from_sentiment(sentiment) for sentiment in results]
+
+def load_model():
+    global sentiment_analyzer, batcher
+    try:
+        started = time.perf_counter()
+        analyzer, model_status["model"] = load_sentiment_pipeline(MODEL_PATH)
+        model_status["load_seconds"] = round(time.perf_counter() - started, 3)
+        model_status["warmup_seconds"] = round(
+            warm_up(analyzer, batch_sizes=(1, MAX_BATCH_SIZE), max_length=MAX_LENGTH), 3)
+    except Exception as e:
+        logger.exception("Error loading NLP model")
+        model_status["error"] = str(e)
+        return
+    sentiment_analyzer = analyzer
+    batcher = DynamicBatcher(score_batch, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                             max_queue=MAX_QUEUE)
+    model_ready.set()
+    logger.info(f"NLP model {model_status['model']} ready (load {model_status['load_seconds']}s, "
+                f"warm-up {model_status['warmup_seconds']}s)")
+
+score_cache = ScoreCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL, redis_url=REDIS_URL)
+
+@app.on_event("startup")
+def start_model_loading():
+    threading.Thread(target=load_model, name="nlp-model-loader", daemon=True).start()
+
+@app.on_event("shutdown")
+async def close_batcher():
+    if batcher is not None:
+        batcher.close()
+    await score_cache.close()
+
+async def score_texts(texts):
+    keys = [normalize_text(text) for text in texts]
+    results = await score_cache.get_many(set(keys))
+    # Each distinct uncached text goes to the model once
+    missing = [key for key in dict.fromkeys(keys) if key not in results]
+    if missing:
+        # Cached texts are answered even while the model is still loading
+        if not model_ready.is_set():
+            raise HTTPException(status_code=503, detail="NLP model not loaded")
+        try:
+            futures = batcher.submit_many(missing)
+        except BatcherOverloaded as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        scored = dict(zip(missing, await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))))
+        await score_cache.put_many(scored)
+        results.update(scored)
+    return [results[key] for key in keys]
+
+@app.post("/nlp-score", response_model=Dict[str, float])
+async def get_nlp_score(data: TransactionText):
+    results = await score_texts([data.text])
+    return results[0]
+
+@app.post("/nlp-score/batch")
+async def get_nlp_scores(data: TransactionTexts):
+    return {"results": await score_texts(data.texts)}
+
+@app.get("/nlp-score/stats")
+def get_batcher_stats():
+    return {
+        "batcher": batcher.stats() if batcher is not None else {},
+        "cache": score_cache.stats()
+    }
+
+@app.get("/ready")
+def readiness(response: Response):
+    # Ready only once the model is loaded and has run its warm-up batches
+    if not model_ready.is_set():
+        response.status_code = 503
+        return {"status": "failed" if model_status["error"] else "warming_up", **model_status}
+    return {"status": "ready", **model_status}
+
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
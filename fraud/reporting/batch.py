@@ -0,0 +1,321 @@
+"""
+End-of-day batch generation of SAR and CTR reports.
+
+Flagged transactions are streamed from storage already ordered by account,
+grouped into one report per customer and rendered in parallel by the same
+worker processes ReportJobQueue uses. Only a bounded number of customers is
+held in memory at a time.
+
+Every finished report is appended to <out_dir>/progress.jsonl, so a rerun
+after a crash skips what is already on disk and picks up where it stopped.
+
+Usage (from the fraud/ directory):
+    python -m reporting.batch --kind sar --out reports/2024-01-31 --date 2024-01-31
+    python -m reporting.batch --kind ctr --csv data/scored.csv --out reports/ctr --zip
+"""
+import argparse
+import heapq
+import json
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from reporting.generator import TEMPLATE_DIR, SAR_THRESHOLD, CTR_THRESHOLD
+from reporting.pool import _init_worker, _run_job
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_FILE = "progress.jsonl"
+BATCH_KINDS = ('sar', 'ctr')
+
+# CSV column -> template field
+CSV_COLUMNS = {
+    'AccountID': 'account_id',
+    'TransactionID': 'transaction_id',
+    'TransactionDate': 'date',
+    'TransactionAmount': 'amount',
+    'TransactionType': 'type',
+    'RiskScore': 'risk_score',
+    'MerchantID': 'merchant_id',
+    'Location': 'location',
+}
+
+
+def flag_condition(kind, column, threshold):
+    """
+    SQL/pandas boundary shared by both sources: SAR at risk_score >= threshold,
+    the same rule /api/analyze flags with; CTR above the cash threshold.
+    """
+    return f"{column} >= {threshold}" if kind == 'sar' else f"{column} > {threshold}"
+
+
+def _describe(merchant_id, location):
+    parts = [p for p in (merchant_id and f"Merchant {merchant_id}", location) if p]
+    return ", ".join(parts)
+
+
+def iter_flagged_from_db(conn, kind, threshold, start=None, end=None, batch_size=1000):
+    """
+    Yield flagged transaction dicts ordered by account. The database does
+    the filtering and ordering; rows arrive through a server-side cursor.
+    """
+    from storage.db import placeholder, stream_query
+
+    p = placeholder(conn)
+    column = "t.risk_score" if kind == 'sar' else "t.amount"
+    where = [flag_condition(kind, column, p)]
+    params = [threshold]
+    if start is not None:
+        where.append(f"t.transaction_date >= {p}")
+        params.append(start)
+    if end is not None:
+        where.append(f"t.transaction_date < {p}")
+        params.append(end)
+    sql = (
+        "SELECT t.account_id, c.name, t.transaction_id, t.transaction_date, t.amount, "
+        "t.transaction_type, t.risk_score, t.merchant_id, t.location "
+        "FROM transactions t LEFT JOIN customers c ON c.customer_id = t.account_id "
+        f"WHERE {' AND '.join(where)} "
+        "ORDER BY t.account_id, t.transaction_date"
+    )
+    for row in stream_query(conn, sql, params, batch_size=batch_size):
+        account_id, name, txn_id, txn_date, amount, txn_type, risk, merchant_id, location = row
+        yield {
+            'account_id': account_id,
+            'name': name,
+            'transaction_id': txn_id,
+            'date': str(txn_date),
+            'amount': float(amount),
+            'type': txn_type,
+            'risk_score': float(risk) if risk is not None else 0.0,
+            'description': _describe(merchant_id, location),
+        }
+
+
+def _sorted_run(path, chunksize):
+    """Rows of one sorted spill file, read back a small chunk at a time."""
+    import pandas as pd
+
+    text_columns = {c: str for c in ('account_id', 'transaction_id', 'date', 'type', 'merchant_id', 'location')}
+    # Empty text stays '' (not NaN), so the merge key always compares as str
+    for chunk in pd.read_csv(path, dtype=text_columns, keep_default_na=False,
+                             na_values={'amount': [''], 'risk_score': ['']}, chunksize=chunksize):
+        for row in chunk.itertuples(index=False):
+            yield row._asdict()
+
+
+def iter_flagged_from_csv(path, kind, threshold, chunksize=100_000, merge_chunksize=1000):
+    """
+    Yield flagged transaction dicts from a scored CSV export, ordered by
+    account. Like iter_flagged_from_db this streams: each chunk's flagged
+    rows are sorted and spilled to a temporary run file, and the runs are
+    merged lazily, reading `merge_chunksize` rows of each run at a time, so
+    memory is bounded by the chunk sizes, not by the export.
+    """
+    import pandas as pd
+
+    usecols = lambda c: c in CSV_COLUMNS
+    filter_column = 'RiskScore' if kind == 'sar' else 'TransactionAmount'
+    with tempfile.TemporaryDirectory(prefix="flagged-runs-") as run_dir:
+        runs = []
+        for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunksize,
+                                 dtype={'AccountID': str, 'TransactionID': str, 'TransactionDate': str}):
+            if filter_column not in chunk.columns:
+                raise ValueError(f"{path} has no {filter_column} column; score the transactions first")
+            flagged = chunk.query(flag_condition(kind, filter_column, threshold)).rename(columns=CSV_COLUMNS)
+            if flagged.empty:
+                continue
+            if 'risk_score' not in flagged.columns:
+                flagged['risk_score'] = 0.0
+            run = os.path.join(run_dir, f"run_{len(runs):05d}.csv")
+            flagged.sort_values(['account_id', 'date'], kind='stable').to_csv(run, index=False)
+            runs.append(run)
+
+        # Chunk order breaks ties, so equal keys keep their file order as before
+        merged = heapq.merge(*(_sorted_run(run, merge_chunksize) for run in runs),
+                             key=lambda r: (r['account_id'], r['date']))
+        for row in merged:
+            yield {
+                'account_id': row['account_id'],
+                'name': None,
+                'transaction_id': row.get('transaction_id') or None,
+                'date': row['date'],
+                'amount': float(row['amount']),
+                'type': row.get('type') or None,
+                'risk_score': float(row['risk_score']),
+                'description': _describe(row.get('merchant_id') or None, row.get('location') or None),
+            }
+
+
+def group_by_customer(rows):
+    """Turn an account-ordered row stream into (customer_info, transactions) pairs."""
+    for account_id, group in groupby(rows, key=lambda r: r['account_id']):
+        transactions = list(group)
+        customer_info = {
+            'name': transactions[0]['name'] or account_id,
+            'account_id': account_id,
+            'risk_score': max(t['risk_score'] for t in transactions),
+        }
+        yield customer_info, transactions
+
+
+def report_filename(kind, account_id):
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", str(account_id))
+    return f"{kind}_{safe}.pdf"
+
+
+def load_progress(out_dir):
+    """Report files already recorded as finished (and still present)."""
+    path = os.path.join(out_dir, PROGRESS_FILE)
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn last line from a crash mid-write
+                continue
+            if os.path.exists(os.path.join(out_dir, entry['file'])):
+                done.add(entry['file'])
+    return done
+
+
+def run_batch(kind, rows, out_dir, workers=None, renderer=None, template_dir=TEMPLATE_DIR,
+              threshold=None, max_in_flight=None, progress=None, log_every=100):
+    """
+    Render one report per customer from an account-ordered row stream.
+
+    progress, if given, is called as progress(done, failed, skipped) after
+    each finished report. Returns a summary dict.
+    """
+    if kind not in BATCH_KINDS:
+        raise ValueError(f"Unknown batch report kind: {kind}")
+    threshold = threshold if threshold is not None else (SAR_THRESHOLD if kind == 'sar' else CTR_THRESHOLD)
+    workers = workers or int(os.environ.get("REPORT_WORKERS", os.cpu_count() or 2))
+    # Bounds how many customers' transactions are queued for the pool at once
+    max_in_flight = max_in_flight or workers * 4
+    os.makedirs(out_dir, exist_ok=True)
+
+    finished = load_progress(out_dir)
+    counts = {'done': 0, 'failed': 0, 'skipped': 0}
+    started = time.perf_counter()
+    progress_log = open(os.path.join(out_dir, PROGRESS_FILE), "a")
+
+    def record(future, filename, account_id):
+        try:
+            future.result()
+        except Exception as e:
+            counts['failed'] += 1
+            logger.error(f"{kind.upper()} for {account_id} failed: {e}")
+        else:
+            counts['done'] += 1
+            progress_log.write(json.dumps({'file': filename, 'account_id': account_id,
+                                           'finished_at': time.time()}) + "\n")
+            # Durable before it counts as done, so a resume never skips a report
+            # that is not fully on disk
+            progress_log.flush()
+            os.fsync(progress_log.fileno())
+        if progress is not None:
+            progress(counts['done'], counts['failed'], counts['skipped'])
+        if (counts['done'] + counts['failed']) % log_every == 0:
+            elapsed = time.perf_counter() - started
+            logger.info(f"{kind.upper()} batch: {counts['done']} done, {counts['failed']} failed, "
+                        f"{counts['skipped']} skipped ({counts['done'] / max(elapsed, 1e-9):.1f} reports/s)")
+
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(template_dir, renderer),
+    )
+    in_flight = {}
+    try:
+        for customer_info, transactions in group_by_customer(rows):
+            filename = report_filename(kind, customer_info['account_id'])
+            if filename in finished:
+                counts['skipped'] += 1
+                continue
+            if len(in_flight) >= max_in_flight:
+                completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    record(future, *in_flight.pop(future))
+
+            output_path = os.path.join(out_dir, filename)
+            if kind == 'sar':
+                future = executor.submit(_run_job, 'sar', (transactions, customer_info), output_path)
+            else:
+                future = executor.submit(_run_job, 'ctr', (transactions,), output_path,
+                                         {'customer_info': customer_info, 'threshold': threshold})
+            in_flight[future] = (filename, customer_info['account_id'])
+
+        while in_flight:
+            completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in completed:
+                record(future, *in_flight.pop(future))
+    finally:
+        executor.shutdown(wait=True)
+        progress_log.close()
+
+    summary = dict(counts, kind=kind, out_dir=out_dir, seconds=round(time.perf_counter() - started, 2))
+    logger.info(f"{kind.upper()} batch finished: {summary}")
+    return summary
+
+
+def archive(out_dir, archive_path=None):
+    """Pack the rendered PDFs into one zip. PDFs are already compressed, so store them as-is."""
+    archive_path = archive_path or out_dir.rstrip(os.sep) + ".zip"
+    with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name in sorted(os.listdir(out_dir)):
+            if name.endswith(".pdf"):
+                zf.write(os.path.join(out_dir, name), arcname=name)
+    return archive_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate SAR/CTR reports for every flagged customer")
+    parser.add_argument('--kind', choices=BATCH_KINDS, default='sar')
+    parser.add_argument('--out', required=True, help="Output directory; rerun with the same one to resume")
+    parser.add_argument('--csv', help="Scored CSV export to read instead of the database")
+    parser.add_argument('--database-url', help="Defaults to DATABASE_URL")
+    parser.add_argument('--date', help="Only transactions on this day (YYYY-MM-DD)")
+    parser.add_argument('--threshold', type=float)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--renderer', choices=('wkhtmltopdf', 'local'))
+    parser.add_argument('--zip', action='store_true', help="Also pack the reports into <out>.zip")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    threshold = args.threshold if args.threshold is not None else (
+        SAR_THRESHOLD if args.kind == 'sar' else CTR_THRESHOLD)
+    conn = None
+    if args.csv:
+        rows = iter_flagged_from_csv(args.csv, args.kind, threshold)
+    else:
+        from storage.db import connect
+        start = end = None
+        if args.date:
+            start = datetime.strptime(args.date, "%Y-%m-%d")
+            end = start + timedelta(days=1)
+        conn = connect(args.database_url)
+        rows = iter_flagged_from_db(conn, args.kind, threshold, start, end)
+
+    try:
+        run_batch(args.kind, rows, args.out, workers=args.workers, renderer=args.renderer, threshold=threshold)
+    finally:
+        if conn is not None:
+            conn.close()
+    if args.zip:
+        logger.info(f"Wrote {archive(args.out)}")
+
+
+if __name__ == '__main__':
+    main()
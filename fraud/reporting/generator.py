@@ -1,47 +1,122 @@
-import pandas as pd
+import os
+import re
+import html as html_lib
 from datetime import datetime, timedelta
 from jinja2 import Environment, FileSystemLoader
-import pdfkit
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+SAR_THRESHOLD = 0.7  # Configurable risk threshold
+CTR_THRESHOLD = 10000  # Example threshold
+
+
+def render_local_pdf(html, output_path, lines_per_page=60):
+    """
+    Minimal HTML-to-PDF stand-in: writes the report's text as a plain
+    Helvetica PDF. Used in tests and wherever wkhtmltopdf is not installed.
+    """
+    text = re.sub(r"<(style|script)[^>]*>.*?</\1>", "", html, flags=re.S | re.I)
+    text = re.sub(r"<br\s*/?>|</(p|tr|h[1-6]|div|li)>", "\n", text, flags=re.I)
+    text = html_lib.unescape(re.sub(r"<[^>]+>", " ", text))
+    lines = [re.sub(r"\s+", " ", line).strip() for line in text.splitlines()]
+    lines = [line for line in lines if line] or [""]
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)]
+
+    def escape(line):
+        line = line.encode("latin-1", "replace").decode("latin-1")
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    # Objects: 1 catalog, 2 page tree, 3 font, then a page + content pair per page
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for page_lines in pages:
+        stream = "BT /F1 10 Tf 12 TL 50 800 Td " + " ".join(f"({escape(l)}) '" for l in page_lines) + " ET"
+        stream = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref)
+        page_refs.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % ref for ref in page_refs), len(page_refs))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(output_path, "wb") as f:
+        f.write(out)
+
 
 class ReportGenerator:
-    def __init__(self, template_dir="app/reporting/templates"):
-        self.env = Environment(loader=FileSystemLoader(template_dir))
-    
+    def __init__(self, template_dir=TEMPLATE_DIR, renderer=None):
+        # Templates never change while the service runs, so skip the mtime
+        # check and keep every compiled template
+        self.env = Environment(loader=FileSystemLoader(template_dir), auto_reload=False, cache_size=-1)
+        self._templates = {}
+        # "wkhtmltopdf" (via pdfkit) or "local" for the built-in stand-in
+        self.renderer = renderer or os.environ.get("REPORT_RENDERER", "wkhtmltopdf")
+
+    def _template(self, name):
+        template = self._templates.get(name)
+        if template is None:
+            template = self._templates[name] = self.env.get_template(name)
+        return template
+
+    def _to_pdf(self, html, output_path):
+        if self.renderer == "local":
+            render_local_pdf(html, output_path)
+            return
+        # pdfkit is only needed when a report is rendered
+        import pdfkit
+        pdfkit.from_string(html, output_path)
+
     def generate_sar(self, transactions, customer_info, output_path):
         # Suspicious Activity Report
-        template = self.env.get_template("sar_template.html")
-        
+        template = self._template("sar_template.html")
+
         context = {
             "transactions": transactions,
             "customer": customer_info,
             "report_date": datetime.now().strftime("%Y-%m-%d"),
-            "threshold": 0.7  # Configurable risk threshold
+            "threshold": SAR_THRESHOLD
         }
-        
+
         html = template.render(context)
-        pdfkit.from_string(html, output_path)
-    
-    def generate_ctr(self, transactions, output_path):
-        # Currency Transaction Report (for large transactions)
-        large_txns = [t for t in transactions if t['amount'] > 10000]  # Example threshold
-        
-        template = self.env.get_template("ctr_template.html")
+        self._to_pdf(html, output_path)
+
+    def generate_ctr(self, transactions, output_path, customer_info=None, threshold=CTR_THRESHOLD):
+        # Currency Transaction Report (for large transactions). Batch jobs
+        # filter in storage already, which makes this a cheap pass.
+        large_txns = [t for t in transactions if t['amount'] > threshold]
+
+        template = self._template("ctr_template.html")
         html = template.render({
             "transactions": large_txns,
+            "customer": customer_info,
             "report_date": datetime.now().strftime("%Y-%m-%d")
         })
-        
-        pdfkit.from_string(html, output_path)
-    
+
+        self._to_pdf(html, output_path)
+
     def generate_daily_summary(self, stats, output_path):
-        # Daily compliance summary
-        template = self.env.get_template("daily_summary.html")
+        # Daily compliance summary. stats is one day from DailyRollup.day()
+        # (or any dict with the same keys)
+        template = self._template("daily_summary.html")
         html = template.render({
-            "date": datetime.now().strftime("%Y-%m-%d"),
+            "date": stats.get('date') or datetime.now().strftime("%Y-%m-%d"),
             "total_transactions": stats['total'],
             "flagged_transactions": stats['flagged'],
             "sar_filed": stats['sar_count'],
-            "ctr_filed": stats['ctr_count']
+            "ctr_filed": stats['ctr_count'],
+            "total_amount": stats.get('total_amount'),
+            "avg_risk_score": stats.get('avg_risk_score'),
+            "by_status": stats.get('by_status', {})
         })
-        
-        pdfkit.from_string(html, output_path)
\ No newline at end of file
+
+        self._to_pdf(html, output_path)
@@ -0,0 +1,115 @@
+"""
+Report rendering off the request path.
+
+ReportJobQueue hands render jobs to a pool of persistent worker processes.
+Each worker builds one ReportGenerator (compiled templates stay cached for
+its lifetime) and renders SAR/CTR/daily-summary PDFs; callers get a job id
+back immediately and poll for the result.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+JOB_KINDS = ('sar', 'ctr', 'daily_summary')
+
+# Per-process generator, created by the pool initializer
+_worker_generator = None
+
+
+def _init_worker(template_dir, renderer):
+    global _worker_generator
+    from reporting.generator import ReportGenerator
+    _worker_generator = ReportGenerator(template_dir, renderer=renderer)
+
+
+def _run_job(kind, args, output_path, kwargs=None):
+    getattr(_worker_generator, f"generate_{kind}")(*args, output_path=output_path, **(kwargs or {}))
+    return output_path
+
+
+class ReportJobQueue:
+    def __init__(self, workers=None, template_dir=None, renderer=None, max_jobs=1000):
+        from reporting.generator import TEMPLATE_DIR
+        self.workers = workers or int(os.environ.get("REPORT_WORKERS", 2))
+        self.template_dir = template_dir or TEMPLATE_DIR
+        self.renderer = renderer
+        self.max_jobs = max_jobs
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Started on first use; 'spawn' keeps model memory and the web
+        # server's threads out of the workers. Spawned workers re-import the
+        # main module, which is why app.py builds nothing at import time.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.template_dir, self.renderer),
+            )
+        return self._executor
+
+    def submit(self, kind, output_path, *args, **kwargs):
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown report kind: {kind}")
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            future = self._pool().submit(_run_job, kind, args, output_path, kwargs)
+            self._jobs[job_id] = {
+                "future": future,
+                "kind": kind,
+                "output_path": output_path,
+                "submitted_at": time.time(),
+            }
+            self._evict()
+        return job_id
+
+    def _evict(self):
+        # Forget the oldest finished jobs once the registry is full
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id]["future"].done():
+                del self._jobs[job_id]
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job["future"].done())
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        future = job["future"]
+        result = {"job_id": job_id, "kind": job["kind"], "submitted_at": job["submitted_at"]}
+        if not future.done():
+            result["status"] = "running" if future.running() else "queued"
+        elif future.exception() is not None:
+            result["status"] = "failed"
+            result["error"] = str(future.exception())
+        else:
+            result["status"] = "done"
+            result["output_path"] = job["output_path"]
+        return result
+
+    def wait(self, job_id, timeout=None):
+        with self._lock:
+            job = self._jobs[job_id]
+        job["future"].result(timeout=timeout)
+        return self.status(job_id)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,144 @@
+"""
+Incremental daily transaction counters.
+
+DailyRollup is the in-process counterpart of the daily_transaction_rollup
+table in init.sql: every scored transaction bumps the counters of its
+(day, status) bucket, so the daily summary report and the dashboard read
+one small row per day instead of scanning transactions. It is only used
+with the SQLite stand-in. With Postgres the table itself is shared by every
+worker and kept current by a trigger, so StoredRollup reads it instead.
+"""
+import threading
+from datetime import date, datetime, timedelta
+
+from reporting.generator import SAR_THRESHOLD, CTR_THRESHOLD
+
+COUNTERS = ('transaction_count', 'total_amount', 'risk_score_sum', 'scored_count',
+            'high_risk_count', 'large_amount_count')
+# Dates further ahead than this (client clock skew aside) are not counted
+MAX_FUTURE_DAYS = 1
+
+
+def _day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+def _latest_day():
+    return date.today() + timedelta(days=MAX_FUTURE_DAYS)
+
+
+def _counters(values):
+    return {name: float(value) if name in ('total_amount', 'risk_score_sum') else int(value)
+            for name, value in zip(COUNTERS, values)}
+
+
+def summarize_day(day, buckets):
+    """generate_daily_summary's stats for one day from its (status, counters) buckets."""
+    totals = dict.fromkeys(COUNTERS, 0)
+    by_status = {}
+    for status, counters in buckets:
+        by_status[status] = counters['transaction_count']
+        for name in COUNTERS:
+            totals[name] += counters[name]
+    return {
+        'date': day.isoformat(),
+        'total': totals['transaction_count'],
+        'flagged': by_status.get('flagged', 0),
+        'high_risk': totals['high_risk_count'],
+        'sar_count': totals['high_risk_count'],
+        'ctr_count': totals['large_amount_count'],
+        'total_amount': round(totals['total_amount'], 2),
+        'avg_risk_score': totals['risk_score_sum'] / totals['scored_count'] if totals['scored_count'] else None,
+        'by_status': by_status,
+    }
+
+
+def summarize_days(buckets, limit=30):
+    """Summaries for the newest `limit` days in ((day, status), counters) pairs, newest first."""
+    grouped = {}
+    for (day, status), counters in buckets:
+        grouped.setdefault(day, []).append((status, counters))
+    newest = sorted(grouped, reverse=True)[:limit]
+    return [summarize_day(d, grouped[d]) for d in newest]
+
+
+class DailyRollup:
+    def __init__(self, retention_days=400):
+        self.retention_days = retention_days
+        self._buckets = {}  # (day, status) -> counters
+        self._lock = threading.Lock()
+
+    def record(self, transaction_date, status, amount, risk_score=None):
+        day = _day(transaction_date)
+        if day > _latest_day():
+            # A bogus future date would otherwise become the newest day
+            return
+        amount = float(amount)
+        risk_score = float(risk_score) if risk_score is not None else None
+        with self._lock:
+            bucket = self._buckets.get((day, status))
+            if bucket is None:
+                bucket = self._buckets[(day, status)] = dict.fromkeys(COUNTERS, 0)
+                self._expire()
+            bucket['transaction_count'] += 1
+            bucket['total_amount'] += amount
+            bucket['large_amount_count'] += amount > CTR_THRESHOLD
+            if risk_score is not None:
+                bucket['risk_score_sum'] += risk_score
+                bucket['scored_count'] += 1
+                bucket['high_risk_count'] += risk_score >= SAR_THRESHOLD
+
+    def _expire(self):
+        # Relative to today, not the newest date seen
+        cutoff = date.today() - timedelta(days=self.retention_days)
+        for key in [key for key in self._buckets if key[0] < cutoff]:
+            del self._buckets[key]
+
+    def load(self, rows):
+        """
+        Seed from (day, status, *COUNTERS) rows, e.g. the rollup table.
+        Replaces those buckets, so call it before anything is record()ed.
+        """
+        latest = _latest_day()
+        with self._lock:
+            for day, status, *values in rows:
+                if _day(day) <= latest:
+                    self._buckets[(_day(day), status)] = _counters(values)
+
+    def day(self, day=None):
+        """Summary for one day (today by default) in generate_daily_summary's stats shape."""
+        day = _day(day or date.today())
+        with self._lock:
+            buckets = [(status, dict(c)) for (d, status), c in self._buckets.items() if d == day]
+        return summarize_day(day, buckets)
+
+    def days(self, limit=30):
+        """Summaries for the most recent `limit` days that have data, newest first."""
+        with self._lock:
+            buckets = [(key, dict(counters)) for key, counters in self._buckets.items()]
+        return summarize_days(buckets, limit)
+
+
+class StoredRollup:
+    """
+    DailyRollup's read side over the Postgres daily_transaction_rollup
+    table: every worker sees every worker's transactions, at O(days) rows
+    per read.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def day(self, day=None):
+        day = _day(day or date.today())
+        return summarize_day(day, [(status, _counters(values))
+                                   for _, status, *values in self.store.rollup_rows(day=day)])
+
+    def days(self, limit=30):
+        return summarize_days([((_day(day), status), _counters(values))
+                               for day, status, *values in self.store.rollup_rows(limit)], limit)
+
@@ -0,0 +1,360 @@
+"""
+Memory-mappable model artifacts.
+
+An artifact is a directory next to the pickled model::
+
+    models/xgboost.artifact/
+        manifest.json      kind, feature names and scalar parameters
+        left.npy ...       flat node arrays for every tree in the ensemble
+
+Tree ensembles (IsolationForest, RandomForestClassifier, XGBClassifier) are
+flattened into node arrays and scored by MappedTreeEnsemble straight from
+np.load(mmap_mode='r'), so every worker on a node shares the same pages and
+loading is just opening the files. Objects that cannot be flattened (the SHAP
+explainer) are stored as an uncompressed joblib file whose numpy buffers are
+memory-mapped on load, with the background data also written as a plain .npy.
+
+Export existing pickles with::
+
+    python -m serving.artifacts export --model-dir models
+"""
+import argparse
+import json
+import logging
+import math
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+NODE_ARRAYS = ('left', 'right', 'feature', 'threshold', 'value', 'default_left', 'roots')
+
+
+def artifact_dir(model_dir, name):
+    return os.path.join(model_dir, f"{name}.artifact")
+
+
+def _average_path_length(n_samples):
+    """Same as sklearn.ensemble._iforest._average_path_length, vectorized."""
+    n = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n)
+    result[n == 2] = 1.0
+    big = n > 2
+    result[big] = 2.0 * (np.log(n[big] - 1.0) + np.euler_gamma) - 2.0 * (n[big] - 1.0) / n[big]
+    return result
+
+
+def _node_depths(left, right):
+    depths = np.zeros(len(left), dtype=np.int32)
+    for node in range(len(left)):
+        # sklearn stores children after their parent, so one pass suffices
+        if left[node] != -1:
+            depths[left[node]] = depths[node] + 1
+            depths[right[node]] = depths[node] + 1
+    return depths
+
+
+def _flatten_sklearn_forest(model, leaf_values):
+    """Concatenate the estimators' trees into global node arrays."""
+    arrays = {name: [] for name in NODE_ARRAYS if name != 'roots'}
+    roots = []
+    offset = 0
+    max_depth = 0
+    subsample_features = getattr(model, '_max_features', None) not in (None, model.n_features_in_)
+    for i, estimator in enumerate(model.estimators_):
+        tree = estimator.tree_
+        left = tree.children_left.astype(np.int32)
+        right = tree.children_right.astype(np.int32)
+        leaf = left == -1
+        feature = tree.feature.astype(np.int32)
+        if subsample_features:
+            # IsolationForest trees may be fitted on a subset of the columns
+            feature = np.where(leaf, feature, np.asarray(model.estimators_features_[i])[np.maximum(feature, 0)])
+        nodes = tree.__getstate__()['nodes']
+        if 'missing_go_to_left' in nodes.dtype.names:
+            default_left = nodes['missing_go_to_left'].astype(bool)
+        else:
+            default_left = np.zeros(len(left), dtype=bool)
+
+        arrays['left'].append(np.where(leaf, -1, left + offset))
+        arrays['right'].append(np.where(leaf, -1, right + offset))
+        arrays['feature'].append(np.where(leaf, 0, feature))
+        arrays['threshold'].append(tree.threshold.astype(np.float64))
+        arrays['value'].append(leaf_values(tree, left, right).astype(np.float64))
+        arrays['default_left'].append(default_left)
+        roots.append(offset)
+        offset += len(left)
+        max_depth = max(max_depth, tree.max_depth)
+
+    flat = {name: np.concatenate(parts) for name, parts in arrays.items()}
+    flat['roots'] = np.asarray(roots, dtype=np.int32)
+    return flat, max_depth
+
+
+def _flatten_random_forest(model):
+    positive = len(model.classes_) - 1
+
+    def leaf_values(tree, left, right):
+        value = tree.value[:, 0, :]
+        # Normalize per node, as DecisionTreeClassifier.predict_proba does
+        return value[:, positive] / np.maximum(value.sum(axis=1), 1e-12)
+
+    flat, max_depth = _flatten_sklearn_forest(model, leaf_values)
+    return flat, max_depth, {'n_classes': len(model.classes_), 'classes': model.classes_.tolist()}
+
+
+def _flatten_isolation_forest(model):
+    def leaf_values(tree, left, right):
+        # Path length of a sample ending in each node, as in IsolationForest.score_samples
+        return _node_depths(left, right) + _average_path_length(tree.n_node_samples)
+
+    flat, max_depth = _flatten_sklearn_forest(model, leaf_values)
+    params = {
+        'offset': float(model.offset_),
+        'average_path_length': float(_average_path_length([model.max_samples_])[0]),
+    }
+    return flat, max_depth, params
+
+
+def _flatten_xgboost(model):
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+    objective = learner['objective']['name']
+    gbm = learner['gradient_booster']
+    if objective != 'binary:logistic' or gbm['name'] != 'gbtree':
+        raise ValueError(f"Unsupported XGBoost model ({gbm['name']}, {objective}); only binary:logistic gbtree is supported")
+
+    arrays = {name: [] for name in NODE_ARRAYS if name != 'roots'}
+    roots = []
+    offset = 0
+    max_depth = 0
+    for tree in gbm['model']['trees']:
+        left = np.asarray(tree['left_children'], dtype=np.int32)
+        right = np.asarray(tree['right_children'], dtype=np.int32)
+        leaf = left == -1
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        arrays['left'].append(np.where(leaf, -1, left + offset))
+        arrays['right'].append(np.where(leaf, -1, right + offset))
+        arrays['feature'].append(np.where(leaf, 0, np.asarray(tree['split_indices'], dtype=np.int32)))
+        arrays['threshold'].append(conditions.astype(np.float64))
+        # Leaves keep their weight in split_conditions
+        arrays['value'].append(np.where(leaf, conditions, 0.0).astype(np.float64))
+        arrays['default_left'].append(np.asarray(tree['default_left'], dtype=bool))
+        roots.append(offset)
+        offset += len(left)
+        max_depth = max(max_depth, int(_node_depths(left, right).max()))
+
+    flat = {name: np.concatenate(parts) for name, parts in arrays.items()}
+    flat['roots'] = np.asarray(roots, dtype=np.int32)
+    base_score = float(learner['learner_model_param']['base_score'])
+    return flat, max_depth, {'base_margin': math.log(base_score / (1.0 - base_score))}
+
+
+def _write_manifest(out_dir, manifest):
+    tmp = os.path.join(out_dir, MANIFEST + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST))
+
+
+def export_tree_ensemble(model, out_dir):
+    """Flatten a fitted tree ensemble into out_dir and return its manifest."""
+    kind = type(model).__name__
+    if kind == 'IsolationForest':
+        flat, max_depth, params = _flatten_isolation_forest(model)
+        comparison = 'le'
+    elif kind == 'RandomForestClassifier':
+        flat, max_depth, params = _flatten_random_forest(model)
+        comparison = 'le'
+    elif kind == 'XGBClassifier':
+        flat, max_depth, params = _flatten_xgboost(model)
+        comparison = 'lt'
+    else:
+        raise ValueError(f"Cannot export {kind} as a tree ensemble artifact")
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name, array in flat.items():
+        np.save(os.path.join(out_dir, f"{name}.npy"), np.ascontiguousarray(array))
+
+    feature_names = getattr(model, 'feature_names_in_', None)
+    manifest = {
+        'format': FORMAT_VERSION,
+        'type': 'tree_ensemble',
+        'kind': kind,
+        'comparison': comparison,
+        'n_trees': int(len(flat['roots'])),
+        'n_nodes': int(len(flat['left'])),
+        'max_depth': int(max_depth),
+        'n_features': int(model.n_features_in_),
+        'feature_names': None if feature_names is None else [str(f) for f in feature_names],
+        'params': params,
+    }
+    _write_manifest(out_dir, manifest)
+    return manifest
+
+
+def export_joblib_object(obj, out_dir):
+    """Store obj uncompressed so joblib can memory-map its numpy buffers."""
+    import joblib
+
+    os.makedirs(out_dir, exist_ok=True)
+    joblib.dump(obj, os.path.join(out_dir, 'object.joblib'))
+    manifest = {'format': FORMAT_VERSION, 'type': 'joblib', 'kind': type(obj).__name__}
+
+    background = getattr(obj, 'data', None)
+    if background is not None:
+        background = np.asarray(getattr(background, 'values', background))
+        if background.dtype != object:
+            np.save(os.path.join(out_dir, 'background.npy'), np.ascontiguousarray(background))
+            manifest['background'] = 'background.npy'
+    _write_manifest(out_dir, manifest)
+    return manifest
+
+
+class MappedTreeEnsemble:
+    """Scores a flattened tree ensemble from memory-mapped node arrays."""
+
+    def __init__(self, path, mmap_mode='r'):
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported artifact format in {path}: {self.manifest.get('format')}")
+        for name in NODE_ARRAYS:
+            setattr(self, f"_{name}", np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode))
+        self.kind = self.manifest['kind']
+        self.params = self.manifest['params']
+        self.n_features_in_ = self.manifest['n_features']
+        names = self.manifest.get('feature_names')
+        self.feature_names_in_ = None if names is None else np.asarray(names, dtype=object)
+        if self.kind == 'RandomForestClassifier':
+            self.classes_ = np.asarray(self.params['classes'])
+        elif self.kind == 'XGBClassifier':
+            self.classes_ = np.asarray([0, 1])
+
+    def _as_array(self, X):
+        if hasattr(X, 'columns') and self.feature_names_in_ is not None:
+            X = X[list(self.feature_names_in_)]
+        # Both sklearn and XGBoost compare features in float32
+        return np.asarray(X, dtype=np.float32)
+
+    def _leaf_values(self, X):
+        X = self._as_array(X)
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(self._roots, (X.shape[0], len(self._roots))).copy()
+        for _ in range(self.manifest['max_depth']):
+            left = self._left[node]
+            active = left != -1
+            if not active.any():
+                break
+            x = X[rows, self._feature[node]]
+            if self.manifest['comparison'] == 'lt':
+                go_left = x < self._threshold[node]
+            else:
+                go_left = x <= self._threshold[node]
+            go_left = np.where(np.isnan(x), self._default_left[node], go_left)
+            node = np.where(active, np.where(go_left, left, self._right[node]), node)
+        return self._value[node]
+
+    def score_samples(self, X):
+        depths = self._leaf_values(X).mean(axis=1)
+        return -(2.0 ** (-depths / self.params['average_path_length']))
+
+    def decision_function(self, X):
+        if self.kind != 'IsolationForest':
+            raise AttributeError(f"{self.kind} artifact has no decision_function")
+        return self.score_samples(X) - self.params['offset']
+
+    def predict_proba(self, X):
+        if self.kind == 'RandomForestClassifier':
+            positive = self._leaf_values(X).mean(axis=1)
+        elif self.kind == 'XGBClassifier':
+            margin = self.params['base_margin'] + self._leaf_values(X).sum(axis=1)
+            positive = 1.0 / (1.0 + np.exp(-margin))
+        else:
+            raise AttributeError(f"{self.kind} artifact has no predict_proba")
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X):
+        if self.kind == 'IsolationForest':
+            return np.where(self.decision_function(X) < 0, -1, 1)
+        return self.classes_[(self.predict_proba(X)[:, 1] > 0.5).astype(int)]
+
+
+def load_artifact(path, mmap_mode='r'):
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest['type'] == 'tree_ensemble':
+        return MappedTreeEnsemble(path, mmap_mode=mmap_mode)
+    import joblib
+    return joblib.load(os.path.join(path, 'object.joblib'), mmap_mode=mmap_mode)
+
+
+def load_model(model_dir, name):
+    """Load models/<name>.artifact if it exists, else fall back to models/<name>.pkl."""
+    path = artifact_dir(model_dir, name)
+    if os.path.exists(os.path.join(path, MANIFEST)):
+        return load_artifact(path)
+    import joblib
+    return joblib.load(os.path.join(model_dir, f"{name}.pkl"))
+
+
+def load_estimator(model_dir, name):
+    """The original pickled model, for libraries (SHAP) that need the real estimator."""
+    import joblib
+    return joblib.load(os.path.join(model_dir, f"{name}.pkl"))
+
+
+def export_model(model_dir, name):
+    import joblib
+
+    model = joblib.load(os.path.join(model_dir, f"{name}.pkl"))
+    out_dir = artifact_dir(model_dir, name)
+    if type(model).__name__ in ('IsolationForest', 'RandomForestClassifier', 'XGBClassifier'):
+        return export_tree_ensemble(model, out_dir)
+    return export_joblib_object(model, out_dir)
+
+
+def verify_model(model_dir, name, X):
+    """Return the largest absolute score difference between the pickle and its artifact."""
+    import joblib
+
+    original = joblib.load(os.path.join(model_dir, f"{name}.pkl"))
+    mapped = load_artifact(artifact_dir(model_dir, name))
+    if not isinstance(mapped, MappedTreeEnsemble):
+        return 0.0
+    if mapped.kind == 'IsolationForest':
+        expected, actual = original.decision_function(X), mapped.decision_function(X)
+    else:
+        expected, actual = original.predict_proba(X)[:, 1], mapped.predict_proba(X)[:, 1]
+    return float(np.max(np.abs(np.asarray(expected) - actual)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export pickled models as memory-mappable artifacts")
+    parser.add_argument('command', choices=['export'])
+    parser.add_argument('--model-dir', default=os.environ.get('FRAUD_MODEL_DIR', 'models'))
+    parser.add_argument('--names', nargs='+',
+                        default=['isolation_forest', 'xgboost', 'random_forest', 'shap_explainer'])
+    parser.add_argument('--verify-csv', help="CSV of feature rows used to check the exported scores")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    for name in args.names:
+        if not os.path.exists(os.path.join(args.model_dir, f"{name}.pkl")):
+            logger.warning(f"Skipping {name}: no pickle in {args.model_dir}")
+            continue
+        manifest = export_model(args.model_dir, name)
+        logger.info(f"Exported {name} ({manifest['kind']}) to {artifact_dir(args.model_dir, name)}")
+        if args.verify_csv and manifest['type'] == 'tree_ensemble':
+            import pandas as pd
+            X = pd.read_csv(args.verify_csv)
+            if manifest['feature_names']:
+                X = X[manifest['feature_names']]
+            logger.info(f"{name}: max abs difference vs pickle = {verify_model(args.model_dir, name, X):.3e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+SHAP explanation modes for the tree models.
+
+  exact    the pickled shap_explainer as trained (today's behaviour)
+  fast     TreeExplainer with the tree-path-dependent algorithm: no
+           background data at all, attributions come from the node covers
+           recorded at training time, so cost depends only on tree size
+  summary  interventional TreeExplainer over a bounded background of
+           SHAP_BACKGROUND_K k-means centroids, for analysts who want a
+           background-relative attribution at a fixed, small cost
+
+fast and summary default to returning the top SHAP_TOP_K features instead
+of the full vector. The background for summary comes from the exact
+explainer's own data when it has any, otherwise from SHAP_BACKGROUND_CSV.
+
+SHAP cannot read a memory-mapped MappedTreeEnsemble, so fast and summary
+are built from the original estimator: the one inside the exact explainer,
+or the pickle that `estimator_loader` reads.
+"""
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MODES = ('exact', 'fast', 'summary')
+DEFAULT_MODE = os.environ.get('SHAP_MODE', 'exact')
+BACKGROUND_K = int(os.environ.get('SHAP_BACKGROUND_K', 50))
+BACKGROUND_CSV = os.environ.get('SHAP_BACKGROUND_CSV')
+TOP_K = int(os.environ.get('SHAP_TOP_K', 5))
+
+
+class ExplainerUnavailable(RuntimeError):
+    """A fast or summary explainer could not be built for the loaded model."""
+
+
+def fraud_class_values(shap_values):
+    # Older SHAP returns [class_0, class_1]; newer returns (rows, features, classes)
+    if isinstance(shap_values, list):
+        return np.asarray(shap_values[1])
+    shap_values = np.asarray(shap_values)
+    return shap_values[:, :, 1] if shap_values.ndim == 3 else shap_values
+
+
+def fraud_base_value(explainer):
+    expected = np.atleast_1d(explainer.expected_value)
+    return float(expected[1] if len(expected) > 1 else expected[0])
+
+
+def top_features(values, feature_names, feature_values=None, k=TOP_K):
+    """The k largest attributions by magnitude, largest first."""
+    order = np.argsort(-np.abs(values))[:k]
+    return [{"feature": feature_names[i], "shap_value": float(values[i]),
+             **({"value": float(feature_values[i])} if feature_values is not None else {})}
+            for i in order]
+
+
+class ExplainerModes:
+    """Builds the fast and summary explainers on first use and keeps them."""
+
+    def __init__(self, model, exact_explainer, feature_names, background_k=BACKGROUND_K,
+                 background_csv=BACKGROUND_CSV, estimator_loader=None):
+        self.model = model
+        self.estimator_loader = estimator_loader
+        self.feature_names = list(feature_names)
+        self.background_k = background_k
+        self.background_csv = background_csv
+        self._explainers = {'exact': exact_explainer}
+        self._lock = threading.Lock()
+
+    def default_top_k(self, mode):
+        return None if mode == 'exact' else TOP_K
+
+    def get(self, mode):
+        if mode not in MODES:
+            raise ValueError(f"unknown mode {mode!r}, expected one of {', '.join(MODES)}")
+        explainer = self._explainers.get(mode)
+        if explainer is None:
+            with self._lock:
+                explainer = self._explainers.get(mode)
+                if explainer is None:
+                    explainer = self._explainers[mode] = self._build(mode)
+        return explainer
+
+    def tree_model(self):
+        """The estimator SHAP builds explainers from."""
+        from serving.artifacts import MappedTreeEnsemble
+        if not isinstance(self.model, MappedTreeEnsemble):
+            return self.model
+        original = getattr(getattr(self._explainers['exact'], 'model', None), 'original_model', None)
+        if original is not None:
+            return original
+        if self.estimator_loader is not None:
+            return self.estimator_loader()
+        raise ExplainerUnavailable("the model is a memory-mapped artifact and no original estimator is available")
+
+    def _build(self, mode):
+        import shap
+        # Missing background data is the caller's problem (ValueError), not the model's
+        background = None if mode == 'fast' else self.background()
+        try:
+            model = self.tree_model()
+            if mode == 'fast':
+                return shap.TreeExplainer(model, feature_perturbation='tree_path_dependent')
+            logger.info(f"Summarizing {len(background)} background rows into {self.background_k} k-means centroids")
+            centroids = shap.kmeans(background, min(self.background_k, len(background))).data
+            return shap.TreeExplainer(model, data=pd.DataFrame(centroids, columns=self.feature_names),
+                                      feature_perturbation='interventional')
+        except ExplainerUnavailable:
+            raise
+        except Exception as e:
+            raise ExplainerUnavailable(f"could not build the {mode} explainer: {e}") from e
+
+    def background(self):
+        data = getattr(self._explainers['exact'], 'data', None)
+        if data is not None and len(data):
+            return pd.DataFrame(np.asarray(data), columns=self.feature_names)
+        if self.background_csv:
+            return pd.read_csv(self.background_csv, usecols=self.feature_names)[self.feature_names]
+        raise ValueError("summary mode needs background data: the explainer has none and "
+                         "SHAP_BACKGROUND_CSV is not set")
+
+    def base_value(self, mode):
+        return fraud_base_value(self.get(mode))
+
+    def explain(self, input_df, mode):
+        """(base value, fraud-class SHAP matrix) for the rows of input_df."""
+        explainer = self.get(mode)
+        if mode == 'fast':
+            # Path-dependent attributions are exact for the trees; the
+            # additivity check only costs time here
+            values = explainer.shap_values(input_df, check_additivity=False)
+        else:
+            values = explainer.shap_values(input_df)
+        return fraud_base_value(explainer), fraud_class_values(values)
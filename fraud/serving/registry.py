@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Lazily loads the scoring models and stateful components on first use.
+
+    Nothing heavy (joblib, torch, torch_geometric, shap, xgboost) is imported
+    until a component is actually requested, so importing the web app stays
+    cheap. Call warm_up() from a background thread to pay the load cost
+    before the first request arrives.
+
+    `graph_history`, when given, returns past transactions (oldest first)
+    that are replayed into the transaction graph when it is first built, so
+    the GNN's node aggregates survive a restart.
+    """
+
+    COMPONENTS = ('iso_forest', 'xgb', 'shap_explainer', 'gnn_model',
+                  'graph_builder', 'profiler', 'drift_detector')
+
+    def __init__(self, model_dir=None, feature_names=None, graph_history=None):
+        self.model_dir = model_dir or os.environ.get('FRAUD_MODEL_DIR', 'models')
+        self.feature_names = feature_names
+        self.graph_history = graph_history
+        self._lock = threading.Lock()
+        self._components = {}
+        self.load_times = {}
+        # component -> modification time of the file it was loaded from
+        self.versions = {}
+        # component -> error from its last failed load; cleared when it loads
+        self.failures = {}
+        self._warm_up_done = False
+        self.ready = threading.Event()
+
+    def _get(self, name, loader):
+        # Membership rather than truthiness: a loader may legitimately return
+        # None (e.g. no GNN checkpoint) and must not be retried every request
+        if name in self._components:
+            return self._components[name]
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            if name not in self._components:
+                start = time.perf_counter()
+                try:
+                    self._components[name] = loader()
+                except Exception as e:
+                    self.failures[name] = str(e)
+                    raise
+                self.load_times[name] = time.perf_counter() - start
+                logger.info(f"Loaded {name} in {self.load_times[name]:.3f}s")
+                if self.failures.pop(name, None) is not None:
+                    # A component that failed warm-up loaded on a later request
+                    self._update_ready()
+            return self._components[name]
+
+    def _path(self, filename):
+        return os.path.join(self.model_dir, filename)
+
+    def _record_version(self, component, *paths):
+        for path in paths:
+            if os.path.exists(path):
+                self.versions[component] = time.strftime('%Y%m%dT%H%M%S', time.gmtime(os.path.getmtime(path)))
+                return
+
+    def _load_model(self, component, name):
+        # Prefers the memory-mapped <name>.artifact over <name>.pkl
+        from serving.artifacts import load_model, artifact_dir, MANIFEST
+        model = load_model(self.model_dir, name)
+        self._record_version(component, os.path.join(artifact_dir(self.model_dir, name), MANIFEST),
+                             self._path(f"{name}.pkl"))
+        return model
+
+    @property
+    def iso_forest(self):
+        return self._get('iso_forest', lambda: self._load_model('iso_forest', 'isolation_forest'))
+
+    @property
+    def xgb(self):
+        return self._get('xgb', lambda: self._load_model('xgb', 'xgboost'))
+
+    @property
+    def shap_explainer(self):
+        return self._get('shap_explainer', lambda: self._load_model('shap_explainer', 'shap_explainer'))
+
+    @property
+    def gnn_model(self):
+        def load():
+            from graph_models.gnn_model import load_gnn_model
+            model = load_gnn_model(self._path('gnn_model.pt'))
+            if model is not None:
+                self._record_version('gnn_model', self._path('gnn_model.pt'))
+            return model
+        return self._get('gnn_model', load)
+
+    @property
+    def graph_builder(self):
+        def load():
+            from graph_models.data_loader import TransactionGraphBuilder
+            builder = TransactionGraphBuilder()
+            if self.graph_history is not None:
+                try:
+                    for transaction in self.graph_history():
+                        builder.insert_transaction(transaction)
+                    logger.info(f"Transaction graph seeded with {builder.num_edges // 2} stored transactions")
+                except Exception as e:
+                    # An empty graph still scores; only the history is missing
+                    logger.warning(f"Could not seed the transaction graph from storage: {e}")
+            return builder
+        return self._get('graph_builder', load)
+
+    @property
+    def profiler(self):
+        def load():
+            from profiling.builder import CustomerRiskProfiler
+            return CustomerRiskProfiler()
+        return self._get('profiler', load)
+
+    @property
+    def drift_detector(self):
+        def load():
+            from drift.detector import ConceptDriftDetector
+            from serving.features import categorical_index
+            # Categorical codes are buffered as int8, everything else as float32
+            return ConceptDriftDetector(categorical_index=categorical_index(self.feature_names or []))
+        return self._get('drift_detector', load)
+
+    def loaded(self, name):
+        return name in self._components
+
+    def check_parity(self, rows=200, atol=1e-5):
+        """
+        Score the SHAP explainer's background rows (or FEATURE_PARITY_CSV)
+        through the float32/int8 path and the float64 path. Any difference
+        above `atol` is recorded as a 'float32_parity' failure, which keeps
+        the registry from reporting ready.
+        """
+        import numpy as np
+        import pandas as pd
+        from serving.features import check_parity, categorical_index
+        background = getattr(self.shap_explainer, 'data', None)
+        if background is not None and self.feature_names is not None:
+            X = pd.DataFrame(np.asarray(getattr(background, 'values', background))[:rows],
+                             columns=self.feature_names)
+        elif os.environ.get('FEATURE_PARITY_CSV'):
+            X = pd.read_csv(os.environ['FEATURE_PARITY_CSV'], usecols=self.feature_names,
+                            nrows=rows)[self.feature_names]
+        else:
+            logger.info("No background rows or FEATURE_PARITY_CSV; float32 parity check skipped")
+            return None
+        report, failed = check_parity(X, atol=atol, iso_forest=self.iso_forest, xgb=self.xgb,
+                                      shap_explainer=self.shap_explainer,
+                                      categorical=categorical_index(self.feature_names))
+        if failed:
+            self.failures['float32_parity'] = ", ".join(f"{name} max abs diff {diff:.3e}"
+                                                        for name, diff in failed.items())
+            logger.error(f"float32 parity check failed: {self.failures['float32_parity']}")
+        else:
+            logger.info(f"float32 parity check passed on {len(X)} rows")
+        return report
+
+    def _update_ready(self):
+        if self._warm_up_done and not self.failures:
+            self.ready.set()
+
+    def warm_up(self, names=None):
+        """
+        Load every component (or the given subset). The registry is marked
+        ready only if all of them loaded; failures stay in `failures` until
+        the component loads on a later attempt.
+        """
+        start = time.perf_counter()
+        for name in names or self.COMPONENTS:
+            try:
+                getattr(self, name)
+            except Exception as e:
+                logger.error(f"Warm-up failed for {name}: {str(e)}")
+        if not names and not self.failures:
+            try:
+                self.check_parity()
+            except Exception as e:
+                logger.warning(f"float32 parity check could not run: {e}")
+        self._warm_up_done = True
+        self._update_ready()
+        if self.failures:
+            logger.error(f"Model warm-up finished in {time.perf_counter() - start:.3f}s with failures: "
+                         f"{', '.join(sorted(self.failures))}")
+        else:
+            logger.info(f"Model warm-up completed in {time.perf_counter() - start:.3f}s")
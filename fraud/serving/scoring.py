@@ -0,0 +1,223 @@
+"""
+Fraud scoring shared by api.py and the gateway.
+
+shared_model() loads each model at most once per process, so services
+hosted together (see gateway.py) score and explain with the same
+instances instead of each holding a copy.
+"""
+import logging
+import threading
+from contextlib import nullcontext
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from serving.artifacts import load_model
+from serving.explainers import fraud_base_value, fraud_class_values
+from serving.features import to_model_input
+
+logger = logging.getLogger(__name__)
+
+# Defaults for the customer statistics that would normally come from a database
+DEFAULT_CUSTOMER_STATS = {
+    'AvgAmount': 150.0, 'StdAmount': 75.0, 'MaxAmount': 1000.0,
+    'AvgDuration': 120.0, 'UniqueLocations': 3
+}
+
+# Same cut-offs as the dashboard bands in storage/transactions.py
+RISK_BAND_LIMITS = (('low', 0.4), ('medium', 0.7), ('high', 1.0))
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def shared_model(model_dir, name):
+    """load_model, cached per (model_dir, name) for the life of the process."""
+    key = (model_dir, name)
+    if key not in _models:
+        with _models_lock:
+            if key not in _models:
+                _models[key] = load_model(model_dir, name)
+    return _models[key]
+
+
+def analyze_features(data, cust_stats=DEFAULT_CUSTOMER_STATS):
+    """Engineered feature dict for a dashboard form transaction (api.py's /api/analyze)."""
+    # Safely parse dates
+    try:
+        transaction_date = datetime.strptime(data['TransactionDate'], '%Y-%m-%dT%H:%M')
+        prev_date = datetime.strptime(data['PreviousTransactionDate'], '%Y-%m-%dT%H:%M')
+        days_since_last = (transaction_date - prev_date).days
+    except (KeyError, ValueError, TypeError):
+        days_since_last = 1 # Default to 1 day if dates are invalid
+
+    transaction_duration = float(data.get('TransactionDuration', 60))
+    if transaction_duration == 0:
+        transaction_duration = 1 # Avoid division by zero
+
+    amount = float(data.get('TransactionAmount', 0))
+    return {
+        'TransactionAmount': amount,
+        'TransactionDuration': transaction_duration,
+        'LoginAttempts': int(data.get('LoginAttempts', 1)),
+        'AccountBalance': float(data.get('AccountBalance', 1000)),
+        'DaysSinceLastTransaction': days_since_last,
+        'TransactionSpeed': amount / transaction_duration,
+        'AvgAmount': cust_stats['AvgAmount'],
+        'StdAmount': cust_stats['StdAmount'],
+        'MaxAmount': cust_stats['MaxAmount'],
+        'AvgDuration': cust_stats['AvgDuration'],
+        'UniqueLocations': cust_stats['UniqueLocations'],
+        'AmountDeviation': (amount - cust_stats['AvgAmount']) / (cust_stats['StdAmount'] if cust_stats['StdAmount'] != 0 else 1),
+        'DurationDeviation': (transaction_duration - cust_stats['AvgDuration']) / (cust_stats['AvgDuration'] if cust_stats['AvgDuration'] != 0 else 1),
+        'TransactionType': 0 if data.get('TransactionType', 'Debit') == 'Debit' else 1,
+        'Location': hash(data.get('Location', '')) % 100,
+        'DeviceID': hash(data.get('DeviceID', '')) % 100,
+        'MerchantID': hash(data.get('MerchantID', '')) % 100,
+        'Channel': {'ATM': 0, 'Online': 1, 'Branch': 2}.get(data.get('Channel', 'Online'), 1),
+        'CustomerOccupation': {'Student': 0, 'Doctor': 1, 'Engineer': 2, 'Retired': 3}.get(data.get('CustomerOccupation', 'Engineer'), 2),
+        'CustomerAge': int(data.get('CustomerAge', 30))
+    }
+
+
+class FraudScorer:
+    """
+    The models behind api.py's /api/analyze and the gateway's /predict.
+    All models were trained on the same features, which are read from the
+    random forest.
+    """
+
+    def __init__(self, model_dir):
+        self.model_dir = model_dir
+        self.random_forest = shared_model(model_dir, 'random_forest')
+        self.iso_forest = shared_model(model_dir, 'isolation_forest')
+        self.xgb = shared_model(model_dir, 'xgboost')
+        self.shap_explainer = shared_model(model_dir, 'shap_explainer')
+        self.feature_names = self.random_forest.feature_names_in_
+
+    def analyze(self, data, timer=None):
+        """
+        Composite score and SHAP explanation for one dashboard form
+        transaction. Stage durations go to `timer` (a StageTimer) if given.
+        """
+        stage = timer.stage if timer is not None else lambda name: nullcontext()
+
+        with stage('feature_engineering'):
+            # Convert to a float32 DataFrame with columns in the correct order
+            X = to_model_input(analyze_features(data), self.feature_names)
+
+        # Get predictions
+        with stage('isolation_forest'):
+            iso_score = -self.iso_forest.decision_function(X)[0]
+        with stage('xgboost'):
+            xgb_prob = self.xgb.predict_proba(X)[0, 1]
+
+        # Calculate SHAP values
+        with stage('shap'):
+            # Any explainer output shape: per-class list, 3-D array or the 2-D XGBoost one
+            fraud_shap_values = fraud_class_values(self.shap_explainer.shap_values(X))[0]
+            base_value = fraud_base_value(self.shap_explainer)
+
+        composite_score = (iso_score * 0.5 + xgb_prob * 0.5)
+
+        return {
+            'composite_score': float(composite_score),
+            'xgboost_probability': float(xgb_prob),
+            'shap_base_value': float(base_value),
+            'shap_values': fraud_shap_values.tolist(),
+            'feature_names': self.feature_names.tolist(),
+            'feature_values': X.iloc[0].values.tolist()
+        }
+
+    def predict(self, rows, threshold=0.5):
+        """
+        Random forest fraud probability for rows that already carry the model
+        features (the shap_api Transaction schema), in one vectorized call.
+        """
+        X = pd.DataFrame(list(rows), columns=self.feature_names)
+        probabilities = self.random_forest.predict_proba(X)[:, 1]
+        return [{"prediction": int(p >= threshold), "fraud_probability": float(p)} for p in probabilities]
+
+
+def risk_band(probability):
+    # low <= 0.4 < medium < 0.7 <= high, like RISK_BANDS
+    (_, low), (_, medium), _ = RISK_BAND_LIMITS
+    if probability <= low:
+        return 'low'
+    return 'medium' if probability < medium else 'high'
+
+
+def load_account_transactions(csv_path, account_id, start=None, end=None, chunksize=100_000):
+    """
+    An account's transactions from the raw transactions CSV, in the model's
+    transaction schema. Hour, day, month and year come from TransactionDate;
+    PurchaseFrequency is the number of the account's transactions in the window.
+    """
+    usecols = ['TransactionID', 'AccountID', 'TransactionAmount', 'TransactionDate',
+               'TransactionDuration', 'CustomerAge', 'AccountBalance', 'LoginAttempts']
+    parts = [chunk[chunk['AccountID'] == account_id]
+             for chunk in pd.read_csv(csv_path, usecols=usecols, chunksize=chunksize)]
+    rows = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=usecols)
+    dates = pd.to_datetime(rows['TransactionDate'])
+    in_window = pd.Series(True, index=rows.index)
+    if start:
+        in_window &= dates >= pd.Timestamp(start)
+    if end:
+        end_ts = pd.Timestamp(end)
+        # A plain date ends the window at the end of that day
+        if len(str(end)) <= 10:
+            end_ts += pd.Timedelta(days=1)
+            in_window &= dates < end_ts
+        else:
+            in_window &= dates <= end_ts
+    rows, dates = rows[in_window], dates[in_window]
+    return pd.DataFrame({
+        'TransactionID': rows['TransactionID'],
+        'TransactionAmount': rows['TransactionAmount'].astype(float),
+        'TransactionHour': dates.dt.hour,
+        'TransactionDay': dates.dt.day,
+        'TransactionMonth': dates.dt.month,
+        'TransactionYear': dates.dt.year,
+        'TransactionDuration': rows['TransactionDuration'],
+        'CustomerAge': rows['CustomerAge'],
+        'AccountBalance': rows['AccountBalance'].astype(float),
+        'LoginAttempts': rows['LoginAttempts'],
+        'PurchaseFrequency': len(rows),
+    }).to_dict('records')
+
+
+def summarize_batch(ids, predictions, shap_values, feature_names, top_n=10, top_features=5):
+    """
+    Counts by risk band, the top_n riskiest transactions and the features
+    that dominate the batch's SHAP attributions (mean |SHAP|, and how often
+    each is a row's largest contributor).
+    """
+    probabilities = np.array([p['fraud_probability'] for p in predictions])
+    bands = {band: 0 for band, _ in RISK_BAND_LIMITS}
+    for probability in probabilities:
+        bands[risk_band(probability)] += 1
+
+    riskiest = []
+    for i in np.argsort(-probabilities)[:top_n]:
+        row = {'id': ids[i], 'fraud_probability': float(probabilities[i]),
+               'risk_band': risk_band(probabilities[i])}
+        if shap_values is not None:
+            row['top_feature'] = feature_names[int(np.argmax(np.abs(shap_values[i])))]
+        riskiest.append(row)
+
+    summary = {
+        'count': len(predictions),
+        'risk_bands': bands,
+        'mean_fraud_probability': float(probabilities.mean()) if len(probabilities) else 0.0,
+        'riskiest': riskiest,
+    }
+    if shap_values is not None and len(shap_values):
+        magnitude = np.abs(shap_values)
+        mean_abs = magnitude.mean(axis=0)
+        leading = np.bincount(magnitude.argmax(axis=1), minlength=len(feature_names))
+        summary['dominant_features'] = [
+            {'feature': feature_names[i], 'mean_abs_shap': float(mean_abs[i]), 'top_contributor_count': int(leading[i])}
+            for i in np.argsort(-mean_abs)[:top_features]
+        ]
+    return summary
@@ -1,9 +1,16 @@
-import joblib
+import io
+import json
+import os
 import pandas as pd
 import shap
-from fastapi import FastAPI
-from pydantic import BaseModel, Field
-from typing import Dict, List
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List, Optional
+from serving.artifacts import load_estimator
+from serving.scoring import shared_model
+from serving.explainers import ExplainerModes, ExplainerUnavailable, MODES, DEFAULT_MODE, top_features
 
 # Initialize the FastAPI app
 app = FastAPI(
@@ -14,26 +21,29 @@ app = FastAPI(
 
 # --- Define the input data structure (must match the model's expected features) ---
 class Transaction(BaseModel):
-    TransactionAmount: float = Field(..., example=125.50)
-    TransactionHour: int = Field(..., example=14)
-    TransactionDay: int = Field(..., example=3)
-    TransactionMonth: int = Field(..., example=8)
-    TransactionYear: int = Field(..., example=2025)
-    TransactionDuration: int = Field(..., example=300)
-    CustomerAge: int = Field(..., example=35)
-    AccountBalance: float = Field(..., example=5000.0)
-    LoginAttempts: int = Field(..., example=1)
-    PurchaseFrequency: int = Field(..., example=5)
+    TransactionAmount: float = Field(..., examples=[125.50])
+    TransactionHour: int = Field(..., examples=[14])
+    TransactionDay: int = Field(..., examples=[3])
+    TransactionMonth: int = Field(..., examples=[8])
+    TransactionYear: int = Field(..., examples=[2025])
+    TransactionDuration: int = Field(..., examples=[300])
+    CustomerAge: int = Field(..., examples=[35])
+    AccountBalance: float = Field(..., examples=[5000.0])
+    LoginAttempts: int = Field(..., examples=[1])
+    PurchaseFrequency: int = Field(..., examples=[5])
 
 # --- Load the Model and the SHAP Explainer ---
+MODEL_DIR = os.environ.get('FRAUD_MODEL_DIR', 'models')
+
 try:
-    # Load the pre-trained model
-    model = joblib.load('models/random_forest.pkl')
-    print("Model models/random_forest.pkl loaded successfully.")
+    # Load the pre-trained model (memory-mapped artifact if one has been exported);
+    # shared_model hands gateway.py the same instances
+    model = shared_model(MODEL_DIR, 'random_forest')
+    print(f"Model {MODEL_DIR}/random_forest loaded successfully.")
     
     # Load the pre-calculated SHAP explainer
-    explainer = joblib.load('models/shap_explainer.pkl')
-    print("SHAP explainer models/shap_explainer.pkl loaded successfully.")
+    explainer = shared_model(MODEL_DIR, 'shap_explainer')
+    print(f"SHAP explainer {MODEL_DIR}/shap_explainer loaded successfully.")
 
     # Get the expected feature names from the model
     MODEL_FEATURES = model.feature_names_in_
@@ -44,33 +54,197 @@ except Exception as e:
     explainer = None
     MODEL_FEATURES = []
 
+# exact (the explainer above), fast (tree-path-dependent) or summary
+# (k-means background); see serving/explainers.py. Those two need the
+# sklearn forest itself, which is read from the pickle only if asked for.
+explainer_modes = ExplainerModes(
+    model, explainer, MODEL_FEATURES,
+    estimator_loader=lambda: load_estimator(MODEL_DIR, 'random_forest')
+) if model is not None else None
+
+# Rows explained per vectorized shap_values call in the streaming endpoint
+CHUNK_ROWS = int(os.environ.get('SHAP_CHUNK_ROWS', 256))
+NDJSON = "application/x-ndjson"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+def resolve_mode(mode, top_k):
+    """Validated (mode, top_k); top_k None means the full attribution vector."""
+    mode = mode or DEFAULT_MODE
+    if mode not in MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(MODES)}")
+    if top_k is None:
+        top_k = explainer_modes.default_top_k(mode)
+    return mode, (top_k or None)
+
+def call_explainer(fn, *args):
+    """fn(*args), with explainer failures turned into HTTP errors."""
+    try:
+        return fn(*args)
+    except ExplainerUnavailable as e:
+        # The loaded model cannot back this mode; exact may still work
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        # e.g. summary mode without background data
+        raise HTTPException(status_code=400, detail=str(e))
+
+def explain_frame(input_df, mode):
+    return call_explainer(explainer_modes.explain, input_df, mode)
+
 # --- Define the SHAP Explanation Endpoint ---
 @app.post("/shap_explain")
-def get_shap_explanation(transaction: Transaction):
+def get_shap_explanation(transaction: Transaction,
+                         mode: Optional[str] = Query(None, description="exact, fast or summary"),
+                         top_k: Optional[int] = Query(None, ge=0, description="0 for all features")):
     """
     Receives transaction data and returns the SHAP values to explain the model's prediction.
+    fast and summary modes return the top_k features (SHAP_TOP_K by default) instead of
+    the full vector; the response says which mode was used.
     """
     if model is None or explainer is None:
         return {"error": "Model or explainer not loaded"}
+    mode, top_k = resolve_mode(mode, top_k)
 
     # Convert input to a DataFrame with columns in the correct order
-    input_data = transaction.dict()
+    input_data = transaction.model_dump()
     input_df = pd.DataFrame([input_data], columns=MODEL_FEATURES)
     
-    # Calculate SHAP values for the single prediction
-    shap_values = explainer.shap_values(input_df)
-    
-    # For classification, shap_values is a list [class_0_values, class_1_values]
-    # We are interested in the explanation for the "fraud" class (class 1)
-    fraud_shap_values = shap_values[1][0]
+    # SHAP values of the "fraud" class (class 1) for the single prediction
+    base_value, shap_values = explain_frame(input_df, mode)
+    fraud_shap_values = shap_values[0]
     
+    if top_k:
+        return {
+            "mode": mode,
+            "base_value": base_value,
+            "top_features": top_features(fraud_shap_values, list(MODEL_FEATURES),
+                                         input_df.iloc[0].to_numpy(), k=top_k)
+        }
     return {
-        "base_value": explainer.expected_value[1],
+        "mode": mode,
+        "base_value": base_value,
         "shap_values": fraud_shap_values.tolist(),
-        "feature_names": MODEL_FEATURES.tolist(),
+        "feature_names": list(MODEL_FEATURES),
         "feature_values": input_df.iloc[0].tolist()
     }
 
+def explain_chunk(rows, mode):
+    """SHAP values for the fraud class, one row per input row."""
+    input_df = pd.DataFrame(rows, columns=MODEL_FEATURES)
+    return explain_frame(input_df, mode)[1]
+
+async def ndjson_rows(request):
+    # Parse lines as the body arrives; a line may span network chunks
+    buffer = b""
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+async def iter_async(iterable):
+    for item in iterable:
+        yield item
+
+def arrow_rows(body):
+    import pyarrow as pa
+    reader = pa.ipc.open_stream(body)
+    for batch in reader:
+        yield from batch.to_pylist()
+
+async def explained_chunks(request, mode):
+    """
+    Yields (row indexes, shap matrix, errors) per chunk of CHUNK_ROWS valid
+    rows. Rows that fail validation are reported as errors, not explained.
+    """
+    content_type = request.headers.get("content-type", NDJSON).split(";")[0].strip()
+    if content_type == ARROW_STREAM:
+        # Arrow IPC is compact, so the whole body is read before decoding
+        source = iter_async(arrow_rows(await request.body()))
+    else:
+        source = ndjson_rows(request)
+
+    index, rows, row_ids, errors = 0, [], [], []
+    async for raw in source:
+        try:
+            record = json.loads(raw) if isinstance(raw, bytes) else raw
+            rows.append(Transaction.model_validate(record).model_dump())
+            row_ids.append(index)
+        except (ValueError, ValidationError) as e:
+            errors.append({"row": index, "error": str(e).splitlines()[0]})
+        index += 1
+        if len(rows) >= CHUNK_ROWS:
+            yield row_ids, await run_in_threadpool(explain_chunk, rows, mode), errors
+            rows, row_ids, errors = [], [], []
+    yield row_ids, (await run_in_threadpool(explain_chunk, rows, mode) if rows else None), errors
+
+async def stream_ndjson(request, mode, top_k):
+    # First line: what every row's values refer to
+    # The first use of a mode builds its explainer, so off the event loop
+    base_value = await run_in_threadpool(explainer_modes.base_value, mode)
+    yield json.dumps({"mode": mode, "base_value": base_value, "feature_names": list(MODEL_FEATURES)}) + "\n"
+    feature_names = list(MODEL_FEATURES)
+    async for row_ids, values, errors in explained_chunks(request, mode):
+        lines = [json.dumps(error) for error in errors]
+        if values is not None and top_k:
+            lines += [json.dumps({"row": row, "top_features": top_features(v, feature_names, k=top_k)})
+                      for row, v in zip(row_ids, values)]
+        elif values is not None:
+            lines += [json.dumps({"row": row, "shap_values": v}) for row, v in zip(row_ids, values.tolist())]
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+async def stream_arrow(request, mode):
+    import pyarrow as pa
+    base_value = await run_in_threadpool(explainer_modes.base_value, mode)
+    schema = pa.schema([pa.field("row", pa.int64())] +
+                       [pa.field(f"shap_{name}", pa.float64()) for name in MODEL_FEATURES],
+                       metadata={"base_value": str(base_value), "mode": mode})
+    # The writer appends to `sink`; each chunk's bytes are sent and cleared
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def take():
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    yield take()
+    async for row_ids, values, _ in explained_chunks(request, mode):
+        if values is None or not row_ids:
+            continue
+        columns = [pa.array(row_ids, pa.int64())] + [pa.array(values[:, i]) for i in range(values.shape[1])]
+        writer.write_batch(pa.record_batch(columns, schema=schema))
+        yield take()
+    writer.close()
+    yield take()
+
+@app.post("/shap_explain/stream")
+async def stream_shap_explanations(request: Request,
+                                   mode: Optional[str] = Query(None, description="exact, fast or summary"),
+                                   top_k: Optional[int] = Query(None, ge=0, description="0 for all features")):
+    """
+    Explains a stream of transactions: NDJSON (one Transaction per line) or
+    an Arrow IPC stream, with Content-Type set accordingly. Rows are
+    explained in vectorized chunks and results are streamed back as each
+    chunk finishes, as NDJSON or, with `Accept: application/vnd.apache.arrow.stream`,
+    as an Arrow IPC stream. Rows are numbered from 0 in input order; invalid
+    rows get an error line in NDJSON and are left out of Arrow output.
+    top_k applies to NDJSON output; Arrow always carries every feature.
+    """
+    if model is None or explainer is None:
+        raise HTTPException(status_code=503, detail="Model or explainer not loaded")
+    mode, top_k = resolve_mode(mode, top_k)
+    # Build the mode's explainer before the response starts, so a missing
+    # background is a 400 rather than a broken stream
+    await run_in_threadpool(call_explainer, explainer_modes.get, mode)
+    if ARROW_STREAM in request.headers.get("accept", ""):
+        return StreamingResponse(stream_arrow(request, mode), media_type=ARROW_STREAM)
+    return StreamingResponse(stream_ndjson(request, mode, top_k), media_type=NDJSON)
+
 @app.get("/")
 def read_root():
     return {"message": "SHAP Explanation API is running. Go to /docs for API documentation."}
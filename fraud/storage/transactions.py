@@ -0,0 +1,366 @@
+"""
+Persistence for scored transactions and fraud alerts.
+
+TransactionStore owns the connections: a psycopg2 ThreadedConnectionPool for
+Postgres, or one shared sqlite3 connection for the offline stand-in.
+TransactionWriter sits in front of it on the request path. /api/analyze only
+appends to a bounded in-memory queue; a background thread drains it and
+writes multi-row INSERTs whenever a batch fills up or the flush interval
+passes.
+"""
+import base64
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from storage.db import connect, database_url, is_sqlite
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_COLUMNS = ('transaction_id', 'account_id', 'amount', 'transaction_date', 'transaction_type',
+                       'location', 'device_id', 'merchant_id', 'channel', 'risk_score', 'status')
+ALERT_COLUMNS = ('transaction_id', 'alert_type', 'severity', 'description')
+LIST_COLUMNS = ('id', 'transaction_id', 'account_id', 'amount', 'transaction_date', 'transaction_type',
+                'location', 'risk_score', 'status')
+
+# Dashboard risk bands; 'high' starts at the SAR flagging threshold
+# (reporting.generator.SAR_THRESHOLD). Inlined as literals (not parameters)
+# so the planner can match them to the partial indexes in init.sql.
+RISK_BANDS = {
+    'low': "risk_score <= 0.4",
+    'medium': "risk_score > 0.4 AND risk_score < 0.7",
+    'high': "risk_score >= 0.7",
+}
+
+
+def encode_cursor(transaction_date, row_id):
+    return base64.urlsafe_b64encode(f"{transaction_date}|{row_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor."""
+    try:
+        transaction_date, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return transaction_date, int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+# Offline stand-in for the tables in init.sql
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    transaction_id TEXT UNIQUE NOT NULL,
+    account_id TEXT NOT NULL,
+    amount REAL NOT NULL,
+    transaction_date TEXT NOT NULL,
+    transaction_type TEXT,
+    location TEXT,
+    device_id TEXT,
+    merchant_id TEXT,
+    channel TEXT,
+    risk_score REAL,
+    status TEXT DEFAULT 'pending',
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS customers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id TEXT UNIQUE NOT NULL,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS fraud_alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    transaction_id TEXT REFERENCES transactions(transaction_id),
+    alert_type TEXT,
+    severity TEXT,
+    description TEXT,
+    status TEXT DEFAULT 'open',
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_date_id ON transactions(transaction_date, id);
+CREATE INDEX IF NOT EXISTS idx_transactions_status_date_id ON transactions(status, transaction_date, id);
+CREATE INDEX IF NOT EXISTS idx_transactions_account_date_id ON transactions(account_id, transaction_date, id);
+CREATE INDEX IF NOT EXISTS idx_transactions_high_risk_date_id ON transactions(transaction_date, id)
+    WHERE risk_score >= 0.7;
+CREATE INDEX IF NOT EXISTS idx_transactions_medium_risk_date_id ON transactions(transaction_date, id)
+    WHERE risk_score > 0.4 AND risk_score < 0.7;
+CREATE INDEX IF NOT EXISTS idx_transactions_low_risk_date_id ON transactions(transaction_date, id)
+    WHERE risk_score <= 0.4;
+"""
+
+
+class TransactionStore:
+    def __init__(self, url=None, pool_size=None):
+        self.url = url or database_url()
+        self.sqlite = is_sqlite(self.url)
+        self.pool_size = pool_size or int(os.environ.get("DATABASE_POOL_SIZE", 4))
+        self._pool = None
+        self._sqlite_conn = None
+        # Serialises the single sqlite connection; Postgres gets one
+        # connection per thread from the pool instead
+        self._sqlite_lock = threading.Lock()
+        self._init_lock = threading.Lock()
+
+    def _connect(self):
+        # Opened on first use so the app starts even while the database is down
+        with self._init_lock:
+            if self.sqlite:
+                if self._sqlite_conn is None:
+                    conn = connect(self.url)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(SQLITE_SCHEMA)
+                    self._sqlite_conn = conn
+            elif self._pool is None:
+                from psycopg2.pool import ThreadedConnectionPool
+                self._pool = ThreadedConnectionPool(1, self.pool_size, self.url)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success, rolls back on error."""
+        self._connect()
+        if self.sqlite:
+            with self._sqlite_lock:
+                try:
+                    yield self._sqlite_conn
+                    self._sqlite_conn.commit()
+                except Exception:
+                    self._sqlite_conn.rollback()
+                    raise
+            return
+
+        conn = self._pool.getconn()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            broken = bool(conn.closed)
+            if not broken:
+                conn.rollback()
+            raise
+        finally:
+            self._pool.putconn(conn, close=broken)
+
+    def insert_batch(self, transactions, alerts=()):
+        """Multi-row insert; rows already stored (same transaction_id) are skipped."""
+        with self.connection() as conn:
+            if self.sqlite:
+                conn.executemany(
+                    f"INSERT OR IGNORE INTO transactions ({', '.join(TRANSACTION_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(TRANSACTION_COLUMNS))})", transactions)
+                if alerts:
+                    conn.executemany(
+                        f"INSERT INTO fraud_alerts ({', '.join(ALERT_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(ALERT_COLUMNS))})", alerts)
+                return
+
+            from psycopg2.extras import execute_values
+            with conn.cursor() as cursor:
+                execute_values(
+                    cursor,
+                    f"INSERT INTO transactions ({', '.join(TRANSACTION_COLUMNS)}) VALUES %s "
+                    "ON CONFLICT (transaction_id) DO NOTHING",
+                    transactions, page_size=len(transactions) or 1)
+                if alerts:
+                    execute_values(
+                        cursor,
+                        f"INSERT INTO fraud_alerts ({', '.join(ALERT_COLUMNS)}) VALUES %s",
+                        alerts, page_size=len(alerts))
+
+    def list_transactions(self, limit=50, cursor=None, status=None, risk_band=None, account_id=None):
+        """
+        Newest-first page of stored transactions using keyset pagination on
+        (transaction_date, id): each page is an index range scan that starts
+        where the previous one ended, however deep the caller has paged.
+        Returns (rows as dicts, next_cursor or None).
+        """
+        where, params = [], []
+        p = "?" if self.sqlite else "%s"
+        if status:
+            where.append(f"status = {p}")
+            params.append(status)
+        if account_id:
+            where.append(f"account_id = {p}")
+            params.append(account_id)
+        if risk_band:
+            if risk_band not in RISK_BANDS:
+                raise ValueError(f"risk_band must be one of {', '.join(RISK_BANDS)}")
+            where.append(RISK_BANDS[risk_band])
+        if cursor:
+            transaction_date, row_id = decode_cursor(cursor)
+            where.append(f"(transaction_date, id) < ({p}, {p})")
+            params.extend([transaction_date, row_id])
+
+        sql = (f"SELECT {', '.join(LIST_COLUMNS)} FROM transactions "
+               f"{'WHERE ' + ' AND '.join(where) if where else ''} "
+               f"ORDER BY transaction_date DESC, id DESC LIMIT {p}")
+        # One extra row tells us whether there is a next page
+        params.append(limit + 1)
+        with self.connection() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(sql, params)
+                rows = [dict(zip(LIST_COLUMNS, row)) for row in cur.fetchall()]
+            finally:
+                cur.close()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]['transaction_date'], rows[-1]['id'])
+        return rows, next_cursor
+
+    def rollup_rows(self, days=30, day=None):
+        """
+        (day, status, *reporting.rollup.COUNTERS) rows for the newest `days`
+        days with data up to tomorrow, or for `day` alone. Postgres reads the
+        trigger-maintained rollup table; sqlite has no trigger, so it
+        aggregates the (small, local) transactions table.
+        """
+        from reporting.generator import SAR_THRESHOLD, CTR_THRESHOLD
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if self.sqlite:
+                    where, params = ("DATE(transaction_date) = ?", (str(day),)) if day else \
+                        ("transaction_date >= DATE('now', ?)", (f"-{int(days)} days",))
+                    cursor.execute(
+                        "SELECT DATE(transaction_date), COALESCE(status, 'pending'), COUNT(*), SUM(amount), "
+                        "COALESCE(SUM(risk_score), 0), COUNT(risk_score), "
+                        "COUNT(CASE WHEN risk_score >= ? THEN 1 END), COUNT(CASE WHEN amount > ? THEN 1 END) "
+                        f"FROM transactions WHERE {where} "
+                        "GROUP BY DATE(transaction_date), COALESCE(status, 'pending')",
+                        (SAR_THRESHOLD, CTR_THRESHOLD, *params))
+                else:
+                    columns = ("day, status, transaction_count, total_amount, risk_score_sum, scored_count, "
+                               "high_risk_count, large_amount_count")
+                    if day:
+                        cursor.execute(f"SELECT {columns} FROM daily_transaction_rollup WHERE day = %s", (day,))
+                    else:
+                        # Future-dated rows are left out so they cannot push real days off the list
+                        cursor.execute(
+                            f"SELECT {columns} FROM daily_transaction_rollup WHERE day IN ("
+                            "SELECT DISTINCT day FROM daily_transaction_rollup "
+                            "WHERE day <= CURRENT_DATE + 1 ORDER BY day DESC LIMIT %s)", (int(days),))
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
+    def graph_rows(self, limit=100000):
+        """
+        The newest `limit` transactions with an account, merchant and device,
+        oldest first, as TransactionGraphBuilder input. Used to rebuild the
+        in-process transaction graph after a restart.
+        """
+        p = "?" if self.sqlite else "%s"
+        sql = ("SELECT account_id, merchant_id, device_id, amount FROM ("
+               "SELECT account_id, merchant_id, device_id, amount, transaction_date, id FROM transactions "
+               "WHERE merchant_id IS NOT NULL AND device_id IS NOT NULL "
+               f"ORDER BY transaction_date DESC, id DESC LIMIT {p}) recent "
+               "ORDER BY transaction_date, id")
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql, (int(limit),))
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+        return [{'AccountID': account_id, 'MerchantID': merchant_id, 'DeviceID': device_id,
+                 'TransactionAmount': float(amount)}
+                for account_id, merchant_id, device_id, amount in rows]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.closeall()
+            self._pool = None
+        if self._sqlite_conn is not None:
+            self._sqlite_conn.close()
+            self._sqlite_conn = None
+
+
+class TransactionWriter:
+    """
+    Write-behind buffer in front of a TransactionStore. submit() never
+    blocks: when the queue is full (database down or too slow) the row is
+    dropped and counted rather than slowing down scoring.
+    """
+
+    def __init__(self, store=None, batch_size=None, flush_interval=None, max_queue=None):
+        self.store = store or TransactionStore()
+        self.batch_size = batch_size or int(os.environ.get("DB_WRITE_BATCH_SIZE", 500))
+        self.flush_interval = flush_interval or float(os.environ.get("DB_WRITE_FLUSH_SECONDS", 1.0))
+        self._queue = queue.Queue(maxsize=max_queue or int(os.environ.get("DB_WRITE_QUEUE_SIZE", 10000)))
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_size = 0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="transaction-writer", daemon=True)
+                    self._thread.start()
+
+    def submit(self, transaction, alert=None):
+        """transaction is a tuple in TRANSACTION_COLUMNS order, alert one in ALERT_COLUMNS order."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((transaction, alert))
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"Transaction write queue full; {self.dropped} rows dropped so far")
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch):
+        transactions = [t for t, _ in batch]
+        alerts = [a for _, a in batch if a is not None]
+        self.last_batch_size = len(transactions)
+        try:
+            self.store.insert_batch(transactions, alerts)
+            self.written += len(transactions)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(transactions)
+            logger.error(f"Failed to write {len(transactions)} transactions: {e}")
+
+    def close(self, timeout=10):
+        """Flush what is queued and stop the writer thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.store.close()
+
+    def stats(self):
+        return {
+            "queued": self.pending(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
@@ -0,0 +1,102 @@
+"""
+In-process fan-out of scored transactions to live dashboard connections.
+
+Every /api/transactions/stream client gets its own Subscription holding a
+bounded deque. publish() never blocks on a client: when a slow client's
+queue is full the oldest event is dropped and counted, and the client is
+told how many it missed so it can refetch the page.
+"""
+import itertools
+import json
+import threading
+import time
+from collections import deque
+
+
+class Subscription:
+    def __init__(self, max_queue):
+        self._events = deque(maxlen=max_queue)
+        self._cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def push(self, event):
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                # deque(maxlen) discards the oldest entry on append
+                self.dropped += 1
+            self._events.append(event)
+            self._cond.notify()
+
+    def drain(self, timeout):
+        """Wait up to `timeout` seconds for events and return all that are queued."""
+        with self._cond:
+            if not self._events and not self.closed:
+                self._cond.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            return events
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+
+class TransactionFeed:
+    def __init__(self, max_queue=256, max_subscribers=1000):
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.published = 0
+
+    def subscribe(self):
+        """Returns a Subscription, or None when the subscriber limit is reached."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscription = Subscription(self.max_queue)
+            self._subscribers.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+        subscription.close()
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event_type, payload):
+        # Serialized once here rather than once per client
+        event = (next(self._ids), event_type, json.dumps(payload))
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.push(event)
+        self.published += 1
+
+    def stream(self, subscription, keepalive=15.0):
+        """
+        Server-Sent Events for one subscription. Sends a comment line when
+        idle so proxies keep the connection open and disconnected clients
+        are noticed on the next write.
+        """
+        try:
+            yield "retry: 3000\n\n"
+            reported_drops = 0
+            while not subscription.closed:
+                events = subscription.drain(keepalive)
+                if subscription.dropped != reported_drops:
+                    yield f"event: dropped\ndata: {subscription.dropped - reported_drops}\n\n"
+                    reported_drops = subscription.dropped
+                if not events:
+                    yield f": keepalive {int(time.time())}\n\n"
+                    continue
+                yield "".join(f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+                              for event_id, event_type, data in events)
+        finally:
+            self.unsubscribe(subscription)
@@ -8,6 +8,8 @@ import platform
 # --- ADDITION: Import both of your custom tools ---
 from tools.fraud_tool import check_transaction_for_fraud
 from tools.nlp_tool import analyze_text_for_risk
+from tools.batch_tool import analyze_transactions_batch
+from tools.memo import memoize_tools
 # ----------------------------------------------------
 
 if platform.system() == "Windows":
@@ -20,7 +22,7 @@ if "event_loop" not in st.session_state:
     st.session_state.event_loop = loop
     asyncio.set_event_loop(loop)
 
-from langgraph.prebuilt import create_react_agent
+from langgraph.prebuilt import create_react_agent, ToolNode
 from langchain_anthropic import ChatAnthropic
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -180,9 +182,11 @@ async def process_query(query, text_placeholder, tool_placeholder, timeout_secon
                         st.session_state.agent,
                         {"messages": messages},
                         callback=streaming_callback,
+                        # thread_id identifies the conversation to the checkpointer
+                        # and to the tool memo, which read it from "configurable"
                         config=RunnableConfig(
                             recursion_limit=st.session_state.recursion_limit,
-                            thread_id=st.session_state.thread_id,
+                            configurable={"thread_id": st.session_state.thread_id},
                         ),
                     ),
                     timeout=timeout_seconds,
@@ -207,8 +211,13 @@ async def initialize_session():
         # --- FIX: Add the new NLP tool to the agent's tool list ---
         tools = [
             check_transaction_for_fraud, 
-            analyze_text_for_risk
+            analyze_text_for_risk,
+            analyze_transactions_batch
         ]
+        # The scoring tools are deterministic within a conversation: repeats are
+        # answered from a per-thread memo, and ToolNode runs the tool calls of
+        # one model turn concurrently (asyncio.gather over the async tools)
+        tools, st.session_state.tool_memo = memoize_tools(tools)
         # ---------------------------------------------------------
         
         st.session_state.tool_count = len(tools)
@@ -231,7 +240,7 @@ async def initialize_session():
                 max_tokens=OUTPUT_TOKEN_INFO.get(selected_model, {}).get("max_tokens", 4096),
             )
             
-        agent = create_react_agent(model, tools, checkpointer=MemorySaver())
+        agent = create_react_agent(model, ToolNode(tools), checkpointer=MemorySaver())
         
         st.session_state.agent = agent
         st.session_state.session_initialized = True
@@ -4,51 +4,110 @@ from langchain_community.vectorstores import FAISS
 from langchain_openai import OpenAIEmbeddings
 from mcp.server.fastmcp import FastMCP
 from dotenv import load_dotenv
-from typing import Any
+from typing import Any, Dict, List
+import argparse
+import hashlib
+import json
+import os
+import sys
 
 # Load environment variables from .env file (contains API keys)
 load_dotenv(override=True)
 
+# Where the FAISS index and its manifest live, and which PDFs to ingest
+INDEX_DIR = os.environ.get("RAG_INDEX_DIR", "data/faiss_index")
+DOCUMENTS = os.environ.get("RAG_DOCUMENTS", "data/sample.pdf").split(",")
+MANIFEST = "manifest.json"
+EMBEDDING_MODEL = "text-embedding-3-small"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 50
 
-def create_retriever() -> Any:
-    """
-    Creates and returns a document retriever based on FAISS vector store.
 
-    This function performs the following steps:
-    1. Loads a PDF document(place your PDF file in the data folder)
-    2. Splits the document into manageable chunks
-    3. Creates embeddings for each chunk
-    4. Builds a FAISS vector store from the embeddings
-    5. Returns a retriever interface to the vector store
+def document_hash(path: str) -> str:
+    """SHA-256 of the file contents, so a re-ingest only embeds changed documents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
-    Returns:
-        Any: A retriever object that can be used to query the document database
-    """
-    # Step 1: Load Documents
-    # PyMuPDFLoader is used to extract text from PDF files
-    loader = PyMuPDFLoader("data/sample.pdf")
-    docs = loader.load()
 
-    # Step 2: Split Documents
-    # Recursive splitter divides documents into chunks with some overlap to maintain context
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=50)
-    split_documents = text_splitter.split_documents(docs)
+def empty_manifest() -> Dict[str, Any]:
+    return {"embedding_model": EMBEDDING_MODEL, "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP, "documents": {}}
 
-    # Step 3: Create Embeddings
-    # OpenAI's text-embedding-3-small model is used to convert text chunks into vector embeddings
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
 
-    # Step 4: Create Vector Database
-    # FAISS is an efficient similarity search library that stores vector embeddings
-    # and allows for fast retrieval of similar vectors
-    vectorstore = FAISS.from_documents(documents=split_documents, embedding=embeddings)
+def load_manifest(index_dir: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(index_dir, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return empty_manifest()
 
-    # Step 5: Create Retriever
-    # The retriever provides an interface to search the vector database
-    # and retrieve documents relevant to a query
-    retriever = vectorstore.as_retriever()
-    return retriever
 
+def ingest(paths: List[str], index_dir: str = INDEX_DIR) -> Dict[str, Any]:
+    """
+    Builds or updates the persisted FAISS index for `paths`.
+
+    The manifest maps each document's content hash to its source and chunk
+    ids. Documents whose hash is already indexed are skipped; chunks of
+    documents that changed or are no longer listed are removed, so only new
+    content is loaded, split and embedded. Returns the manifest.
+    """
+    embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
+    manifest = load_manifest(index_dir)
+    settings = (manifest["embedding_model"], manifest["chunk_size"], manifest["chunk_overlap"])
+    vectorstore = None
+    if manifest["documents"] and settings == (EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP):
+        vectorstore = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+    else:
+        # No index yet, or the embedding model or chunking changed (old vectors are not comparable)
+        manifest = empty_manifest()
+
+    current = {document_hash(path): path for path in paths}
+    stale = [doc_hash for doc_hash in manifest["documents"] if doc_hash not in current]
+    if stale and vectorstore is not None:
+        vectorstore.delete([chunk_id for doc_hash in stale for chunk_id in manifest["documents"][doc_hash]["chunk_ids"]])
+    for doc_hash in stale:
+        del manifest["documents"][doc_hash]
+
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    for doc_hash, path in current.items():
+        if doc_hash in manifest["documents"]:
+            continue
+        split_documents = text_splitter.split_documents(PyMuPDFLoader(path).load())
+        chunk_ids = [f"{doc_hash}:{i}" for i in range(len(split_documents))]
+        for document in split_documents:
+            document.metadata["document_hash"] = doc_hash
+        if vectorstore is None:
+            vectorstore = FAISS.from_documents(documents=split_documents, embedding=embeddings, ids=chunk_ids)
+        else:
+            vectorstore.add_documents(split_documents, ids=chunk_ids)
+        manifest["documents"][doc_hash] = {"source": path, "chunks": len(chunk_ids), "chunk_ids": chunk_ids}
+        # stdout carries the MCP stdio transport
+        print(f"Ingested {path}: {len(chunk_ids)} chunks", file=sys.stderr)
+
+    if vectorstore is None:
+        raise ValueError("Nothing to index: no documents were given")
+    os.makedirs(index_dir, exist_ok=True)
+    vectorstore.save_local(index_dir)
+    # Written last, so a manifest always describes a saved index
+    with open(os.path.join(index_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_retriever(index_dir: str = INDEX_DIR) -> Any:
+    """Retriever over the persisted index, ingesting DOCUMENTS first if there is none yet."""
+    if not os.path.exists(os.path.join(index_dir, MANIFEST)):
+        ingest(DOCUMENTS, index_dir)
+    embeddings = OpenAIEmbeddings(model=load_manifest(index_dir)["embedding_model"])
+    vectorstore = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+    return vectorstore.as_retriever()
+
+
+# Loaded once, before the server accepts queries (see __main__)
+retriever = None
 
 # Initialize FastMCP server with configuration
 mcp = FastMCP(
@@ -64,8 +123,8 @@ async def retrieve(query: str) -> str:
     """
     Retrieves information from the document database based on the query.
 
-    This function creates a retriever, queries it with the provided input,
-    and returns the concatenated content of all retrieved documents.
+    This function queries the retriever loaded at startup with the provided
+    input, and returns the concatenated content of all retrieved documents.
 
     Args:
         query (str): The search query to find relevant information
@@ -73,17 +132,30 @@ async def retrieve(query: str) -> str:
     Returns:
         str: Concatenated text content from all retrieved documents
     """
-    # Create a new retriever instance for each query
-    # Note: In production, consider caching the retriever for better performance
-    retriever = create_retriever()
+    global retriever
+    if retriever is None:
+        # Started without __main__ (e.g. by an MCP dev runner): load the persisted index once
+        retriever = load_retriever()
 
-    # Use the invoke() method to get relevant documents based on the query
-    retrieved_docs = retriever.invoke(query)
+    # The index is already loaded; a query only embeds the query text
+    retrieved_docs = await retriever.ainvoke(query)
 
     # Join all document contents with newlines and return as a single string
     return "\n".join([doc.page_content for doc in retrieved_docs])
 
 
 if __name__ == "__main__":
-    # Run the MCP server with stdio transport for integration with MCP clients
-    mcp.run(transport="stdio")
+    parser = argparse.ArgumentParser(description="Retriever MCP server")
+    parser.add_argument("--ingest", nargs="*", metavar="PDF",
+                        help="Build or update the index (RAG_DOCUMENTS when no files are given) and exit")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    args = parser.parse_args()
+
+    if args.ingest is not None:
+        manifest = ingest(args.ingest or DOCUMENTS, args.index_dir)
+        print(f"{len(manifest['documents'])} documents indexed in {args.index_dir}")
+    else:
+        # Load the persisted index before accepting queries
+        retriever = load_retriever(args.index_dir)
+        # Run the MCP server with stdio transport for integration with MCP clients
+        mcp.run(transport="stdio")
@@ -0,0 +1,62 @@
+import logging
+from typing import List, Optional
+
+import httpx
+from langchain_core.tools import tool
+from pydantic import BaseModel, Field
+from tools.http_client import get_service, ServiceUnavailable
+
+logger = logging.getLogger(__name__)
+
+# Scoring and explaining a few thousand rows takes longer than one transaction
+BATCH_TIMEOUT = 120.0
+
+
+class TransactionInput(BaseModel):
+    TransactionAmount: float
+    TransactionID: Optional[str] = None
+    TransactionHour: int = 12
+    TransactionDay: int = 1
+    TransactionMonth: int = 1
+    TransactionYear: int = 2024
+    TransactionDuration: int = 120
+    CustomerAge: int = 35
+    AccountBalance: float = 5000.0
+    LoginAttempts: int = 1
+    PurchaseFrequency: int = 1
+
+
+@tool
+async def analyze_transactions_batch(
+    transactions: Optional[List[TransactionInput]] = None,
+    account_id: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    top_n: int = 10
+) -> dict:
+    """
+    Analyzes many transactions for fraud in a single call and returns an aggregated summary:
+    counts by risk band (low/medium/high), the top_n riskiest transactions and the features
+    that drive the fraud scores across the batch.
+    Either pass `transactions` (a list with at least TransactionAmount each; fill in any other
+    known fields), or pass `account_id` with optional `start_date`/`end_date` (YYYY-MM-DD,
+    inclusive) to analyze all of that account's transactions in the period.
+    Use this instead of calling check_transaction_for_fraud repeatedly.
+    """
+    if transactions:
+        payload = {"transactions": [t.model_dump() if isinstance(t, BaseModel) else TransactionInput(**t).model_dump()
+                                    for t in transactions]}
+    elif account_id:
+        payload = {"account_id": account_id, "start": start_date, "end": end_date}
+    else:
+        return {"error": "Provide either transactions or an account_id"}
+
+    logger.debug("Calling batch Fraud API for %s", len(payload.get("transactions", [])) or account_id)
+
+    # One request for the whole batch; only the summary comes back to the agent
+    try:
+        response = await get_service("fraud").post_json(
+            f"/predict/batch?include_results=false&top_n={top_n}", payload, timeout=BATCH_TIMEOUT)
+    except (ServiceUnavailable, httpx.HTTPError, ValueError) as e:
+        return {"error": f"Batch API call failed: {e}"}
+    return {"mode": response.get("mode"), **response.get("summary", {})}
@@ -1,9 +1,10 @@
 from langchain_core.tools import tool
-import requests
+import httpx
+from tools.http_client import get_service, ServiceUnavailable
 
 # --- FIX: Updated the tool to accept and send the CORRECT feature names ---
 @tool
-def check_transaction_for_fraud(
+async def check_transaction_for_fraud(
     TransactionAmount: float, 
     CustomerAge: int, 
     AccountBalance: float, 
@@ -14,8 +15,6 @@ def check_transaction_for_fraud(
     You must provide the TransactionAmount, CustomerAge, AccountBalance, and LoginAttempts.
     Returns a dictionary containing the fraud prediction and probability score.
     """
-    api_url = "http://localhost:8000/predict"
-    
     # Create the payload with the correct feature names.
     # We provide default values for the features not included in the function signature.
     payload = {
@@ -33,9 +32,8 @@ def check_transaction_for_fraud(
     
     print(f"DEBUG: Calling Fraud API with payload: {payload}")
     
+    # Pooled keep-alive connection with timeout, retries and circuit breaker (FRAUD_API_URL)
     try:
-        response = requests.post(api_url, json=payload)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return await get_service("fraud").post_json("/predict", payload)
+    except (ServiceUnavailable, httpx.HTTPError, ValueError) as e:
         return {"error": f"API call failed: {e}"}
@@ -0,0 +1,180 @@
+"""
+Shared async HTTP client for the agent's scoring tools.
+
+Every tool call to the fraud and NLP services goes through one pooled
+httpx.AsyncClient per service, so connections are kept alive between
+calls instead of paying TCP setup each time, and nothing blocks the
+agent's event loop. Calls get a per-call timeout, a bounded number of
+retries with exponential backoff for transient failures (connection
+errors, timeouts, 502/503/504), and a circuit breaker that fails fast
+while a service is down instead of making every tool call wait out its
+timeouts.
+
+Service URLs come from FRAUD_API_URL and NLP_API_URL. Open clients are
+closed when the process exits.
+"""
+import asyncio
+import atexit
+import os
+import random
+import threading
+import time
+
+import httpx
+
+RETRY_STATUSES = {502, 503, 504}
+
+
+class ServiceUnavailable(Exception):
+    """The circuit breaker is open, or retries were exhausted."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures. While open, calls
+    fail immediately; after `reset_timeout` seconds one trial call is let
+    through (half-open) and its outcome closes or reopens the circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        # The breaker is shared by the event loops of every session thread
+        self._trial_lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        return self.state == "closed" or self.take_trial()
+
+    def take_trial(self):
+        """Claim the half-open trial call; True only for the caller that got it."""
+        with self._trial_lock:
+            if self.state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        # Only the call that took the trial releases it, however it ended
+        # (verdict, cancellation or an unexpected error), so the next call can
+        # probe again but never while this one is still running
+        self._trial_in_flight = False
+
+
+class ServiceClient:
+    def __init__(self, name, base_url, timeout=10.0, retries=2, backoff=0.2,
+                 max_connections=20, breaker=None):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_connections)
+        self.breaker = breaker or CircuitBreaker()
+        # event loop -> client: an httpx pool belongs to the loop it was used
+        # on, and Streamlit keeps one loop per session
+        self._clients = {}
+
+    def _get_client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            # Sockets of a closed loop's client cannot be awaited any more;
+            # drop the reference and let them be closed on collection
+            for stale in [l for l in self._clients if l.is_closed()]:
+                del self._clients[stale]
+            client = self._clients[loop] = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout,
+                                                             limits=self.limits)
+        return client
+
+    async def post_json(self, path, payload, timeout=None):
+        """
+        POST `payload` as JSON and return the decoded response. Raises
+        ServiceUnavailable, httpx.HTTPStatusError for other error statuses and
+        ValueError when the body is not JSON.
+        """
+        # A closed breaker can only open through a failure, never by time
+        # passing, so a call that sees it closed never holds the trial
+        trial = self.breaker.state != "closed"
+        if trial and not self.breaker.take_trial():
+            raise ServiceUnavailable(f"{self.name} API is unavailable (circuit open, retrying in "
+                                     f"{self.breaker.reset_timeout:.0f}s)")
+        try:
+            client = self._get_client()
+            last_error = None
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    # Exponential backoff with jitter so retries do not arrive in lockstep
+                    await asyncio.sleep(self.backoff * 2 ** (attempt - 1) * (0.5 + random.random()))
+                try:
+                    response = await client.post(path, json=payload, timeout=timeout or self.timeout)
+                except httpx.TransportError as e:
+                    last_error = e
+                    continue
+                if response.status_code in RETRY_STATUSES:
+                    last_error = httpx.HTTPStatusError(
+                        f"{response.status_code} from {self.name} API", request=response.request, response=response)
+                    continue
+                # Anything else is an answer from a healthy service, errors included
+                self.breaker.record_success()
+                response.raise_for_status()
+                return response.json()
+            self.breaker.record_failure()
+            raise ServiceUnavailable(f"{self.name} API call failed after {self.retries + 1} attempts: {last_error}")
+        finally:
+            if trial:
+                self.breaker.release_trial()
+
+    def close(self):
+        """Close every client whose event loop is idle; used at interpreter exit."""
+        for loop, client in list(self._clients.items()):
+            if not loop.is_closed() and not loop.is_running():
+                loop.run_until_complete(client.aclose())
+        self._clients.clear()
+
+
+_services = {}
+
+
+def get_service(name):
+    """The shared client for 'fraud' or 'nlp'."""
+    if name not in _services:
+        defaults = {"fraud": ("FRAUD_API_URL", "http://localhost:8000"),
+                    "nlp": ("NLP_API_URL", "http://localhost:8001")}
+        env_var, default_url = defaults[name]
+        _services[name] = ServiceClient(
+            name, os.environ.get(env_var, default_url),
+            timeout=float(os.environ.get("AGENT_HTTP_TIMEOUT", 10)),
+            retries=int(os.environ.get("AGENT_HTTP_RETRIES", 2)),
+        )
+    return _services[name]
+
+
+@atexit.register
+def close_all():
+    for service in _services.values():
+        try:
+            service.close()
+        except Exception:
+            # Best effort: the process is going away either way
+            pass
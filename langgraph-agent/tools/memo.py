@@ -0,0 +1,127 @@
+"""
+Per-conversation memoization for deterministic tools.
+
+The agent often asks the same question twice in one conversation (the
+same transaction, the same memo text). memoize_tools() wraps tools so a
+call with the same tool name and arguments in the same LangGraph thread
+returns the earlier result instead of calling the scoring service again.
+Identical calls issued in the same turn, which ToolNode runs concurrently,
+share one in-flight request.
+
+Results carrying an "error" key are not kept, so a failed call is retried
+the next time it is asked for.
+"""
+import asyncio
+import json
+from collections import OrderedDict
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, StructuredTool
+from pydantic import BaseModel
+
+
+def canonical_key(tool_name, arguments):
+    def encode(value):
+        if isinstance(value, BaseModel):
+            return value.model_dump()
+        return str(value)
+    return f"{tool_name}:{json.dumps(arguments, sort_keys=True, separators=(',', ':'), default=encode)}"
+
+
+def schema_defaults(args_schema):
+    """Default values of the optional arguments of a pydantic or JSON schema."""
+    if isinstance(args_schema, dict):
+        return {name: spec["default"] for name, spec in args_schema.get("properties", {}).items()
+                if "default" in spec}
+    if isinstance(args_schema, type) and issubclass(args_schema, BaseModel):
+        return {name: field.get_default(call_default_factory=True)
+                for name, field in args_schema.model_fields.items() if not field.is_required()}
+    return {}
+
+
+def plain_arguments(arguments):
+    """Validated tool arguments back to plain JSON-able values."""
+    return json.loads(json.dumps(arguments, default=lambda v: v.model_dump() if isinstance(v, BaseModel) else str(v)))
+
+
+class ToolMemo:
+    """
+    Results per thread_id, each thread an LRU of `max_entries`; at most
+    `max_threads` conversations are kept.
+    """
+
+    def __init__(self, max_entries=256, max_threads=100):
+        self.max_entries = max_entries
+        self.max_threads = max_threads
+        self._threads = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _entries(self, thread_id):
+        entries = self._threads.get(thread_id)
+        if entries is None:
+            entries = self._threads[thread_id] = OrderedDict()
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+        else:
+            self._threads.move_to_end(thread_id)
+        return entries
+
+    async def call(self, thread_id, key, compute):
+        entries = self._entries(thread_id)
+        future = entries.get(key)
+        if future is not None:
+            entries.move_to_end(key)
+            self.hits += 1
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        entries[key] = future
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        try:
+            result = await compute()
+        except BaseException as e:
+            entries.pop(key, None)
+            future.set_exception(e)
+            # Nobody else may be waiting; keep the loop from warning about it
+            future.exception()
+            raise
+        if isinstance(result, dict) and "error" in result:
+            entries.pop(key, None)
+        future.set_result(result)
+        return result
+
+    def clear(self, thread_id=None):
+        if thread_id is None:
+            self._threads.clear()
+        else:
+            self._threads.pop(thread_id, None)
+
+
+def memoize_tool(tool: BaseTool, memo: ToolMemo) -> BaseTool:
+    """The same tool (name, description, arguments), answering repeats from `memo`."""
+
+    defaults = plain_arguments(schema_defaults(tool.args_schema))
+
+    async def call(config: RunnableConfig, **arguments):
+        thread_id = config.get("configurable", {}).get("thread_id")
+        arguments = plain_arguments(arguments)
+        if thread_id is None:
+            return await tool.ainvoke(arguments, config)
+        # Keyed with the defaults filled in, so f(x) and f(x, threshold=<default>) match
+        return await memo.call(thread_id, canonical_key(tool.name, {**defaults, **arguments}),
+                               lambda: tool.ainvoke(arguments, config))
+
+    return StructuredTool.from_function(
+        coroutine=call,
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+    )
+
+
+def memoize_tools(tools, memo=None):
+    memo = memo or ToolMemo()
+    return [memoize_tool(tool, memo) for tool in tools], memo
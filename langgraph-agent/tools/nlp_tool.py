@@ -1,26 +1,23 @@
-import requests
+import httpx
 from langchain_core.tools import tool
+from tools.http_client import get_service, ServiceUnavailable
 
 @tool
-def analyze_text_for_risk(text_to_analyze: str) -> dict:
+async def analyze_text_for_risk(text_to_analyze: str) -> dict:
     """
     Analyzes a piece of text (like a merchant name or transaction description) 
     for potential risk using a sentiment analysis model. Returns a risk score 
     between 0.0 (low risk) and 1.0 (high risk). Use this to assess non-numeric 
     information.
     """
-    # The URL of the NLP API you created
-    api_url = "http://localhost:8001/nlp-score"
-    
     # The data to send
     payload = {"text": text_to_analyze}
     
     print(f"DEBUG: Calling NLP API with payload: {payload}")
     
+    # Pooled keep-alive connection with timeout, retries and circuit breaker (NLP_API_URL)
     try:
-        response = requests.post(api_url, json=payload)
-        response.raise_for_status() # Raise an exception for bad status codes
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return await get_service("nlp").post_json("/nlp-score", payload)
+    except (ServiceUnavailable, httpx.HTTPError, ValueError) as e:
         return {"error": f"NLP API call failed: {e}"}
 